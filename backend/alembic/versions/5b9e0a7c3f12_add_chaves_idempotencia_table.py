@@ -0,0 +1,40 @@
+"""Add chaves_idempotencia table
+
+Revision ID: 5b9e0a7c3f12
+Revises: d81f3b6c2e07
+Create Date: 2026-10-18 17:21:09.442876
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9e0a7c3f12'
+down_revision: Union[str, Sequence[str], None] = 'd81f3b6c2e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chaves_idempotencia',
+    sa.Column('chave', sa.String(length=255), nullable=False),
+    sa.Column('rota', sa.String(length=100), nullable=False),
+    sa.Column('hash_requisicao', sa.String(length=64), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('status_code', sa.Integer(), nullable=False),
+    sa.Column('resposta', sa.JSON(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['usuario_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('chave')
+    )
+    op.create_index(op.f('ix_chaves_idempotencia_criado_em'), 'chaves_idempotencia', ['criado_em'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_chaves_idempotencia_criado_em'), table_name='chaves_idempotencia')
+    op.drop_table('chaves_idempotencia')
@@ -0,0 +1,33 @@
+"""Add consultas (coalesce(updated_at, created_at), id) index for the sync feed
+
+Revision ID: 8c4d2f6a9e31
+Revises: 5b9e0a7c3f12
+Create Date: 2026-10-18 18:37:52.106415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4d2f6a9e31'
+down_revision: Union[str, Sequence[str], None] = '5b9e0a7c3f12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_consultas_alterado_em_id',
+        'consultas',
+        [sa.text('coalesce(updated_at, created_at)'), 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_consultas_alterado_em_id', table_name='consultas')
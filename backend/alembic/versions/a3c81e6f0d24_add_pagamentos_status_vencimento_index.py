@@ -0,0 +1,28 @@
+"""Add index on pagamentos (status, data_vencimento)
+
+Revision ID: a3c81e6f0d24
+Revises: f5a25570e753
+Create Date: 2026-10-18 11:20:12.481377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c81e6f0d24'
+down_revision: Union[str, Sequence[str], None] = 'f5a25570e753'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_pagamentos_status_data_vencimento', 'pagamentos', ['status', 'data_vencimento'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_pagamentos_status_data_vencimento', table_name='pagamentos')
@@ -0,0 +1,66 @@
+"""Add estatisticas_diarias rollup tables
+
+Revision ID: bcd44e8b3177
+Revises: e4ef34620726
+Create Date: 2026-10-18 09:12:31.482117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bcd44e8b3177'
+down_revision: Union[str, Sequence[str], None] = 'e4ef34620726'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Reutiliza os tipos enum já criados para consultas/pagamentos
+    status_consulta = postgresql.ENUM('AGENDADA', 'CONFIRMADA', 'REALIZADA', 'CANCELADA', name='statusconsulta', create_type=False)
+    status_pagamento = postgresql.ENUM('PENDENTE', 'PAGO', 'CANCELADO', name='statuspagamento', create_type=False)
+    metodo_pagamento = postgresql.ENUM('DINHEIRO', 'CARTAO_CREDITO', 'CARTAO_DEBITO', 'PIX', 'TRANSFERENCIA', 'CONVENIO', name='metodopagamento', create_type=False)
+
+    op.create_table('estatisticas_diarias_consultas',
+    sa.Column('data', sa.Date(), nullable=False),
+    sa.Column('medico_id', sa.Integer(), nullable=False),
+    sa.Column('status', status_consulta, nullable=False),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['medico_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('data', 'medico_id', 'status')
+    )
+    op.create_table('estatisticas_diarias_pagamentos',
+    sa.Column('data', sa.Date(), nullable=False),
+    sa.Column('status', status_pagamento, nullable=False),
+    sa.Column('metodo_pagamento', metodo_pagamento, nullable=False),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.Column('valor', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('data', 'status', 'metodo_pagamento')
+    )
+
+    # Backfill a partir do histórico existente
+    op.execute("""
+        INSERT INTO estatisticas_diarias_consultas (data, medico_id, status, quantidade)
+        SELECT date(data_hora), medico_id, status, count(*)
+        FROM consultas
+        WHERE status IS NOT NULL
+        GROUP BY date(data_hora), medico_id, status
+    """)
+    op.execute("""
+        INSERT INTO estatisticas_diarias_pagamentos (data, status, metodo_pagamento, quantidade, valor)
+        SELECT date(created_at), status, metodo_pagamento, count(*), sum(valor)
+        FROM pagamentos
+        WHERE status IS NOT NULL AND created_at IS NOT NULL
+        GROUP BY date(created_at), status, metodo_pagamento
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('estatisticas_diarias_pagamentos')
+    op.drop_table('estatisticas_diarias_consultas')
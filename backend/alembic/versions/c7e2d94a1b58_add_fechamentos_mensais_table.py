@@ -0,0 +1,45 @@
+"""Add fechamentos_mensais table and index on pagamentos.created_at
+
+Revision ID: c7e2d94a1b58
+Revises: a3c81e6f0d24
+Create Date: 2026-10-18 13:42:05.918263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2d94a1b58'
+down_revision: Union[str, Sequence[str], None] = 'a3c81e6f0d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fechamentos_mensais',
+    sa.Column('mes', sa.Date(), nullable=False),
+    sa.Column('total_recebido', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('total_pendente', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('total_cancelado', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('quantidade_pagamentos', sa.Integer(), nullable=False),
+    sa.Column('linhas_pagamentos', sa.JSON(), nullable=False),
+    sa.Column('total_despesas_pagas', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('total_despesas_pendentes', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('despesas_por_categoria', sa.JSON(), nullable=False),
+    sa.Column('fechado_por_id', sa.Integer(), nullable=True),
+    sa.Column('fechado_em', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['fechado_por_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('mes')
+    )
+    # A parte ao vivo do relatório (mês em aberto) filtra por created_at
+    op.create_index('ix_pagamentos_created_at', 'pagamentos', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_pagamentos_created_at', table_name='pagamentos')
+    op.drop_table('fechamentos_mensais')
@@ -0,0 +1,43 @@
+"""Add consultas (medico_id, data_hora) index and overlap exclusion constraint
+
+Revision ID: d81f3b6c2e07
+Revises: c7e2d94a1b58
+Create Date: 2026-10-18 15:06:41.307512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f3b6c2e07'
+down_revision: Union[str, Sequence[str], None] = 'c7e2d94a1b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_consultas_medico_id_data_hora', 'consultas', ['medico_id', 'data_hora'], unique=False)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # btree_gist permite usar "=" em medico_id dentro do índice GiST.
+        # Falha se já existirem consultas ativas sobrepostas do mesmo médico:
+        # elas precisam ser remarcadas ou canceladas antes da migração.
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        op.execute(
+            "ALTER TABLE consultas ADD CONSTRAINT consultas_sem_sobreposicao "
+            "EXCLUDE USING gist ("
+            "medico_id WITH =, "
+            "tsrange(data_hora, data_hora + coalesce(duracao, 60) * interval '1 minute') WITH &&"
+            ") WHERE (status IN ('AGENDADA', 'CONFIRMADA'))"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE consultas DROP CONSTRAINT IF EXISTS consultas_sem_sobreposicao')
+    op.drop_index('ix_consultas_medico_id_data_hora', table_name='consultas')
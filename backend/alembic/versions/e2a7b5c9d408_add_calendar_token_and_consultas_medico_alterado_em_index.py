@@ -0,0 +1,38 @@
+"""Add users.token_calendario and consultas (medico_id, coalesce(updated_at, created_at)) index
+
+Revision ID: e2a7b5c9d408
+Revises: 8c4d2f6a9e31
+Create Date: 2026-10-18 19:52:14.730582
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7b5c9d408'
+down_revision: Union[str, Sequence[str], None] = '8c4d2f6a9e31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_calendario', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_users_token_calendario'), 'users', ['token_calendario'], unique=True)
+    # ETag do feed .ics: max da última alteração das consultas do médico
+    op.create_index(
+        'ix_consultas_medico_id_alterado_em',
+        'consultas',
+        ['medico_id', sa.text('coalesce(updated_at, created_at)')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_consultas_medico_id_alterado_em', table_name='consultas')
+    op.drop_index(op.f('ix_users_token_calendario'), table_name='users')
+    op.drop_column('users', 'token_calendario')
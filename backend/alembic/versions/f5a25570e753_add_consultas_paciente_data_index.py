@@ -0,0 +1,28 @@
+"""Add index on consultas (paciente_id, data_hora)
+
+Revision ID: f5a25570e753
+Revises: bcd44e8b3177
+Create Date: 2026-10-18 10:03:47.215904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a25570e753'
+down_revision: Union[str, Sequence[str], None] = 'bcd44e8b3177'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_consultas_paciente_id_data_hora', 'consultas', ['paciente_id', 'data_hora'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_consultas_paciente_id_data_hora', table_name='consultas')
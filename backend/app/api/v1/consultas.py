@@ -1,18 +1,25 @@
 from typing import List, Optional
 from datetime import datetime, date, time, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
 from app.api.deps import get_db, get_current_user
-from app.models.user import User
-from app.models.consulta import Consulta, TipoConsulta, StatusConsulta
+from app.core.cache import cache, TAG_CONSULTAS
+from app.core.config import settings
+from app.models.user import User, UserRole
+from app.models.consulta import Consulta, TipoConsulta, StatusConsulta, DURACAO_PADRAO_MINUTOS, DURACAO_MAXIMA_MINUTOS
 from app.models.paciente import Paciente
 from app.models.horario_disponivel import HorarioDisponivel, DiaSemana
 from app.schemas.consulta import (
     ConsultaCreate, ConsultaUpdate, Consulta as ConsultaSchema, 
     ConsultaList, HorarioDisponivel as HorarioDisponivelSchema,
-    AgendaMedico, ConsultaResumo, ConsultaListResumo
+    AgendaMedico, AgendaPeriodo, ConsultaResumo, ConsultaListResumo,
+    ConsultaRecorrenteCreate, ConsultaRecorrenteResultado, SincronizacaoConsultas
 )
+from app.services import agenda, agenda_periodo, agenda_recorrente, calendario, disponibilidade, estatisticas_diarias, idempotencia, sincronizacao
+from app.services.indice_agenda import indice_agenda
 
 router = APIRouter()
 
@@ -81,16 +88,50 @@ def list_consultas(
         limit=limit
     )
 
+ROTA_CRIAR_CONSULTA = "POST /consultas/"
+
+def _repetir_resposta(registro) -> JSONResponse:
+    """Resposta guardada de uma requisição já processada com a mesma Idempotency-Key"""
+    return JSONResponse(
+        status_code=registro.status_code,
+        content=registro.resposta,
+        headers={idempotencia.CABECALHO_REPETICAO: "true"}
+    )
+
 @router.post("/", response_model=ConsultaSchema, status_code=status.HTTP_201_CREATED)
 def create_consulta(
     consulta: ConsultaCreate,
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", max_length=255,
+        description="Chave única do agendamento; repetições devolvem a consulta já criada"
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Agendar nova consulta"""
+    # Agendamentos do mesmo médico passam um de cada vez daqui até o commit
+    agenda.bloquear_agenda(db, consulta.medico_id)
+    
+    hash_corpo = None
+    usuario_id = current_user.id if current_user else None
+    if idempotency_key:
+        hash_corpo = idempotencia.hash_requisicao(consulta.model_dump(mode="json"))
+        try:
+            anterior = idempotencia.buscar(db, idempotency_key, ROTA_CRIAR_CONSULTA, hash_corpo, usuario_id)
+        except ValueError as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e)
+            )
+        if anterior is not None:
+            db.rollback()
+            return _repetir_resposta(anterior)
+    
     # Verificar se paciente existe
     paciente = db.query(Paciente).filter(Paciente.id == consulta.paciente_id).first()
     if not paciente:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Paciente não encontrado"
@@ -99,35 +140,15 @@ def create_consulta(
     # Verificar se médico existe
     medico = db.query(User).filter(User.id == consulta.medico_id).first()
     if not medico or medico.role != "medico":
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Médico não encontrado"
         )
     
-    # Verificar conflito de horário
-    data_inicio = consulta.data_hora
-    data_fim = data_inicio + timedelta(minutes=consulta.duracao)
-    
-    # Buscar consultas existentes do médico no período
-    consultas_existentes = db.query(Consulta).filter(
-        and_(
-            Consulta.medico_id == consulta.medico_id,
-            Consulta.status.in_([StatusConsulta.AGENDADA, StatusConsulta.CONFIRMADA])
-        )
-    ).all()
-    
-    # Verificar sobreposição de horários
-    conflito = False
-    for consulta_existente in consultas_existentes:
-        inicio_existente = consulta_existente.data_hora
-        fim_existente = inicio_existente + timedelta(minutes=consulta_existente.duracao)
-        
-        # Verificar se há sobreposição
-        if (data_inicio < fim_existente and data_fim > inicio_existente):
-            conflito = True
-            break
-    
-    if conflito:
+    # Verificar conflito de horário (consulta limitada pelo índice (medico_id, data_hora))
+    if agenda.buscar_conflito(db, consulta.medico_id, consulta.data_hora, consulta.duracao):
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Horário já ocupado por outra consulta"
@@ -136,11 +157,143 @@ def create_consulta(
     # Criar consulta
     db_consulta = Consulta(**consulta.dict())
     db.add(db_consulta)
-    db.commit()
+    try:
+        db.flush()
+        estatisticas_diarias.atualizar_consulta(db, None, db_consulta)
+        if idempotency_key:
+            db.refresh(db_consulta)
+            idempotencia.registrar(
+                db, idempotency_key, ROTA_CRIAR_CONSULTA, hash_corpo,
+                status.HTTP_201_CREATED,
+                ConsultaSchema.model_validate(db_consulta).model_dump(mode="json"),
+                usuario_id=usuario_id
+            )
+        db.commit()
+    except IntegrityError:
+        # PostgreSQL: agendamento concorrente barrado pela restrição de exclusão;
+        # ou a mesma Idempotency-Key gravada por outra requisição em paralelo
+        db.rollback()
+        if idempotency_key:
+            try:
+                anterior = idempotencia.buscar(db, idempotency_key, ROTA_CRIAR_CONSULTA, hash_corpo, usuario_id)
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=str(e)
+                )
+            if anterior is not None:
+                return _repetir_resposta(anterior)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Horário já ocupado por outra consulta"
+        )
+    cache.invalidar(TAG_CONSULTAS)
     db.refresh(db_consulta)
+    indice_agenda.registrar(db_consulta)
     
     return db_consulta
 
+@router.post("/recorrentes/", response_model=ConsultaRecorrenteResultado, status_code=status.HTTP_201_CREATED)
+def create_consultas_recorrentes(
+    serie: ConsultaRecorrenteCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Agendar uma série de consultas (semanal, quinzenal ou mensal) numa única transação"""
+    agenda.bloquear_agenda(db, serie.medico_id)
+    
+    paciente = db.query(Paciente).filter(Paciente.id == serie.paciente_id).first()
+    if not paciente:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Paciente não encontrado"
+        )
+    
+    medico = db.query(User).filter(User.id == serie.medico_id).first()
+    if not medico or medico.role != "medico":
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Médico não encontrado"
+        )
+    
+    try:
+        resultado = agenda_recorrente.agendar_recorrente(db, serie)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if not resultado.criadas:
+        # Série inteira recusada: devolver as colisões para o cliente escolher outro horário
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=resultado.model_dump(mode="json")
+        )
+    
+    try:
+        db.commit()
+    except IntegrityError:
+        # PostgreSQL: agendamento concorrente barrado pela restrição de exclusão
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Horário já ocupado por outra consulta"
+        )
+    cache.invalidar(TAG_CONSULTAS)
+    indice_agenda.invalidar(serie.medico_id)
+    
+    return resultado
+
+@router.get("/alteracoes/", response_model=SincronizacaoConsultas)
+def get_alteracoes_consultas(
+    cursor: Optional[str] = Query(None, description="Cursor devolvido pela chamada anterior (vazio: desde o início)"),
+    limite: int = Query(sincronizacao.LIMITE_PADRAO, ge=1, le=sincronizacao.LIMITE_MAXIMO, description="Máximo de consultas por chamada"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Consultas criadas, alteradas ou canceladas desde o cursor (sincronização incremental)"""
+    try:
+        return sincronizacao.buscar_alteracoes(db, cursor, limite)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/calendario/{token}.ics", response_class=Response)
+def get_calendario_medico(
+    token: str,
+    semanas: int = Query(settings.calendario_semanas_padrao, ge=1, le=settings.calendario_semanas_maximo, description="Semanas a partir de hoje"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: Session = Depends(get_db)
+):
+    """Agenda do médico em iCalendar (acesso pelo token do médico, sem login)"""
+    hoje = date.today()
+    medico = calendario.buscar_medico(db, token, *calendario.periodo(hoje, semanas))
+    if medico is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Calendário não encontrado"
+        )
+    
+    etag = calendario.calcular_etag(medico, hoje, semanas)
+    cabecalhos = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if calendario.etag_confere(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabecalhos)
+    
+    conteudo = cache.obter_ou_calcular(
+        "consultas:calendario",
+        {"medico_id": medico.id, "etag": etag},
+        (),
+        settings.cache_ttl_calendario,
+        lambda: calendario.gerar_ics(db, medico.id, medico.nome, hoje, semanas)
+    )
+    return Response(content=conteudo, media_type="text/calendar; charset=utf-8", headers=cabecalhos)
+
 @router.get("/{consulta_id}", response_model=ConsultaSchema)
 def get_consulta(
     consulta_id: int,
@@ -172,43 +325,41 @@ def update_consulta(
             detail="Consulta não encontrada"
         )
     
-    # Verificar conflito se mudou horário
-    if consulta_update.data_hora and consulta_update.data_hora != consulta.data_hora:
-        data_inicio = consulta_update.data_hora
-        duracao = consulta_update.duracao or consulta.duracao
-        data_fim = data_inicio + timedelta(minutes=duracao)
-        
-        conflito = db.query(Consulta).filter(
-            and_(
-                Consulta.medico_id == consulta.medico_id,
-                Consulta.id != consulta_id,
-                Consulta.status.in_([StatusConsulta.AGENDADA, StatusConsulta.CONFIRMADA]),
-                or_(
-                    and_(
-                        Consulta.data_hora <= data_inicio,
-                        func.date_add(Consulta.data_hora, func.interval(Consulta.duracao, 'MINUTE')) > data_inicio
-                    ),
-                    and_(
-                        Consulta.data_hora < data_fim,
-                        func.date_add(Consulta.data_hora, func.interval(Consulta.duracao, 'MINUTE')) >= data_fim
-                    )
-                )
-            )
-        ).first()
-        
-        if conflito:
+    # Verificar conflito se mudou horário/duração ou se a consulta voltou a ocupar a agenda
+    update_data = consulta_update.dict(exclude_unset=True)
+    data_hora = update_data.get("data_hora") or consulta.data_hora
+    duracao = update_data.get("duracao") or consulta.duracao or DURACAO_PADRAO_MINUTOS
+    status_novo = update_data.get("status") or consulta.status
+    ocupava = consulta.status in agenda.STATUS_OCUPAM_HORARIO
+    if status_novo in agenda.STATUS_OCUPAM_HORARIO and (
+        not ocupava or data_hora != consulta.data_hora or duracao != consulta.duracao
+    ):
+        agenda.bloquear_agenda(db, consulta.medico_id)
+        if agenda.buscar_conflito(db, consulta.medico_id, data_hora, duracao, ignorar_id=consulta_id):
+            db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Horário já ocupado por outra consulta"
             )
     
     # Atualizar campos
-    update_data = consulta_update.dict(exclude_unset=True)
+    chave_anterior = estatisticas_diarias.chave_consulta(consulta)
     for field, value in update_data.items():
         setattr(consulta, field, value)
     
-    db.commit()
+    try:
+        estatisticas_diarias.atualizar_consulta(db, chave_anterior, consulta)
+        db.commit()
+    except IntegrityError:
+        # PostgreSQL: remarcação concorrente barrada pela restrição de exclusão
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Horário já ocupado por outra consulta"
+        )
+    cache.invalidar(TAG_CONSULTAS)
     db.refresh(consulta)
+    indice_agenda.registrar(consulta)
     
     return consulta
 
@@ -226,8 +377,12 @@ def cancel_consulta(
             detail="Consulta não encontrada"
         )
     
+    chave_anterior = estatisticas_diarias.chave_consulta(consulta)
     consulta.status = StatusConsulta.CANCELADA
+    estatisticas_diarias.atualizar_consulta(db, chave_anterior, consulta)
     db.commit()
+    cache.invalidar(TAG_CONSULTAS)
+    indice_agenda.registrar(consulta)
     
     return None
 
@@ -242,6 +397,30 @@ def get_agenda_medico(
     if not data:
         data = date.today()
     
+    data_inicio = datetime.combine(data, time.min)
+    data_fim = data_inicio + timedelta(days=1)
+    
+    # Agenda próxima: servida pelo índice em memória, sem consultar o banco
+    entrada = indice_agenda.obter(db, medico_id, data, data)
+    if entrada is not None:
+        return AgendaMedico(
+            medico_id=medico_id,
+            medico_nome=entrada.medico_nome,
+            especialidade=entrada.especialidade,
+            consultas=entrada.consultas_entre(data_inicio, data_fim),
+            horarios_disponiveis=[
+                HorarioDisponivelSchema(
+                    data=data,
+                    hora_inicio=hora_inicio,
+                    hora_fim=hora_fim,
+                    medico_id=medico_id,
+                    medico_nome=entrada.medico_nome,
+                    disponivel=True
+                )
+                for hora_inicio, hora_fim in entrada.horarios_do_dia(data)
+            ]
+        )
+    
     # Verificar se médico existe
     medico = db.query(User).filter(User.id == medico_id).first()
     if not medico or medico.role != "medico":
@@ -251,26 +430,24 @@ def get_agenda_medico(
         )
     
     # Buscar consultas do dia
-    data_inicio = datetime.combine(data, time.min)
-    data_fim = datetime.combine(data, time.max)
-    
     consultas = db.query(Consulta).filter(
         and_(
             Consulta.medico_id == medico_id,
             Consulta.data_hora >= data_inicio,
-            Consulta.data_hora <= data_fim
+            Consulta.data_hora < data_fim
         )
-    ).order_by(Consulta.data_hora.asc()).all()
+    ).order_by(Consulta.data_hora.asc(), Consulta.id.asc()).all()
     
-    # Buscar horários disponíveis
-    dia_semana = data.strftime('%A').lower()
-    horarios_disponiveis = db.query(HorarioDisponivel).filter(
-        and_(
-            HorarioDisponivel.medico_id == medico_id,
-            HorarioDisponivel.dia_semana == dia_semana,
-            HorarioDisponivel.ativo == True
-        )
-    ).all()
+    # Buscar horários disponíveis (dia_semana é texto livre: comparar pelo dia normalizado)
+    horarios_disponiveis = [
+        horario for horario in db.query(HorarioDisponivel).filter(
+            and_(
+                HorarioDisponivel.medico_id == medico_id,
+                HorarioDisponivel.ativo == True
+            )
+        ).all()
+        if disponibilidade.dia_da_semana(horario.dia_semana) == data.weekday()
+    ]
     
     # Converter horários disponíveis
     horarios_schema = []
@@ -292,67 +469,133 @@ def get_agenda_medico(
         horarios_disponiveis=horarios_schema
     )
 
+@router.get("/agenda-periodo/", response_model=AgendaPeriodo)
+def get_agenda_periodo(
+    medico_ids: List[int] = Query(..., description="Médicos da agenda (repetir o parâmetro para cada um)"),
+    data_inicio: date = Query(..., description="Primeiro dia do período"),
+    data_fim: date = Query(..., description="Último dia do período; até 62 dias"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Agenda de vários médicos numa semana ou num mês, agrupada por médico e dia"""
+    if data_fim < data_inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="data_fim deve ser maior ou igual a data_inicio"
+        )
+    if (data_fim - data_inicio).days >= disponibilidade.MAXIMO_DIAS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"O período deve ter no máximo {disponibilidade.MAXIMO_DIAS} dias"
+        )
+    if len(medico_ids) > agenda_periodo.MAXIMO_MEDICOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Informe no máximo {agenda_periodo.MAXIMO_MEDICOS} médicos"
+        )
+    
+    return agenda_periodo.montar_agenda_periodo(db, medico_ids, data_inicio, data_fim)
+
 @router.get("/horarios-disponiveis/", response_model=List[HorarioDisponivelSchema])
 def get_horarios_disponiveis(
     medico_id: int,
     data: date,
+    data_fim: Optional[date] = Query(None, description="Último dia do período (padrão: o próprio dia); até 62 dias"),
+    duracao: int = Query(60, gt=0, le=DURACAO_MAXIMA_MINUTOS, description="Duração da consulta em minutos"),
+    passo: Optional[int] = Query(None, gt=0, le=DURACAO_MAXIMA_MINUTOS, description="Intervalo entre slots em minutos (padrão: a duração)"),
+    apenas_livres: bool = Query(False, description="Retornar só os slots livres"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obter horários disponíveis para agendamento"""
-    # Verificar se médico existe
-    medico = db.query(User).filter(User.id == medico_id).first()
-    if not medico or medico.role != "medico":
+    """Obter horários disponíveis para agendamento (um dia, uma semana ou um mês)"""
+    data_fim = data_fim or data
+    if data_fim < data:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Médico não encontrado"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="data_fim deve ser maior ou igual a data"
         )
-    
-    # Buscar horários do dia da semana
-    dia_semana = data.strftime('%A').lower()
-    horarios = db.query(HorarioDisponivel).filter(
-        and_(
-            HorarioDisponivel.medico_id == medico_id,
-            HorarioDisponivel.dia_semana == dia_semana,
-            HorarioDisponivel.ativo == True
+    if (data_fim - data).days >= disponibilidade.MAXIMO_DIAS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"O período deve ter no máximo {disponibilidade.MAXIMO_DIAS} dias"
         )
-    ).all()
-    
-    # Buscar consultas já agendadas no dia
-    data_inicio = datetime.combine(data, time.min)
-    data_fim = datetime.combine(data, time.max)
     
-    consultas_agendadas = db.query(Consulta).filter(
-        and_(
-            Consulta.medico_id == medico_id,
-            Consulta.data_hora >= data_inicio,
-            Consulta.data_hora <= data_fim,
-            Consulta.status.in_([StatusConsulta.AGENDADA, StatusConsulta.CONFIRMADA])
-        )
-    ).all()
+    # Horários de atendimento e consultas ativas do período viram bitmaps; na
+    # agenda próxima eles vêm do índice em memória, sem consultar o banco
+    entrada = indice_agenda.obter(db, medico_id, data, data_fim)
+    if entrada is not None:
+        medico_nome = entrada.medico_nome
+        grade = entrada.grade(data, data_fim)
+    else:
+        medico = db.query(User).filter(User.id == medico_id).first()
+        if not medico or medico.role != "medico":
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Médico não encontrado"
+            )
+        medico_nome = medico.nome
+        grade = disponibilidade.carregar_grades(db, [medico_id], data, data_fim)[medico_id]
     
-    # Gerar slots de horários disponíveis
     horarios_disponiveis = []
-    for horario in horarios:
-        hora_atual = horario.hora_inicio
-        while hora_atual < horario.hora_fim:
-            # Verificar se horário está livre
-            data_hora_slot = datetime.combine(data, hora_atual)
-            conflito = any(
-                data_hora_slot >= consulta.data_hora and 
-                data_hora_slot < consulta.data_hora + timedelta(minutes=consulta.duracao)
-                for consulta in consultas_agendadas
-            )
-            
-            horarios_disponiveis.append(HorarioDisponivelSchema(
-                data=data,
-                hora_inicio=hora_atual,
-                hora_fim=(datetime.combine(data, hora_atual) + timedelta(minutes=60)).time(),
-                medico_id=medico_id,
-                medico_nome=medico.nome,
-                disponivel=not conflito
-            ))
-            
-            hora_atual = (datetime.combine(data, hora_atual) + timedelta(minutes=60)).time()
+    for inicio, livre in grade.slots(duracao, passo, apenas_livres):
+        horarios_disponiveis.append(HorarioDisponivelSchema(
+            data=inicio.date(),
+            hora_inicio=inicio.time(),
+            hora_fim=(inicio + timedelta(minutes=duracao)).time(),
+            medico_id=medico_id,
+            medico_nome=medico_nome,
+            disponivel=livre
+        ))
     
     return horarios_disponiveis
+
+@router.get("/primeiros-horarios/", response_model=List[HorarioDisponivelSchema])
+def get_primeiros_horarios(
+    especialidade: str = Query(..., min_length=1, description="Especialidade dos médicos"),
+    duracao: int = Query(60, gt=0, le=DURACAO_MAXIMA_MINUTOS, description="Duração da consulta em minutos"),
+    data_inicio: Optional[date] = Query(None, description="Primeiro dia da busca (padrão: hoje)"),
+    data_fim: Optional[date] = Query(None, description="Último dia da busca (padrão: 60 dias depois do início)"),
+    limite: int = Query(10, ge=1, le=100, description="Quantidade de horários"),
+    passo: Optional[int] = Query(None, gt=0, le=DURACAO_MAXIMA_MINUTOS, description="Intervalo entre slots em minutos (padrão: a duração)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Primeiros horários livres entre todos os médicos da especialidade"""
+    data_inicio = data_inicio or date.today()
+    data_fim = data_fim or data_inicio + timedelta(days=60)
+    if data_fim < data_inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="data_fim deve ser maior ou igual a data_inicio"
+        )
+    if (data_fim - data_inicio).days >= disponibilidade.MAXIMO_DIAS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"O período deve ter no máximo {disponibilidade.MAXIMO_DIAS} dias"
+        )
+    
+    medicos = {
+        medico.id: medico.nome
+        for medico in db.query(User.id, User.nome).filter(
+            User.role == UserRole.MEDICO,
+            User.is_active == True,
+            User.especialidade.ilike(f"%{especialidade}%")
+        ).all()
+    }
+    
+    slots = disponibilidade.primeiros_horarios(
+        db, list(medicos), duracao, data_inicio, data_fim, limite,
+        passo=passo, depois_de=datetime.now()
+    )
+    
+    return [
+        HorarioDisponivelSchema(
+            data=inicio.date(),
+            hora_inicio=inicio.time(),
+            hora_fim=(inicio + timedelta(minutes=duracao)).time(),
+            medico_id=medico_id,
+            medico_nome=medicos[medico_id],
+            disponivel=True
+        )
+        for inicio, medico_id in slots
+    ]
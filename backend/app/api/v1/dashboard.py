@@ -1,27 +1,167 @@
-from typing import List
+import json
+from typing import Dict, List, Optional
 from datetime import datetime, date, timedelta
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
 from app.api.deps import get_db, get_current_user
+from app.core.cache import cache, TAG_CONSULTAS, TAG_PACIENTES, TAG_PAGAMENTOS
+from app.core.config import settings
 from app.models.user import User, UserRole
 from app.models.paciente import Paciente
 from app.models.consulta import Consulta, StatusConsulta
 from app.models.pagamento import Pagamento, StatusPagamento
-from app.schemas.dashboard import Dashboard, EstatisticasGerais, ConsultaProxima, PacienteRecente, MedicoTop, GraficoConsultas, GraficoFaturamento
+from app.schemas.dashboard import (
+    Dashboard, EstatisticasGerais, ConsultaProxima, PacienteRecente,
+    EstatisticasPeriodo, Granularidade
+)
+from app.services import graficos, estatisticas
+from app.services.paralelo import executar_em_paralelo, formatar_server_timing
+from app.services.metricas_ao_vivo import CanalMetricas
 
 router = APIRouter()
 
+TAGS_DASHBOARD = (TAG_CONSULTAS, TAG_PACIENTES, TAG_PAGAMENTOS)
+
 @router.get("/estatisticas", response_model=Dashboard)
 def get_dashboard(
+    response: Response,
     dias_grafico: int = Query(30, ge=7, le=365, description="Número de dias para gráficos"),
+    limite_proximas: int = Query(5, ge=1, le=50, description="Quantidade de próximas consultas"),
+    limite_pacientes: int = Query(5, ge=1, le=50, description="Quantidade de pacientes recentes"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Obter estatísticas gerais do dashboard"""
+    tempos: Dict[str, float] = {}
+    dashboard = cache.obter_ou_calcular(
+        "dashboard:estatisticas",
+        {
+            "dias_grafico": dias_grafico,
+            "limite_proximas": limite_proximas,
+            "limite_pacientes": limite_pacientes,
+            "hoje": date.today()
+        },
+        TAGS_DASHBOARD,
+        settings.cache_ttl_dashboard,
+        lambda: calcular_dashboard(
+            db, dias_grafico, limite_proximas, limite_pacientes, tempos
+        ).model_dump(mode="json")
+    )
+    
+    # Tempo de cada seção (vazio quando a resposta veio do cache)
+    response.headers["Server-Timing"] = formatar_server_timing(tempos) if tempos else 'cache;desc="hit"'
+    
+    return dashboard
+
+@router.get("/periodo", response_model=EstatisticasPeriodo)
+def get_estatisticas_periodo(
+    data_inicio: date = Query(..., description="Data de início do período"),
+    data_fim: date = Query(..., description="Data de fim do período"),
+    granularidade: Granularidade = Query(Granularidade.DIA, description="Agrupamento dos gráficos"),
+    medico_id: Optional[int] = Query(None, description="Restringir a um médico"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Obter estatísticas de um período arbitrário (da clínica ou de um médico)"""
+    if medico_id:
+        _verificar_medico(db, medico_id)
+    return _estatisticas_periodo_em_cache(db, data_inicio, data_fim, granularidade, medico_id)
+
+@router.get("/medicos/{medico_id}", response_model=EstatisticasPeriodo)
+def get_dashboard_medico(
+    medico_id: int,
+    data_inicio: Optional[date] = Query(None, description="Data de início (padrão: 30 dias atrás)"),
+    data_fim: Optional[date] = Query(None, description="Data de fim (padrão: hoje)"),
+    granularidade: Granularidade = Query(Granularidade.DIA, description="Agrupamento dos gráficos"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Obter o dashboard de um médico"""
+    _verificar_medico(db, medico_id)
+    data_fim = data_fim or date.today()
+    data_inicio = data_inicio or data_fim - timedelta(days=30)
+    return _estatisticas_periodo_em_cache(db, data_inicio, data_fim, granularidade, medico_id)
+
+def _verificar_medico(db: Session, medico_id: int):
+    medico = db.query(User.id).filter(
+        User.id == medico_id,
+        User.role == UserRole.MEDICO
+    ).first()
+    if not medico:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Médico não encontrado"
+        )
+
+def _estatisticas_periodo_em_cache(
+    db: Session,
+    data_inicio: date,
+    data_fim: date,
+    granularidade: Granularidade,
+    medico_id: Optional[int]
+):
+    if data_fim < data_inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="data_fim deve ser maior ou igual a data_inicio"
+        )
+    maximo_dias = estatisticas.MAXIMO_DIAS[granularidade]
+    if (data_fim - data_inicio).days >= maximo_dias:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Com granularidade {granularidade.value}, o período deve ter no máximo {maximo_dias} dias"
+        )
+    
+    return cache.obter_ou_calcular(
+        "dashboard:periodo",
+        {
+            "data_inicio": data_inicio,
+            "data_fim": data_fim,
+            "granularidade": granularidade.value,
+            "medico_id": medico_id
+        },
+        (TAG_CONSULTAS, TAG_PAGAMENTOS),
+        settings.cache_ttl_dashboard,
+        lambda: estatisticas.calcular_estatisticas_periodo(
+            db, data_inicio, data_fim, granularidade, medico_id
+        ).model_dump(mode="json")
+    )
+
+def calcular_dashboard(
+    db: Session,
+    dias_grafico: int,
+    limite_proximas: int = 5,
+    limite_pacientes: int = 5,
+    tempos: Optional[Dict[str, float]] = None
+) -> Dashboard:
+    """
+    Calcular o dashboard completo (sem cache).
+
+    As seções são independentes e rodam em paralelo, cada uma com a sua
+    sessão; se tempos for informado, recebe a duração (ms) de cada seção.
+    """
     hoje = date.today()
-    inicio_mes = hoje.replace(day=1)
     inicio_grafico = hoje - timedelta(days=dias_grafico)
+    fim_grafico = hoje - timedelta(days=1)
+    
+    resultados, duracoes = executar_em_paralelo(db, {
+        "estatisticas": lambda sessao: calcular_estatisticas_gerais(sessao, hoje),
+        "proximas_consultas": lambda sessao: listar_proximas_consultas(sessao, limite_proximas),
+        "pacientes_recentes": lambda sessao: listar_pacientes_recentes(sessao, limite_pacientes),
+        "medicos_top": lambda sessao: estatisticas.listar_medicos_top(sessao, inicio_grafico),
+        "grafico_consultas": lambda sessao: graficos.grafico_consultas(sessao, inicio_grafico, fim_grafico),
+        "grafico_faturamento": lambda sessao: graficos.grafico_faturamento(sessao, inicio_grafico, fim_grafico),
+    })
+    if tempos is not None:
+        tempos.update(duracoes)
+    
+    return Dashboard(**resultados)
+
+def calcular_estatisticas_gerais(db: Session, hoje: date) -> EstatisticasGerais:
+    """Totais de pacientes, médicos, consultas e faturamento"""
+    inicio_mes = hoje.replace(day=1)
     
     # Estatísticas gerais
     total_pacientes = db.query(Paciente).count()
@@ -84,130 +224,64 @@ def get_dashboard(
         faturamento_hoje=faturamento_hoje
     )
     
-    # Próximas consultas (próximas 5)
-    proximas_consultas = db.query(Consulta).filter(
+    return estatisticas
+
+def listar_proximas_consultas(db: Session, limite: int) -> List[ConsultaProxima]:
+    """Próximas consultas agendadas/confirmadas, com nomes via join"""
+    proximas = db.query(
+        Consulta.id,
+        Consulta.data_hora,
+        Consulta.tipo,
+        Paciente.nome.label("paciente_nome"),
+        User.nome.label("medico_nome")
+    ).join(
+        Paciente, Paciente.id == Consulta.paciente_id
+    ).join(
+        User, User.id == Consulta.medico_id
+    ).filter(
         and_(
             Consulta.data_hora >= datetime.now(),
             Consulta.status.in_([StatusConsulta.AGENDADA, StatusConsulta.CONFIRMADA])
         )
-    ).order_by(Consulta.data_hora.asc()).limit(5).all()
+    ).order_by(Consulta.data_hora.asc()).limit(limite).all()
     
-    proximas_consultas_schema = []
-    for consulta in proximas_consultas:
-        proximas_consultas_schema.append(ConsultaProxima(
+    return [
+        ConsultaProxima(
             id=consulta.id,
             data_hora=consulta.data_hora,
-            paciente_nome=consulta.paciente.nome,
-            medico_nome=consulta.medico.nome,
+            paciente_nome=consulta.paciente_nome,
+            medico_nome=consulta.medico_nome,
             tipo=consulta.tipo.value
-        ))
-    
-    # Pacientes recentes (últimos 5)
-    pacientes_recentes = db.query(Paciente).order_by(
-        Paciente.created_at.desc()
-    ).limit(5).all()
-    
-    pacientes_recentes_schema = []
-    for paciente in pacientes_recentes:
-        # Buscar última consulta
-        ultima_consulta = db.query(Consulta).filter(
-            Consulta.paciente_id == paciente.id
-        ).order_by(Consulta.data_hora.desc()).first()
-        
-        pacientes_recentes_schema.append(PacienteRecente(
+        )
+        for consulta in proximas
+    ]
+
+def listar_pacientes_recentes(db: Session, limite: int) -> List[PacienteRecente]:
+    """Pacientes cadastrados mais recentemente, com a data da última consulta"""
+    # Subconsulta correlacionada (equivalente a um LATERAL), resolvida pelo
+    # índice (paciente_id, data_hora) de consultas
+    ultima_consulta = db.query(
+        func.max(Consulta.data_hora)
+    ).filter(
+        Consulta.paciente_id == Paciente.id
+    ).correlate(Paciente).scalar_subquery()
+    
+    pacientes = db.query(
+        Paciente.id,
+        Paciente.nome,
+        Paciente.created_at,
+        ultima_consulta.label("ultima_consulta")
+    ).order_by(Paciente.created_at.desc()).limit(limite).all()
+    
+    return [
+        PacienteRecente(
             id=paciente.id,
             nome=paciente.nome,
             data_cadastro=paciente.created_at,
-            ultima_consulta=ultima_consulta.data_hora if ultima_consulta else None
-        ))
-    
-    # Médicos com mais consultas
-    medicos_top = db.query(
-        User,
-        func.count(Consulta.id).label('total_consultas')
-    ).join(Consulta, User.id == Consulta.medico_id).filter(
-        and_(
-            User.role == UserRole.MEDICO,
-            Consulta.data_hora >= inicio_grafico
+            ultima_consulta=paciente.ultima_consulta
         )
-    ).group_by(User.id).order_by(
-        func.count(Consulta.id).desc()
-    ).limit(5).all()
-    
-    medicos_top_schema = []
-    for medico, total in medicos_top:
-        medicos_top_schema.append(MedicoTop(
-            id=medico.id,
-            nome=medico.nome,
-            especialidade=medico.especialidade or "Sem especialidade",
-            total_consultas=total
-        ))
-    
-    # Gráfico de consultas por dia
-    grafico_consultas = []
-    for i in range(dias_grafico):
-        data_grafico = inicio_grafico + timedelta(days=i)
-        inicio_dia = datetime.combine(data_grafico, datetime.min.time())
-        fim_dia = datetime.combine(data_grafico, datetime.max.time())
-        
-        total_dia = db.query(Consulta).filter(
-            and_(
-                Consulta.data_hora >= inicio_dia,
-                Consulta.data_hora <= fim_dia
-            )
-        ).count()
-        
-        realizadas_dia = db.query(Consulta).filter(
-            and_(
-                Consulta.data_hora >= inicio_dia,
-                Consulta.data_hora <= fim_dia,
-                Consulta.status == StatusConsulta.REALIZADA
-            )
-        ).count()
-        
-        canceladas_dia = db.query(Consulta).filter(
-            and_(
-                Consulta.data_hora >= inicio_dia,
-                Consulta.data_hora <= fim_dia,
-                Consulta.status == StatusConsulta.CANCELADA
-            )
-        ).count()
-        
-        grafico_consultas.append(GraficoConsultas(
-            data=data_grafico.strftime("%Y-%m-%d"),
-            total=total_dia,
-            realizadas=realizadas_dia,
-            canceladas=canceladas_dia
-        ))
-    
-    # Gráfico de faturamento por dia
-    grafico_faturamento = []
-    for i in range(dias_grafico):
-        data_grafico = inicio_grafico + timedelta(days=i)
-        inicio_dia = datetime.combine(data_grafico, datetime.min.time())
-        fim_dia = datetime.combine(data_grafico, datetime.max.time())
-        
-        faturamento_dia = db.query(func.sum(Pagamento.valor)).filter(
-            and_(
-                Pagamento.data_pagamento >= inicio_dia,
-                Pagamento.data_pagamento <= fim_dia,
-                Pagamento.status == StatusPagamento.PAGO
-            )
-        ).scalar() or 0
-        
-        grafico_faturamento.append(GraficoFaturamento(
-            data=data_grafico.strftime("%Y-%m-%d"),
-            valor=faturamento_dia
-        ))
-    
-    return Dashboard(
-        estatisticas=estatisticas,
-        proximas_consultas=proximas_consultas_schema,
-        pacientes_recentes=pacientes_recentes_schema,
-        medicos_top=medicos_top_schema,
-        grafico_consultas=grafico_consultas,
-        grafico_faturamento=grafico_faturamento
-    )
+        for paciente in pacientes
+    ]
 
 @router.get("/metricas-rapidas")
 def get_metricas_rapidas(
@@ -215,6 +289,16 @@ def get_metricas_rapidas(
     current_user: User = Depends(get_current_user)
 ):
     """Obter métricas rápidas para widgets"""
+    return cache.obter_ou_calcular(
+        "dashboard:metricas-rapidas",
+        {"hoje": date.today()},
+        TAGS_DASHBOARD,
+        settings.cache_ttl_metricas_rapidas,
+        lambda: calcular_metricas_rapidas(db)
+    )
+
+def calcular_metricas_rapidas(db: Session) -> dict:
+    """Calcular as métricas rápidas (sem cache)"""
     hoje = date.today()
     inicio_hoje = datetime.combine(hoje, datetime.min.time())
     fim_hoje = datetime.combine(hoje, datetime.max.time())
@@ -232,14 +316,43 @@ def get_metricas_rapidas(
                 Paciente.created_at <= fim_hoje
             )
         ).count(),
-        "faturamento_hoje": db.query(func.sum(Pagamento.valor)).filter(
+        "faturamento_hoje": float(db.query(func.sum(Pagamento.valor)).filter(
             and_(
                 Pagamento.data_pagamento >= inicio_hoje,
                 Pagamento.data_pagamento <= fim_hoje,
                 Pagamento.status == StatusPagamento.PAGO
             )
-        ).scalar() or 0,
+        ).scalar() or 0),
         "consultas_pendentes": db.query(Consulta).filter(
             Consulta.status.in_([StatusConsulta.AGENDADA, StatusConsulta.CONFIRMADA])
         ).count()
     }
+
+# Canal compartilhado por todos os clientes do stream de métricas; recalcula
+# apenas quando consultas, pacientes ou pagamentos são alterados
+canal_metricas = CanalMetricas(calcular_metricas_rapidas)
+cache.ao_invalidar(
+    lambda tags: canal_metricas.notificar() if set(tags) & set(TAGS_DASHBOARD) else None
+)
+
+@router.get("/metricas-rapidas/stream")
+async def stream_metricas_rapidas(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream (Server-Sent Events) das métricas rápidas, enviado a cada alteração"""
+    # Liberar a conexão da autenticação: o stream pode ficar aberto por horas
+    db.close()
+    
+    async def eventos():
+        async for metricas in canal_metricas.assinar():
+            if metricas is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: metricas\ndata: {json.dumps(metricas, default=str)}\n\n"
+    
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -4,12 +4,15 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from app.api.deps import get_db, get_current_user
+from app.core.cache import cache, TAG_DESPESAS
 from app.models.user import User
 from app.models.despesa import Despesa, CategoriaDespesa, StatusDespesa
 from app.schemas.despesa import (
     DespesaCreate, DespesaUpdate, Despesa as DespesaSchema,
     DespesaList
 )
+from app.services import exportacao
+from app.services.exportacao import FormatoExportacao
 
 router = APIRouter()
 
@@ -26,20 +29,9 @@ def list_despesas(
     current_user: User = Depends(get_current_user)
 ):
     """Listar despesas com filtros e paginação"""
-    query = db.query(Despesa)
-    
-    # Filtros
-    if categoria:
-        query = query.filter(Despesa.categoria == categoria)
-    
-    if status:
-        query = query.filter(Despesa.status == status)
-    
-    if data_inicio:
-        query = query.filter(Despesa.data_vencimento >= data_inicio)
-    
-    if data_fim:
-        query = query.filter(Despesa.data_vencimento <= data_fim)
+    query = db.query(Despesa).filter(
+        *_filtros_despesas(categoria, status, data_inicio, data_fim)
+    )
     
     # Ordenar por data de criação (mais recente primeiro)
     query = query.order_by(desc(Despesa.created_at))
@@ -55,6 +47,61 @@ def list_despesas(
     )
 
 
+def _filtros_despesas(
+    categoria: Optional[CategoriaDespesa],
+    status_despesa: Optional[StatusDespesa],
+    data_inicio: Optional[date],
+    data_fim: Optional[date]
+) -> list:
+    """Filtros da listagem e da exportação de despesas"""
+    filtros = []
+    if categoria:
+        filtros.append(Despesa.categoria == categoria)
+    
+    if status_despesa:
+        filtros.append(Despesa.status == status_despesa)
+    
+    if data_inicio:
+        filtros.append(Despesa.data_vencimento >= data_inicio)
+    
+    if data_fim:
+        filtros.append(Despesa.data_vencimento <= data_fim)
+    
+    return filtros
+
+
+@router.get("/export")
+def export_despesas(
+    formato: FormatoExportacao = Query(FormatoExportacao.CSV, description="Formato do arquivo"),
+    categoria: Optional[CategoriaDespesa] = Query(None, description="Filtrar por categoria"),
+    status: Optional[StatusDespesa] = Query(None, description="Filtrar por status"),
+    data_inicio: Optional[date] = Query(None, description="Data de início"),
+    data_fim: Optional[date] = Query(None, description="Data de fim"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Exportar todas as despesas filtradas em CSV ou NDJSON (streaming)"""
+    filtros = _filtros_despesas(categoria, status, data_inicio, data_fim)
+    
+    def montar_query(sessao: Session):
+        return sessao.query(
+            Despesa.id,
+            Despesa.descricao,
+            Despesa.categoria,
+            Despesa.fornecedor,
+            Despesa.valor,
+            Despesa.status,
+            Despesa.data_vencimento,
+            Despesa.data_pagamento,
+            Despesa.observacoes,
+            Despesa.created_at
+        ).filter(
+            *filtros
+        ).order_by(Despesa.data_vencimento, Despesa.id)
+    
+    return exportacao.exportar(db, montar_query, formato, "despesas")
+
+
 @router.post("/", response_model=DespesaSchema, status_code=status.HTTP_201_CREATED)
 def create_despesa(
     despesa: DespesaCreate,
@@ -65,6 +112,7 @@ def create_despesa(
     db_despesa = Despesa(**despesa.dict())
     db.add(db_despesa)
     db.commit()
+    cache.invalidar(TAG_DESPESAS)
     db.refresh(db_despesa)
     
     return db_despesa
@@ -108,6 +156,7 @@ def update_despesa(
         setattr(despesa, field, value)
     
     db.commit()
+    cache.invalidar(TAG_DESPESAS)
     db.refresh(despesa)
     
     return despesa
@@ -129,6 +178,7 @@ def delete_despesa(
     
     db.delete(despesa)
     db.commit()
+    cache.invalidar(TAG_DESPESAS)
     
     return {"message": "Despesa excluída com sucesso"}
 
@@ -153,6 +203,7 @@ def update_despesa_status(
         despesa.data_pagamento = datetime.now()
     
     db.commit()
+    cache.invalidar(TAG_DESPESAS)
     db.refresh(despesa)
     
     return despesa
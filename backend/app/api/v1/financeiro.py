@@ -1,21 +1,35 @@
+import logging
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 from decimal import Decimal
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy import and_, or_, func, desc
 from app.api.deps import get_db, get_current_user
+from app.core.cache import cache, TAG_PAGAMENTOS, TAG_DESPESAS
+from app.core.config import settings
+from app.core.logs import LogLimitado
 from app.models.user import User
 from app.models.paciente import Paciente
 from app.models.consulta import Consulta
 from app.models.pagamento import Pagamento, MetodoPagamento, StatusPagamento
+from app.models.fechamento import FechamentoMensal
 from app.schemas.pagamento import (
     PagamentoCreate, PagamentoUpdate, Pagamento as PagamentoSchema,
+    PagamentoLoteCreate, PagamentoLoteResultado,
     PagamentoList, PagamentoResumo, PagamentoListResumo,
     RelatorioFinanceiro, Inadimplencia, InadimplenciaList, GraficoFinanceiro
 )
+from app.schemas.fluxo_caixa import FluxoCaixa
+from app.schemas.fechamento import FechamentoMensal as FechamentoMensalSchema
+from app.schemas.conciliacao import ConciliacaoResultado
+from app.services import graficos, estatisticas_diarias, relatorio_financeiro, inadimplencia, exportacao, fluxo_caixa, fechamento, pagamentos_lote, conciliacao
+from app.services.extrato_bancario import FormatoExtrato, ErroExtrato, ler_extrato
+from app.services.exportacao import FormatoExportacao
 
 router = APIRouter()
+log_limitado = LogLimitado(logging.getLogger(__name__))
 
 @router.get("/pagamentos", response_model=PagamentoListResumo)
 def list_pagamentos(
@@ -30,65 +44,117 @@ def list_pagamentos(
     current_user: User = Depends(get_current_user)
 ):
     """Listar pagamentos com filtros e paginação"""
-    query = db.query(Pagamento)
+    filtros = _filtros_pagamentos(paciente_id, status, metodo_pagamento, data_inicio, data_fim)
+    
+    total = db.query(func.count(Pagamento.id)).filter(*filtros).scalar()
+    
+    # Uma única consulta com as colunas do resumo (paciente, médico e consulta via join)
+    linhas = db.query(
+        Pagamento.id,
+        Pagamento.paciente_id,
+        Pagamento.medico_id,
+        Pagamento.valor,
+        Pagamento.status,
+        Pagamento.metodo_pagamento,
+        Pagamento.data_vencimento,
+        Pagamento.data_pagamento,
+        Paciente.nome.label("paciente_nome"),
+        User.nome.label("medico_nome"),
+        Consulta.data_hora.label("consulta_data")
+    ).join(
+        Paciente, Paciente.id == Pagamento.paciente_id
+    ).outerjoin(
+        User, User.id == Pagamento.medico_id
+    ).outerjoin(
+        Consulta, Consulta.id == Pagamento.consulta_id
+    ).filter(
+        *filtros
+    ).order_by(
+        desc(Pagamento.created_at), desc(Pagamento.id)
+    ).offset(skip).limit(limit).all()
+    
+    pagamentos_resumo = [PagamentoResumo(**linha._mapping) for linha in linhas]
+    
+    sem_medico = [linha.id for linha in linhas if linha.medico_nome is None]
+    if sem_medico:
+        log_limitado.warning(
+            "pagamentos_sem_medico",
+            "financeiro: pagamentos sem médico associado",
+            quantidade=len(sem_medico),
+            pagamento_ids=sem_medico[:20]
+        )
     
-    # Filtros
+    return PagamentoListResumo(
+        items=pagamentos_resumo,
+        total=total,
+        skip=skip,
+        limit=limit
+    )
+
+def _filtros_pagamentos(
+    paciente_id: Optional[int],
+    status_pagamento: Optional[StatusPagamento],
+    metodo_pagamento: Optional[MetodoPagamento],
+    data_inicio: Optional[date],
+    data_fim: Optional[date]
+) -> list:
+    """Filtros da listagem e da exportação de pagamentos"""
+    filtros = []
     if paciente_id:
-        query = query.filter(Pagamento.paciente_id == paciente_id)
+        filtros.append(Pagamento.paciente_id == paciente_id)
     
-    if status:
-        query = query.filter(Pagamento.status == status)
+    if status_pagamento:
+        filtros.append(Pagamento.status == status_pagamento)
     
     if metodo_pagamento:
-        query = query.filter(Pagamento.metodo_pagamento == metodo_pagamento)
+        filtros.append(Pagamento.metodo_pagamento == metodo_pagamento)
     
     if data_inicio:
-        query = query.filter(Pagamento.created_at >= datetime.combine(data_inicio, datetime.min.time()))
+        filtros.append(Pagamento.created_at >= datetime.combine(data_inicio, datetime.min.time()))
     
     if data_fim:
-        query = query.filter(Pagamento.created_at <= datetime.combine(data_fim, datetime.max.time()))
-    
-    # Ordenar por data de criação (mais recente primeiro)
-    query = query.order_by(desc(Pagamento.created_at))
-    
-    total = query.count()
-    pagamentos = query.offset(skip).limit(limit).all()
-    
-    # Converter para resumo
-    pagamentos_resumo = []
-    for pagamento in pagamentos:
-        consulta_data = None
-        if pagamento.consulta_id:
-            consulta = db.query(Consulta).filter(Consulta.id == pagamento.consulta_id).first()
-            if consulta:
-                consulta_data = consulta.data_hora
-        
-        medico_nome = None
-        if pagamento.medico:
-            medico_nome = pagamento.medico.nome
-        else:
-            print(f"⚠️ Pagamento {pagamento.id} não tem médico associado (medico_id: {pagamento.medico_id})")
-        
-        pagamentos_resumo.append(PagamentoResumo(
-            id=pagamento.id,
-            paciente_id=pagamento.paciente_id,
-            medico_id=pagamento.medico_id,
-            valor=pagamento.valor,
-            status=pagamento.status,
-            metodo_pagamento=pagamento.metodo_pagamento,
-            data_vencimento=pagamento.data_vencimento,
-            data_pagamento=pagamento.data_pagamento,
-            paciente_nome=pagamento.paciente.nome,
-            medico_nome=medico_nome,
-            consulta_data=consulta_data
-        ))
+        filtros.append(Pagamento.created_at <= datetime.combine(data_fim, datetime.max.time()))
     
-    return PagamentoListResumo(
-        items=pagamentos_resumo,
-        total=total,
-        skip=skip,
-        limit=limit
-    )
+    return filtros
+
+@router.get("/pagamentos/export")
+def export_pagamentos(
+    formato: FormatoExportacao = Query(FormatoExportacao.CSV, description="Formato do arquivo"),
+    paciente_id: Optional[int] = Query(None, description="Filtrar por paciente"),
+    status: Optional[StatusPagamento] = Query(None, description="Filtrar por status"),
+    metodo_pagamento: Optional[MetodoPagamento] = Query(None, description="Filtrar por método"),
+    data_inicio: Optional[date] = Query(None, description="Data de início"),
+    data_fim: Optional[date] = Query(None, description="Data de fim"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Exportar todos os pagamentos filtrados em CSV ou NDJSON (streaming)"""
+    filtros = _filtros_pagamentos(paciente_id, status, metodo_pagamento, data_inicio, data_fim)
+    
+    def montar_query(sessao: Session):
+        return sessao.query(
+            Pagamento.id,
+            Pagamento.paciente_id,
+            Paciente.nome.label("paciente_nome"),
+            Pagamento.medico_id,
+            User.nome.label("medico_nome"),
+            Pagamento.consulta_id,
+            Pagamento.valor,
+            Pagamento.metodo_pagamento,
+            Pagamento.status,
+            Pagamento.data_vencimento,
+            Pagamento.data_pagamento,
+            Pagamento.observacoes,
+            Pagamento.created_at
+        ).join(
+            Paciente, Paciente.id == Pagamento.paciente_id
+        ).outerjoin(
+            User, User.id == Pagamento.medico_id
+        ).filter(
+            *filtros
+        ).order_by(Pagamento.created_at, Pagamento.id)
+    
+    return exportacao.exportar(db, montar_query, formato, "pagamentos")
 
 @router.post("/pagamentos", response_model=PagamentoSchema, status_code=status.HTTP_201_CREATED)
 def create_pagamento(
@@ -117,11 +183,28 @@ def create_pagamento(
     # Criar pagamento
     db_pagamento = Pagamento(**pagamento.dict())
     db.add(db_pagamento)
+    db.flush()
+    estatisticas_diarias.atualizar_pagamento(db, None, db_pagamento)
     db.commit()
+    cache.invalidar(TAG_PAGAMENTOS)
     db.refresh(db_pagamento)
     
     return db_pagamento
 
+@router.post("/pagamentos/lote", response_model=PagamentoLoteResultado)
+def create_pagamentos_lote(
+    lote: PagamentoLoteCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Registrar vários pagamentos numa única transação (itens inválidos são informados e ignorados)"""
+    resultado = pagamentos_lote.registrar_em_lote(db, lote.items)
+    if resultado.criados:
+        db.commit()
+        cache.invalidar(TAG_PAGAMENTOS)
+    
+    return resultado
+
 @router.get("/pagamentos/{pagamento_id}", response_model=PagamentoSchema)
 def get_pagamento(
     pagamento_id: int,
@@ -138,6 +221,16 @@ def get_pagamento(
     
     return pagamento
 
+def _verificar_mes_aberto(db: Session, pagamento: Pagamento) -> None:
+    """409 se o pagamento pertence a um mês já fechado"""
+    try:
+        fechamento.verificar_mes_aberto(db, pagamento)
+    except fechamento.MesFechado as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
 @router.put("/pagamentos/{pagamento_id}", response_model=PagamentoSchema)
 def update_pagamento(
     pagamento_id: int,
@@ -153,16 +246,26 @@ def update_pagamento(
             detail="Pagamento não encontrado"
         )
     
+    alterados = pagamento_update.dict(exclude_unset=True)
+    if any(
+        campo in alterados and alterados[campo] != getattr(pagamento, campo)
+        for campo in fechamento.CAMPOS_CONGELADOS
+    ):
+        _verificar_mes_aberto(db, pagamento)
+    
     # Se mudou para pago, definir data de pagamento
     if pagamento_update.status == StatusPagamento.PAGO and not pagamento.data_pagamento:
         pagamento_update.data_pagamento = datetime.now()
     
     # Atualizar campos
+    chave_anterior = estatisticas_diarias.chave_pagamento(pagamento)
     update_data = pagamento_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(pagamento, field, value)
     
+    estatisticas_diarias.atualizar_pagamento(db, chave_anterior, pagamento)
     db.commit()
+    cache.invalidar(TAG_PAGAMENTOS)
     db.refresh(pagamento)
     
     return pagamento
@@ -180,9 +283,14 @@ def delete_pagamento(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pagamento não encontrado"
         )
+    _verificar_mes_aberto(db, pagamento)
     
+    estatisticas_diarias.atualizar_pagamento(
+        db, estatisticas_diarias.chave_pagamento(pagamento), None
+    )
     db.delete(pagamento)
     db.commit()
+    cache.invalidar(TAG_PAGAMENTOS)
     
     return None
 
@@ -199,157 +307,176 @@ def marcar_como_pago(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pagamento não encontrado"
         )
+    if pagamento.status != StatusPagamento.PAGO:
+        _verificar_mes_aberto(db, pagamento)
     
+    chave_anterior = estatisticas_diarias.chave_pagamento(pagamento)
     pagamento.status = StatusPagamento.PAGO
     pagamento.data_pagamento = datetime.now()
     
+    estatisticas_diarias.atualizar_pagamento(db, chave_anterior, pagamento)
     db.commit()
+    cache.invalidar(TAG_PAGAMENTOS)
     db.refresh(pagamento)
     
     return pagamento
 
+@router.post("/conciliacao/extrato", response_model=ConciliacaoResultado)
+def conciliar_extrato(
+    arquivo: UploadFile = File(..., description="Extrato bancário (CSV ou OFX)"),
+    formato: Optional[FormatoExtrato] = Query(None, description="Formato (padrão: pela extensão do arquivo)"),
+    janela_dias: int = Query(3, ge=0, le=30, description="Tolerância entre vencimento e data do crédito"),
+    aplicar: bool = Query(True, description="Marcar os conciliados como pagos (False: apenas simular)"),
+    codificacao: str = Query("utf-8", description="Codificação do arquivo (ex.: cp1252)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Importar um extrato e conciliar os créditos com os pagamentos pendentes"""
+    if formato is None:
+        nome = (arquivo.filename or "").lower()
+        formato = FormatoExtrato.OFX if nome.endswith(".ofx") else FormatoExtrato.CSV
+    
+    try:
+        resultado = conciliacao.conciliar(
+            db, ler_extrato(arquivo.file, formato, codificacao), janela_dias, aplicar
+        )
+    except (ErroExtrato, LookupError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if aplicar and resultado.conciliadas:
+        db.commit()
+        cache.invalidar(TAG_PAGAMENTOS)
+    
+    return resultado
+
 @router.get("/relatorio", response_model=RelatorioFinanceiro)
 def get_relatorio_financeiro(
     data_inicio: date = Query(..., description="Data de início do relatório"),
     data_fim: date = Query(..., description="Data de fim do relatório"),
+    por_medico: bool = Query(False, description="Incluir quebra por médico"),
+    por_mes: bool = Query(False, description="Incluir quebra por mês"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Obter relatório financeiro do período"""
-    inicio_dt = datetime.combine(data_inicio, datetime.min.time())
-    fim_dt = datetime.combine(data_fim, datetime.max.time())
-    
-    # Totais por status
-    total_recebido = db.query(func.sum(Pagamento.valor)).filter(
-        and_(
-            Pagamento.created_at >= inicio_dt,
-            Pagamento.created_at <= fim_dt,
-            Pagamento.status == StatusPagamento.PAGO
+    return relatorio_financeiro.calcular_relatorio(db, data_inicio, data_fim, por_medico, por_mes)
+
+def _mes_fechamento(ano: int, mes: int) -> date:
+    try:
+        return date(ano, mes, 1)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Mês inválido"
         )
-    ).scalar() or Decimal('0')
-    
-    total_pendente = db.query(func.sum(Pagamento.valor)).filter(
-        and_(
-            Pagamento.created_at >= inicio_dt,
-            Pagamento.created_at <= fim_dt,
-            Pagamento.status == StatusPagamento.PENDENTE
+
+@router.get("/fechamentos", response_model=List[FechamentoMensalSchema])
+def list_fechamentos(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Listar os meses fechados"""
+    return db.query(FechamentoMensal).order_by(desc(FechamentoMensal.mes)).all()
+
+@router.get("/fechamentos/{ano}/{mes}", response_model=FechamentoMensalSchema)
+def get_fechamento(
+    ano: int,
+    mes: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Obter o fechamento de um mês"""
+    db_fechamento = db.get(FechamentoMensal, _mes_fechamento(ano, mes))
+    if not db_fechamento:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Mês não fechado"
         )
-    ).scalar() or Decimal('0')
     
-    total_cancelado = db.query(func.sum(Pagamento.valor)).filter(
-        and_(
-            Pagamento.created_at >= inicio_dt,
-            Pagamento.created_at <= fim_dt,
-            Pagamento.status == StatusPagamento.CANCELADO
+    return db_fechamento
+
+@router.post("/fechamentos/{ano}/{mes}", response_model=FechamentoMensalSchema, status_code=status.HTTP_201_CREATED)
+def fechar_mes(
+    ano: int,
+    mes: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Fechar um mês encerrado, congelando os seus números (não pode ser desfeito)"""
+    inicio_mes = _mes_fechamento(ano, mes)
+    if db.get(FechamentoMensal, inicio_mes):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Mês já fechado"
         )
-    ).scalar() or Decimal('0')
     
-    total_geral = total_recebido + total_pendente + total_cancelado
+    try:
+        db_fechamento = fechamento.fechar_mes(db, inicio_mes, current_user.id)
+        db.commit()
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except IntegrityError:
+        # Outro fechamento do mesmo mês foi gravado ao mesmo tempo
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Mês já fechado"
+        )
+    db.refresh(db_fechamento)
     
-    # Quantidade de pagamentos
-    quantidade_pagamentos = db.query(Pagamento).filter(
-        and_(
-            Pagamento.created_at >= inicio_dt,
-            Pagamento.created_at <= fim_dt
+    return db_fechamento
+
+@router.get("/fluxo-caixa", response_model=FluxoCaixa)
+def get_fluxo_caixa(
+    data_inicio: date = Query(..., description="Data de início do relatório"),
+    data_fim: date = Query(..., description="Data de fim do relatório"),
+    saldo_inicial: Decimal = Query(Decimal("0"), description="Saldo no início do período"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Obter fluxo de caixa mensal (entradas realizadas/previstas x despesas por categoria)"""
+    if data_fim < data_inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="data_fim deve ser maior ou igual a data_inicio"
         )
-    ).count()
-    
-    # Pagamentos por método
-    pagamentos_por_metodo = {}
-    for metodo in MetodoPagamento:
-        total_metodo = db.query(func.sum(Pagamento.valor)).filter(
-            and_(
-                Pagamento.created_at >= inicio_dt,
-                Pagamento.created_at <= fim_dt,
-                Pagamento.metodo_pagamento == metodo
-            )
-        ).scalar() or Decimal('0')
-        pagamentos_por_metodo[metodo.value] = float(total_metodo)
-    
-    # Pagamentos por status
-    pagamentos_por_status = {}
-    for status_pag in StatusPagamento:
-        total_status = db.query(func.sum(Pagamento.valor)).filter(
-            and_(
-                Pagamento.created_at >= inicio_dt,
-                Pagamento.created_at <= fim_dt,
-                Pagamento.status == status_pag
-            )
-        ).scalar() or Decimal('0')
-        pagamentos_por_status[status_pag.value] = float(total_status)
-    
-    return RelatorioFinanceiro(
-        periodo_inicio=data_inicio,
-        periodo_fim=data_fim,
-        total_recebido=total_recebido,
-        total_pendente=total_pendente,
-        total_cancelado=total_cancelado,
-        total_geral=total_geral,
-        quantidade_pagamentos=quantidade_pagamentos,
-        pagamentos_por_metodo=pagamentos_por_metodo,
-        pagamentos_por_status=pagamentos_por_status
+    
+    return cache.obter_ou_calcular(
+        "financeiro:fluxo-caixa",
+        {
+            "data_inicio": data_inicio,
+            "data_fim": data_fim,
+            "saldo_inicial": saldo_inicial
+        },
+        (TAG_PAGAMENTOS, TAG_DESPESAS),
+        settings.cache_ttl_fluxo_caixa,
+        lambda: fluxo_caixa.calcular_fluxo_caixa(
+            db, data_inicio, data_fim, saldo_inicial
+        ).model_dump(mode="json")
     )
 
 @router.get("/inadimplencia", response_model=InadimplenciaList)
 def get_inadimplencia(
     dias_atraso_minimo: int = Query(1, ge=0, description="Dias mínimos de atraso"),
+    limite: int = Query(100, ge=1, le=1000, description="Número máximo de pacientes por página"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (proximo_cursor)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Obter lista de inadimplência"""
-    data_limite = date.today() - timedelta(days=dias_atraso_minimo)
-    
-    # Buscar pagamentos pendentes vencidos
-    pagamentos_pendentes = db.query(Pagamento).filter(
-        and_(
-            Pagamento.status == StatusPagamento.PENDENTE,
-            Pagamento.data_vencimento < data_limite
+    try:
+        return inadimplencia.listar_inadimplencia(db, dias_atraso_minimo, limite, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-    ).all()
-    
-    # Agrupar por paciente
-    inadimplencia_por_paciente = {}
-    for pagamento in pagamentos_pendentes:
-        paciente_id = pagamento.paciente_id
-        if paciente_id not in inadimplencia_por_paciente:
-            inadimplencia_por_paciente[paciente_id] = {
-                'paciente': pagamento.paciente,
-                'total_devendo': Decimal('0'),
-                'quantidade_pendente': 0,
-                'ultimo_vencimento': pagamento.data_vencimento
-            }
-        
-        inadimplencia_por_paciente[paciente_id]['total_devendo'] += pagamento.valor
-        inadimplencia_por_paciente[paciente_id]['quantidade_pendente'] += 1
-        if pagamento.data_vencimento > inadimplencia_por_paciente[paciente_id]['ultimo_vencimento']:
-            inadimplencia_por_paciente[paciente_id]['ultimo_vencimento'] = pagamento.data_vencimento
-    
-    # Converter para lista
-    inadimplencia_list = []
-    total_devendo = Decimal('0')
-    
-    for paciente_id, dados in inadimplencia_por_paciente.items():
-        dias_atraso = (date.today() - dados['ultimo_vencimento']).days
-        
-        inadimplencia_list.append(Inadimplencia(
-            paciente_id=paciente_id,
-            paciente_nome=dados['paciente'].nome,
-            total_devendo=dados['total_devendo'],
-            quantidade_pendente=dados['quantidade_pendente'],
-            ultimo_vencimento=dados['ultimo_vencimento'],
-            dias_atraso=dias_atraso
-        ))
-        
-        total_devendo += dados['total_devendo']
-    
-    # Ordenar por total devendo (maior primeiro)
-    inadimplencia_list.sort(key=lambda x: x.total_devendo, reverse=True)
-    
-    return InadimplenciaList(
-        items=inadimplencia_list,
-        total=total_devendo,
-        quantidade_pacientes=len(inadimplencia_list)
-    )
 
 @router.get("/grafico", response_model=List[GraficoFinanceiro])
 def get_grafico_financeiro(
@@ -359,37 +486,6 @@ def get_grafico_financeiro(
 ):
     """Obter dados para gráfico financeiro"""
     data_inicio = date.today() - timedelta(days=dias)
-    grafico_data = []
-    
-    for i in range(dias):
-        data_grafico = data_inicio + timedelta(days=i)
-        inicio_dia = datetime.combine(data_grafico, datetime.min.time())
-        fim_dia = datetime.combine(data_grafico, datetime.max.time())
-        
-        recebido = db.query(func.sum(Pagamento.valor)).filter(
-            and_(
-                Pagamento.created_at >= inicio_dia,
-                Pagamento.created_at <= fim_dia,
-                Pagamento.status == StatusPagamento.PAGO
-            )
-        ).scalar() or Decimal('0')
-        
-        pendente = db.query(func.sum(Pagamento.valor)).filter(
-            and_(
-                Pagamento.created_at >= inicio_dia,
-                Pagamento.created_at <= fim_dia,
-                Pagamento.status == StatusPagamento.PENDENTE
-            )
-        ).scalar() or Decimal('0')
-        
-        total = recebido + pendente
-        
-        grafico_data.append(GraficoFinanceiro(
-            data=data_grafico.strftime("%Y-%m-%d"),
-            recebido=recebido,
-            pendente=pendente,
-            total=total
-        ))
-    
-    return grafico_data
-
+    data_fim = date.today() - timedelta(days=1)
+    
+    return graficos.grafico_financeiro(db, data_inicio, data_fim)
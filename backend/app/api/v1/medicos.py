@@ -4,8 +4,10 @@ from sqlalchemy.orm import Session
 from app.api.deps import get_db, get_current_user
 from app.models.user import User, UserRole
 from app.models.horario_disponivel import HorarioDisponivel
-from app.schemas.medico import MedicoCreate, MedicoUpdate, Medico, MedicoList, HorarioMedico, MedicoComHorarios
+from app.schemas.medico import MedicoCreate, MedicoUpdate, Medico, MedicoList, HorarioMedico, MedicoComHorarios, CalendarioMedico
 from app.core.security import get_password_hash
+from app.services import calendario
+from app.services.indice_agenda import indice_agenda
 
 router = APIRouter()
 
@@ -145,6 +147,7 @@ def update_medico(
     
     db.commit()
     db.refresh(medico)
+    indice_agenda.invalidar(medico_id)
     
     return medico
 
@@ -218,3 +221,30 @@ def get_medico_completo(
         created_at=medico.created_at,
         horarios=horarios_schema
     )
+
+@router.post("/{medico_id}/calendario", response_model=CalendarioMedico)
+def gerar_token_calendario(
+    medico_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Gerar (ou trocar, invalidando o anterior) o token do feed .ics do médico"""
+    medico = db.query(User).filter(
+        User.id == medico_id,
+        User.role == UserRole.MEDICO
+    ).first()
+    
+    if not medico:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Médico não encontrado"
+        )
+    
+    medico.token_calendario = calendario.gerar_token()
+    db.commit()
+    
+    return CalendarioMedico(
+        medico_id=medico.id,
+        token=medico.token_calendario,
+        url=f"/api/v1/consultas/calendario/{medico.token_calendario}.ics"
+    )
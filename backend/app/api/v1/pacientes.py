@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from app.api.deps import get_db, get_current_user
+from app.core.cache import cache, TAG_PACIENTES
 from app.models.user import User
 from app.models.paciente import Paciente
 from app.schemas.paciente import PacienteCreate, PacienteUpdate, Paciente as PacienteSchema, PacienteList
@@ -70,6 +71,7 @@ def create_paciente(
     db_paciente = Paciente(**paciente_data)
     db.add(db_paciente)
     db.commit()
+    cache.invalidar(TAG_PACIENTES)
     db.refresh(db_paciente)
     
     return db_paciente
@@ -141,6 +143,7 @@ def update_paciente(
         setattr(paciente, field, value)
     
     db.commit()
+    cache.invalidar(TAG_PACIENTES)
     db.refresh(paciente)
     
     return paciente
@@ -165,6 +168,7 @@ def delete_paciente(
     # Soft delete - apenas marcar como inativo
     paciente.is_active = False
     db.commit()
+    cache.invalidar(TAG_PACIENTES)
     
     return None
 
@@ -0,0 +1,161 @@
+"""
+Cache de respostas com invalidação por tag
+
+Usa o Redis configurado em settings.redis_url e, se ele estiver fora do ar,
+cai para um LRU em memória do processo. A invalidação é feita por versão de
+tag: cada entrada é gravada com as versões atuais das suas tags na chave, e
+invalidar uma tag apenas incrementa a sua versão, tornando inalcançáveis as
+entradas antigas (que expiram pelo TTL).
+"""
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import redis
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tags usadas pelas rotas
+TAG_CONSULTAS = "consultas"
+TAG_PACIENTES = "pacientes"
+TAG_PAGAMENTOS = "pagamentos"
+TAG_DESPESAS = "despesas"
+
+
+class CacheLRU:
+    """Cache LRU em memória com TTL por entrada"""
+
+    def __init__(self, max_itens: int):
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave: str) -> Optional[str]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em is not None and expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave: str, valor: str, ttl: Optional[int] = None):
+        expira_em = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+
+class CacheRespostas:
+    """Cache de respostas JSON no Redis com fallback para LRU local"""
+
+    # Tempo sem tentar o Redis depois de uma falha
+    PAUSA_APOS_FALHA = 30
+
+    def __init__(self, redis_url: str, max_itens_local: int, prefixo: str = "clinica:cache"):
+        self.prefixo = prefixo
+        self._redis = redis.Redis.from_url(
+            redis_url,
+            socket_timeout=0.2,
+            socket_connect_timeout=0.2,
+            decode_responses=True
+        )
+        self._local = CacheLRU(max_itens_local)
+        # Versões das tags no modo local (fora do LRU para não serem descartadas)
+        self._versoes_locais: Dict[str, int] = {}
+        self._redis_indisponivel_ate = 0.0
+        self._ouvintes: List[Callable[[Tuple[str, ...]], None]] = []
+
+    def _usar_redis(self) -> bool:
+        return time.monotonic() >= self._redis_indisponivel_ate
+
+    def _falha_redis(self, erro: Exception):
+        if self._usar_redis():
+            logger.warning("cache: redis indisponível, usando LRU local", extra={"erro": str(erro)})
+        self._redis_indisponivel_ate = time.monotonic() + self.PAUSA_APOS_FALHA
+
+    def _chave_tag(self, tag: str) -> str:
+        return f"{self.prefixo}:tag:{tag}"
+
+    def _chave(self, nome: str, params: Dict[str, Any], versoes: Iterable) -> str:
+        params_json = json.dumps(params, sort_keys=True, default=str)
+        return f"{self.prefixo}:{nome}:{params_json}:{'.'.join(str(v or 0) for v in versoes)}"
+
+    def obter_ou_calcular(
+        self,
+        nome: str,
+        params: Dict[str, Any],
+        tags: Iterable[str],
+        ttl: int,
+        calcular: Callable[[], Any]
+    ) -> Any:
+        """Devolver o valor em cache ou calcular (valor deve ser serializável em JSON)"""
+        chaves_tags = [self._chave_tag(tag) for tag in tags]
+        chave_redis = None
+
+        if self._usar_redis():
+            try:
+                versoes = self._redis.mget(chaves_tags) if chaves_tags else []
+                chave_redis = self._chave(nome, params, versoes)
+                em_cache = self._redis.get(chave_redis)
+                if em_cache is not None:
+                    return json.loads(em_cache)
+            except redis.RedisError as e:
+                self._falha_redis(e)
+                chave_redis = None
+
+        if chave_redis is None:
+            versoes = [self._versoes_locais.get(chave_tag) for chave_tag in chaves_tags]
+            chave_local = self._chave(nome, params, versoes)
+            em_cache = self._local.get(chave_local)
+            if em_cache is not None:
+                return json.loads(em_cache)
+
+        valor = calcular()
+        valor_json = json.dumps(valor, default=str)
+
+        if chave_redis is not None:
+            try:
+                self._redis.set(chave_redis, valor_json, ex=ttl)
+            except redis.RedisError as e:
+                self._falha_redis(e)
+        else:
+            self._local.set(chave_local, valor_json, ttl)
+
+        return valor
+
+    def ao_invalidar(self, ouvinte: Callable[[Tuple[str, ...]], None]):
+        """Registrar uma função chamada com as tags a cada invalidação"""
+        self._ouvintes.append(ouvinte)
+
+    def invalidar(self, *tags: str):
+        """Invalidar todas as entradas associadas às tags"""
+        for tag in tags:
+            chave_tag = self._chave_tag(tag)
+            self._versoes_locais[chave_tag] = self._versoes_locais.get(chave_tag, 0) + 1
+
+        if self._usar_redis():
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for tag in tags:
+                    pipe.incr(self._chave_tag(tag))
+                pipe.execute()
+            except redis.RedisError as e:
+                self._falha_redis(e)
+
+        for ouvinte in self._ouvintes:
+            try:
+                ouvinte(tags)
+            except Exception:
+                logger.exception("cache: erro em ouvinte de invalidação")
+
+
+cache = CacheRespostas(settings.redis_url, settings.cache_lru_max_itens)
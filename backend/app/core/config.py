@@ -10,6 +10,31 @@ class Settings(BaseSettings):
     # Redis
     redis_url: str = "redis://redis:6379"
     
+    # Cache de respostas (segundos / itens do LRU local)
+    cache_ttl_dashboard: int = 60
+    cache_ttl_metricas_rapidas: int = 15
+    cache_ttl_fluxo_caixa: int = 300
+    cache_lru_max_itens: int = 512
+    cache_ttl_calendario: int = 3600
+    
+    # Índice em memória da agenda próxima dos médicos (semanas a partir de hoje;
+    # validade das entradas em segundos, com e sem o canal Redis de invalidação)
+    agenda_indice_ativo: bool = True
+    agenda_indice_semanas: int = 8
+    agenda_indice_ttl: int = 600
+    agenda_indice_ttl_sem_redis: int = 5
+    agenda_indice_canal: str = "clinica:agenda:invalidar"
+    
+    # Validade (horas) das respostas guardadas para o cabeçalho Idempotency-Key
+    idempotencia_validade_horas: int = 24
+    
+    # Semanas do feed .ics dos médicos (padrão e máximo por requisição)
+    calendario_semanas_padrao: int = 8
+    calendario_semanas_maximo: int = 26
+    
+    # Threads para calcular seções independentes (ex.: dashboard) em paralelo
+    secoes_max_workers: int = 6
+    
     # Security
     secret_key: str = "your-secret-key-here-change-in-production"
     algorithm: str = "HS256"
@@ -0,0 +1,40 @@
+"""
+Logs estruturados com limite de frequência
+
+Avisos que podem se repetir a cada requisição (ex.: dados incompletos) são
+emitidos no máximo uma vez por intervalo para cada chave; as ocorrências
+suprimidas nesse meio-tempo são contadas e informadas no próximo registro.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+
+class LogLimitado:
+    """Emite no máximo um registro por chave a cada `intervalo` segundos"""
+
+    def __init__(self, logger: logging.Logger, intervalo: float = 60):
+        self.logger = logger
+        self.intervalo = intervalo
+        self._estado: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def _liberar(self, chave: str):
+        """Devolver (pode emitir, ocorrências suprimidas desde o último registro)"""
+        agora = time.monotonic()
+        with self._lock:
+            ultimo, suprimidos = self._estado.get(chave, (None, 0))
+            if ultimo is not None and agora - ultimo < self.intervalo:
+                self._estado[chave] = (ultimo, suprimidos + 1)
+                return False, 0
+            self._estado[chave] = (agora, 0)
+            return True, suprimidos
+
+    def warning(self, chave: str, mensagem: str, **campos: Any):
+        emitir, suprimidos = self._liberar(chave)
+        if emitir:
+            self.logger.warning(
+                mensagem,
+                extra={"evento": chave, "suprimidos": suprimidos, **campos}
+            )
@@ -5,6 +5,9 @@ from .prontuario import Prontuario
 from .pagamento import Pagamento, MetodoPagamento, StatusPagamento
 from .lembrete_whatsapp import LembreteWhatsApp, StatusLembrete
 from .horario_disponivel import HorarioDisponivel, DiaSemana
+from .estatistica_diaria import EstatisticaDiariaConsulta, EstatisticaDiariaPagamento
+from .fechamento import FechamentoMensal
+from .chave_idempotencia import ChaveIdempotencia
 
 __all__ = [
     "User",
@@ -21,4 +24,8 @@ __all__ = [
     "StatusLembrete",
     "HorarioDisponivel",
     "DiaSemana",
+    "EstatisticaDiariaConsulta",
+    "EstatisticaDiariaPagamento",
+    "FechamentoMensal",
+    "ChaveIdempotencia",
 ]
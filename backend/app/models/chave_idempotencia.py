@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class ChaveIdempotencia(Base):
+    """
+    Resultado de uma requisição enviada com o cabeçalho Idempotency-Key.
+
+    É gravada na mesma transação que a operação: se a resposta se perder e
+    o cliente repetir a requisição com a mesma chave, a resposta guardada é
+    devolvida em vez de executar a operação de novo.
+    """
+    __tablename__ = "chaves_idempotencia"
+
+    chave = Column(String(255), primary_key=True)
+    rota = Column(String(100), nullable=False)
+    hash_requisicao = Column(String(64), nullable=False)  # sha256 do corpo
+    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    status_code = Column(Integer, nullable=False)
+    resposta = Column(JSON, nullable=False)
+    criado_em = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
 import enum
 
 
+DURACAO_PADRAO_MINUTOS = 60
+# Limite usado pela verificação de conflitos para restringir a busca no índice
+DURACAO_MAXIMA_MINUTOS = 480
+
+
 class TipoConsulta(str, enum.Enum):
     PRIMEIRA_CONSULTA = "primeira_consulta"
     RETORNO = "retorno"
@@ -20,12 +26,24 @@ class StatusConsulta(str, enum.Enum):
 
 class Consulta(Base):
     __tablename__ = "consultas"
+    __table_args__ = (
+        Index("ix_consultas_paciente_id_data_hora", "paciente_id", "data_hora"),
+        Index("ix_consultas_medico_id_data_hora", "medico_id", "data_hora"),
+        # Só no PostgreSQL: impede consultas ativas sobrepostas do mesmo médico
+        ExcludeConstraint(
+            ("medico_id", "="),
+            (text("tsrange(data_hora, data_hora + coalesce(duracao, 60) * interval '1 minute')"), "&&"),
+            name="consultas_sem_sobreposicao",
+            using="gist",
+            where=text("status IN ('AGENDADA', 'CONFIRMADA')")
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=False)
     medico_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     data_hora = Column(DateTime, nullable=False)
-    duracao = Column(Integer, default=60)  # em minutos
+    duracao = Column(Integer, default=DURACAO_PADRAO_MINUTOS)  # em minutos
     tipo = Column(Enum(TipoConsulta), default=TipoConsulta.PRIMEIRA_CONSULTA)
     status = Column(Enum(StatusConsulta), default=StatusConsulta.AGENDADA)
     observacoes = Column(String, nullable=True)
@@ -38,3 +56,18 @@ class Consulta(Base):
     prontuarios = relationship("Prontuario", back_populates="consulta")
     pagamentos = relationship("Pagamento", back_populates="consulta")
     lembretes = relationship("LembreteWhatsApp", back_populates="consulta")
+
+
+# Feed de sincronização: alterações na ordem (coalesce(updated_at, created_at), id)
+Index(
+    "ix_consultas_alterado_em_id",
+    func.coalesce(Consulta.updated_at, Consulta.created_at),
+    Consulta.id
+)
+
+# ETag do calendário .ics: última alteração nas consultas de um médico
+Index(
+    "ix_consultas_medico_id_alterado_em",
+    Consulta.medico_id,
+    func.coalesce(Consulta.updated_at, Consulta.created_at)
+)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, Enum, Numeric
+from ..core.database import Base
+from .consulta import StatusConsulta
+from .pagamento import MetodoPagamento, StatusPagamento
+
+
+class EstatisticaDiariaConsulta(Base):
+    """Rollup diário: quantidade de consultas por dia, médico e status"""
+    __tablename__ = "estatisticas_diarias_consultas"
+
+    data = Column(Date, primary_key=True)
+    medico_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    status = Column(Enum(StatusConsulta), primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+
+class EstatisticaDiariaPagamento(Base):
+    """Rollup diário: quantidade e valor de pagamentos por dia de lançamento, status e método"""
+    __tablename__ = "estatisticas_diarias_pagamentos"
+
+    data = Column(Date, primary_key=True)
+    status = Column(Enum(StatusPagamento), primary_key=True)
+    metodo_pagamento = Column(Enum(MetodoPagamento), primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+    valor = Column(Numeric(12, 2), nullable=False, default=0)
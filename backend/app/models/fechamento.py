@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, Numeric, JSON
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class FechamentoMensal(Base):
+    """
+    Fechamento imutável de um mês: totais financeiros congelados.
+
+    linhas_pagamentos guarda os pagamentos lançados no mês agrupados por
+    (status, método, médico), no mesmo formato da consulta do relatório
+    financeiro, para que meses fechados possam ser somados a qualquer
+    período sem reler a tabela de pagamentos.
+    """
+    __tablename__ = "fechamentos_mensais"
+
+    mes = Column(Date, primary_key=True)  # primeiro dia do mês
+    total_recebido = Column(Numeric(12, 2), nullable=False)
+    total_pendente = Column(Numeric(12, 2), nullable=False)
+    total_cancelado = Column(Numeric(12, 2), nullable=False)
+    quantidade_pagamentos = Column(Integer, nullable=False)
+    linhas_pagamentos = Column(JSON, nullable=False)
+    total_despesas_pagas = Column(Numeric(12, 2), nullable=False)
+    total_despesas_pendentes = Column(Numeric(12, 2), nullable=False)
+    despesas_por_categoria = Column(JSON, nullable=False)
+    fechado_por_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    fechado_em = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Numeric, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Numeric, Date, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
@@ -22,6 +22,10 @@ class StatusPagamento(str, enum.Enum):
 
 class Pagamento(Base):
     __tablename__ = "pagamentos"
+    __table_args__ = (
+        Index("ix_pagamentos_status_data_vencimento", "status", "data_vencimento"),
+        Index("ix_pagamentos_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=False)
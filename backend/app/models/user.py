@@ -22,6 +22,7 @@ class User(Base):
     crm = Column(String, unique=True, nullable=True)  # Apenas para médicos
     especialidade = Column(String, nullable=True)  # Apenas para médicos
     is_active = Column(Boolean, default=True, nullable=False)
+    token_calendario = Column(String(64), unique=True, index=True, nullable=True)  # feed .ics do médico
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
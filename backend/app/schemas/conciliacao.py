@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date
+from decimal import Decimal
+
+
+class LinhaConciliada(BaseModel):
+    linha: int
+    data: date
+    valor: Decimal
+    descricao: str
+    pagamento_id: int
+    paciente_id: int
+    paciente_nome: str
+
+
+class LinhaNaoConciliada(BaseModel):
+    linha: int
+    data: date
+    valor: Decimal
+    descricao: str
+    documento: Optional[str] = None
+    motivo: str
+
+
+class ConciliacaoResultado(BaseModel):
+    linhas_lidas: int
+    creditos: int
+    debitos_ignorados: int
+    conciliadas: int
+    nao_conciliadas: int
+    valor_conciliado: Decimal
+    aplicado: bool  # False quando é apenas uma simulação
+    itens_conciliados: List[LinhaConciliada]
+    itens_nao_conciliados: List[LinhaNaoConciliada]
@@ -1,13 +1,14 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, validator
 from typing import Optional, List
 from datetime import datetime, date, time
-from ..models.consulta import TipoConsulta, StatusConsulta
+import enum
+from ..models.consulta import TipoConsulta, StatusConsulta, DURACAO_PADRAO_MINUTOS, DURACAO_MAXIMA_MINUTOS
 
 class ConsultaBase(BaseModel):
     paciente_id: int
     medico_id: int
     data_hora: datetime
-    duracao: int = 60  # em minutos
+    duracao: int = Field(DURACAO_PADRAO_MINUTOS, gt=0, le=DURACAO_MAXIMA_MINUTOS)  # em minutos
     tipo: TipoConsulta = TipoConsulta.PRIMEIRA_CONSULTA
     observacoes: Optional[str] = None
 
@@ -16,7 +17,7 @@ class ConsultaCreate(ConsultaBase):
 
 class ConsultaUpdate(BaseModel):
     data_hora: Optional[datetime] = None
-    duracao: Optional[int] = None
+    duracao: Optional[int] = Field(None, gt=0, le=DURACAO_MAXIMA_MINUTOS)
     tipo: Optional[TipoConsulta] = None
     status: Optional[StatusConsulta] = None
     observacoes: Optional[str] = None
@@ -66,3 +67,68 @@ class ConsultaListResumo(BaseModel):
     total: int
     skip: int
     limit: int
+
+# Agenda de vários médicos num período (visões de semana/mês do calendário):
+# agrupada por médico e dia, sem repetir médico e data em cada consulta
+class JanelaAtendimento(BaseModel):
+    hora_inicio: time
+    hora_fim: time
+
+class ConsultaAgendaPeriodo(BaseModel):
+    id: int
+    hora: time
+    duracao: int
+    paciente_id: int
+    paciente_nome: str
+    tipo: TipoConsulta
+    status: StatusConsulta
+
+class AgendaPeriodoDia(BaseModel):
+    data: date
+    janelas: List[JanelaAtendimento] = []
+    consultas: List[ConsultaAgendaPeriodo] = []
+
+class AgendaPeriodoMedico(BaseModel):
+    medico_id: int
+    medico_nome: str
+    especialidade: Optional[str]
+    dias: List[AgendaPeriodoDia]
+
+class AgendaPeriodo(BaseModel):
+    data_inicio: date
+    data_fim: date
+    medicos: List[AgendaPeriodoMedico]
+
+# Agendamento recorrente: a mesma consulta repetida numa série de datas
+class FrequenciaRecorrencia(str, enum.Enum):
+    SEMANAL = "semanal"
+    QUINZENAL = "quinzenal"
+    MENSAL = "mensal"
+
+MAXIMO_OCORRENCIAS = 104  # dois anos de consultas semanais
+
+class ConsultaRecorrenteCreate(ConsultaBase):
+    frequencia: FrequenciaRecorrencia
+    # Informar exatamente um dos dois: número de ocorrências ou último dia da série
+    quantidade: Optional[int] = Field(None, ge=1, le=MAXIMO_OCORRENCIAS)
+    ate: Optional[date] = None
+    # Agendar as ocorrências livres mesmo que outras colidam (padrão: tudo ou nada)
+    parcial: bool = False
+
+class OcorrenciaRecorrente(BaseModel):
+    data_hora: datetime
+    consulta_id: Optional[int] = None  # consulta criada
+    conflito_com: Optional[int] = None  # consulta já existente que ocupa o horário
+
+class ConsultaRecorrenteResultado(BaseModel):
+    total: int
+    criadas: int
+    conflitos: int
+    ocorrencias: List[OcorrenciaRecorrente]
+
+# Sincronização incremental: o que mudou desde o cursor da chamada anterior
+class SincronizacaoConsultas(BaseModel):
+    alteradas: List[Consulta]  # criadas ou alteradas (exceto canceladas)
+    removidas: List[int]  # ids das consultas canceladas (tombstones)
+    cursor: str  # enviar na próxima chamada
+    mais: bool  # há mais alterações além do limite: chamar de novo já
@@ -2,6 +2,12 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, date
 from decimal import Decimal
+import enum
+
+class Granularidade(str, enum.Enum):
+    DIA = "dia"
+    SEMANA = "semana"
+    MES = "mes"
 
 class EstatisticasGerais(BaseModel):
     total_pacientes: int
@@ -37,6 +43,7 @@ class GraficoConsultas(BaseModel):
     total: int
     realizadas: int
     canceladas: int
+    pendentes: int = 0
 
 class GraficoFaturamento(BaseModel):
     data: str
@@ -49,3 +56,17 @@ class Dashboard(BaseModel):
     medicos_top: List[MedicoTop]
     grafico_consultas: List[GraficoConsultas]
     grafico_faturamento: List[GraficoFaturamento]
+
+class EstatisticasPeriodo(BaseModel):
+    periodo_inicio: date
+    periodo_fim: date
+    granularidade: Granularidade
+    medico_id: Optional[int] = None
+    total_consultas: int
+    consultas_realizadas: int
+    consultas_canceladas: int
+    consultas_pendentes: int
+    faturamento: Decimal
+    medicos_top: List[MedicoTop]
+    grafico_consultas: List[GraficoConsultas]
+    grafico_faturamento: List[GraficoFaturamento]
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+from datetime import datetime, date
+from decimal import Decimal
+
+
+class FechamentoMensal(BaseModel):
+    mes: date
+    total_recebido: Decimal
+    total_pendente: Decimal
+    total_cancelado: Decimal
+    quantidade_pagamentos: int
+    total_despesas_pagas: Decimal
+    total_despesas_pendentes: Decimal
+    despesas_por_categoria: Dict[str, Decimal]
+    fechado_por_id: Optional[int] = None
+    fechado_em: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from typing import Dict, List
+from datetime import date
+from decimal import Decimal
+
+
+class FluxoCaixaMes(BaseModel):
+    mes: str  # YYYY-MM
+    entradas_realizadas: Decimal
+    entradas_previstas: Decimal
+    saidas_realizadas: Decimal
+    saidas_previstas: Decimal
+    saidas_realizadas_por_categoria: Dict[str, Decimal]
+    saidas_previstas_por_categoria: Dict[str, Decimal]
+    resultado_realizado: Decimal
+    resultado_previsto: Decimal
+    saldo_realizado: Decimal
+    saldo_previsto: Decimal
+
+
+class FluxoCaixa(BaseModel):
+    periodo_inicio: date
+    periodo_fim: date
+    saldo_inicial: Decimal
+    total_entradas_realizadas: Decimal
+    total_entradas_previstas: Decimal
+    total_saidas_realizadas: Decimal
+    total_saidas_previstas: Decimal
+    saldo_final_realizado: Decimal
+    saldo_final_previsto: Decimal
+    meses: List[FluxoCaixaMes]
@@ -42,3 +42,8 @@ class HorarioMedico(BaseModel):
 
 class MedicoComHorarios(Medico):
     horarios: List[HorarioMedico] = []
+
+class CalendarioMedico(BaseModel):
+    medico_id: int
+    token: str
+    url: str  # caminho do feed .ics para assinar no aplicativo de calendário
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, date
 from decimal import Decimal
@@ -16,6 +16,21 @@ class PagamentoBase(BaseModel):
 class PagamentoCreate(PagamentoBase):
     status: Optional[StatusPagamento] = StatusPagamento.PENDENTE
 
+class PagamentoLoteCreate(BaseModel):
+    items: List[PagamentoCreate] = Field(..., min_length=1, max_length=1000)
+
+class PagamentoLoteItem(BaseModel):
+    indice: int  # posição do item na requisição
+    sucesso: bool
+    pagamento_id: Optional[int] = None
+    erro: Optional[str] = None
+
+class PagamentoLoteResultado(BaseModel):
+    total: int
+    criados: int
+    falhas: int
+    itens: List[PagamentoLoteItem]
+
 class PagamentoUpdate(BaseModel):
     valor: Optional[Decimal] = None
     metodo_pagamento: Optional[MetodoPagamento] = None
@@ -59,6 +74,23 @@ class PagamentoListResumo(BaseModel):
     skip: int
     limit: int
 
+class RelatorioFinanceiroMedico(BaseModel):
+    medico_id: Optional[int] = None
+    medico_nome: Optional[str] = None
+    total_recebido: Decimal
+    total_pendente: Decimal
+    total_cancelado: Decimal
+    total_geral: Decimal
+    quantidade_pagamentos: int
+
+class RelatorioFinanceiroMes(BaseModel):
+    mes: str
+    total_recebido: Decimal
+    total_pendente: Decimal
+    total_cancelado: Decimal
+    total_geral: Decimal
+    quantidade_pagamentos: int
+
 class RelatorioFinanceiro(BaseModel):
     periodo_inicio: date
     periodo_fim: date
@@ -69,6 +101,16 @@ class RelatorioFinanceiro(BaseModel):
     quantidade_pagamentos: int
     pagamentos_por_metodo: dict
     pagamentos_por_status: dict
+    por_medico: Optional[List[RelatorioFinanceiroMedico]] = None
+    por_mes: Optional[List[RelatorioFinanceiroMes]] = None
+    meses_fechados: List[str] = []  # meses (YYYY-MM) servidos pelos fechamentos
+
+class FaixasAtraso(BaseModel):
+    """Valor pendente por faixa de dias de atraso"""
+    ate_30: Decimal = Decimal("0")
+    de_31_a_60: Decimal = Decimal("0")
+    de_61_a_90: Decimal = Decimal("0")
+    acima_90: Decimal = Decimal("0")
 
 class Inadimplencia(BaseModel):
     paciente_id: int
@@ -77,11 +119,14 @@ class Inadimplencia(BaseModel):
     quantidade_pendente: int
     ultimo_vencimento: date
     dias_atraso: int
+    faixas: FaixasAtraso = FaixasAtraso()
 
 class InadimplenciaList(BaseModel):
     items: List[Inadimplencia]
     total: Decimal
     quantidade_pacientes: int
+    faixas: FaixasAtraso = FaixasAtraso()
+    proximo_cursor: Optional[str] = None
 
 class GraficoFinanceiro(BaseModel):
     data: str
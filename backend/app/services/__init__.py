@@ -0,0 +1 @@
+# Serviços com a lógica de negócio compartilhada entre as rotas
@@ -0,0 +1,134 @@
+"""
+Verificação de conflitos de horário na agenda dos médicos
+
+O fim de cada consulta (data_hora + duracao) é calculado no próprio banco,
+conforme o dialeto, e a busca é limitada por data_hora nos dois lados para
+usar o índice (medico_id, data_hora): como nenhuma consulta dura mais que
+DURACAO_MAXIMA_MINUTOS, só as que começam depois de
+inicio - DURACAO_MAXIMA_MINUTOS podem alcançar o novo horário.
+
+Agendamentos concorrentes do mesmo médico são serializados por
+bloquear_agenda antes da verificação; no PostgreSQL a restrição de exclusão
+consultas_sem_sobreposicao continua como última barreira.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, literal, literal_column, select, text, union_all, DateTime, Integer, String
+from app.models.consulta import Consulta, StatusConsulta, DURACAO_MAXIMA_MINUTOS, DURACAO_PADRAO_MINUTOS
+
+# Consultas que ocupam o horário do médico
+STATUS_OCUPAM_HORARIO = (StatusConsulta.AGENDADA, StatusConsulta.CONFIRMADA)
+
+# Nome da restrição de exclusão (PostgreSQL)
+RESTRICAO_SOBREPOSICAO = "consultas_sem_sobreposicao"
+
+# Primeira metade da chave dos advisory locks da agenda (a segunda é o medico_id)
+ESPACO_BLOQUEIO_AGENDA = 7301
+
+
+def bloquear_agenda(db: Session, medico_id: int) -> None:
+    """
+    Serializar até o fim da transação as escritas na agenda do médico.
+
+    Deve ser chamado antes de buscar_conflito: quem chega depois espera o
+    commit de quem está agendando e só então verifica o horário, já vendo a
+    consulta gravada. No PostgreSQL usa pg_advisory_xact_lock (liberado no
+    commit/rollback); nos demais bancos, um UPDATE sem efeito na linha do
+    médico (no SQLite ele reserva o banco para escrita até o commit).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:espaco, :medico_id)"),
+            {"espaco": ESPACO_BLOQUEIO_AGENDA, "medico_id": medico_id}
+        )
+    else:
+        db.execute(text("UPDATE users SET id = id WHERE id = :medico_id"), {"medico_id": medico_id})
+
+
+def fim_consulta(db: Session):
+    """Expressão SQL do fim da consulta (data_hora + duracao minutos), conforme o banco"""
+    duracao = func.coalesce(Consulta.duracao, DURACAO_PADRAO_MINUTOS)
+    if db.get_bind().dialect.name == "postgresql":
+        return Consulta.data_hora + duracao * literal_column("interval '1 minute'")
+    return func.datetime(Consulta.data_hora, func.printf("+%d minutes", duracao))
+
+
+def filtro_sobreposicao(db: Session, medico_id: int, inicio: datetime, fim: datetime):
+    """Condição das consultas ativas do médico que se sobrepõem a [inicio, fim)"""
+    inicio_sql = inicio
+    if db.get_bind().dialect.name != "postgresql":
+        # No SQLite as datas são texto; comparar no mesmo formato de datetime()
+        inicio_sql = inicio.strftime("%Y-%m-%d %H:%M:%S")
+
+    return and_(
+        Consulta.medico_id == medico_id,
+        Consulta.status.in_(STATUS_OCUPAM_HORARIO),
+        # Limites no índice (medico_id, data_hora)
+        Consulta.data_hora > inicio - timedelta(minutes=DURACAO_MAXIMA_MINUTOS),
+        Consulta.data_hora < fim,
+        # Sobreposição exata com o fim calculado no banco
+        fim_consulta(db) > inicio_sql,
+    )
+
+
+def buscar_conflito(
+    db: Session,
+    medico_id: int,
+    inicio: datetime,
+    duracao: int,
+    ignorar_id: Optional[int] = None
+) -> Optional[Consulta]:
+    """Primeira consulta ativa do médico que se sobrepõe ao horário, se houver"""
+    fim = inicio + timedelta(minutes=duracao)
+    query = db.query(Consulta).filter(filtro_sobreposicao(db, medico_id, inicio, fim))
+    if ignorar_id is not None:
+        query = query.filter(Consulta.id != ignorar_id)
+    return query.order_by(Consulta.data_hora).first()
+
+
+def buscar_conflitos(
+    db: Session,
+    medico_id: int,
+    intervalos: Sequence[Tuple[datetime, int]]
+) -> Dict[int, int]:
+    """
+    Verificar vários horários (inicio, duracao) do médico numa única query.
+
+    Devolve, para a posição de cada intervalo que colide, o id de uma
+    consulta ativa que o ocupa. Os intervalos viram uma tabela derivada
+    (UNION ALL de literais) juntada às consultas com a mesma condição de
+    filtro_sobreposicao, de modo que cada um é buscado no índice
+    (medico_id, data_hora). No SQLite cabem até 500 intervalos por chamada.
+    """
+    if not intervalos:
+        return {}
+    postgres = db.get_bind().dialect.name == "postgresql"
+
+    def _inicio(inicio: datetime):
+        # No SQLite o fim calculado é texto no formato de datetime()
+        if postgres:
+            return literal(inicio, DateTime)
+        return literal(inicio.strftime("%Y-%m-%d %H:%M:%S"), String)
+
+    ocorrencias = union_all(*[
+        select(
+            literal(indice, Integer).label("indice"),
+            literal(inicio - timedelta(minutes=DURACAO_MAXIMA_MINUTOS), DateTime).label("desde"),
+            literal(inicio + timedelta(minutes=duracao), DateTime).label("fim"),
+            _inicio(inicio).label("inicio")
+        )
+        for indice, (inicio, duracao) in enumerate(intervalos)
+    ]).subquery("ocorrencias")
+
+    linhas = db.query(ocorrencias.c.indice, func.min(Consulta.id)).join(
+        Consulta,
+        and_(
+            Consulta.medico_id == medico_id,
+            Consulta.status.in_(STATUS_OCUPAM_HORARIO),
+            Consulta.data_hora > ocorrencias.c.desde,
+            Consulta.data_hora < ocorrencias.c.fim,
+            fim_consulta(db) > ocorrencias.c.inicio,
+        )
+    ).group_by(ocorrencias.c.indice).all()
+    return {indice: consulta_id for indice, consulta_id in linhas}
@@ -0,0 +1,109 @@
+"""
+Agenda de vários médicos num período
+
+Monta a visão de semana/mês do calendário com três queries, qualquer que
+seja o número de médicos e de dias: os médicos, os horários de atendimento
+de todos eles e as consultas do período (com o nome do paciente). As
+janelas de atendimento vêm das máscaras semanais, expandidas para cada dia;
+dias sem janela e sem consulta são omitidos.
+"""
+from collections import defaultdict
+from datetime import datetime, date, time, timedelta
+from typing import Dict, List, Sequence, Tuple
+from sqlalchemy.orm import Session
+from app.models.user import User, UserRole
+from app.models.paciente import Paciente
+from app.models.consulta import Consulta, DURACAO_PADRAO_MINUTOS
+from app.models.horario_disponivel import HorarioDisponivel
+from app.schemas.consulta import (
+    AgendaPeriodo, AgendaPeriodoMedico, AgendaPeriodoDia, ConsultaAgendaPeriodo, JanelaAtendimento
+)
+from app.services.disponibilidade import dia_da_semana
+
+# Limite de médicos por chamada (a lista vai inteira no IN das queries)
+MAXIMO_MEDICOS = 100
+
+
+def montar_agenda_periodo(
+    db: Session,
+    medico_ids: Sequence[int],
+    data_inicio: date,
+    data_fim: date
+) -> AgendaPeriodo:
+    """Agenda dos médicos (na ordem pedida; ids que não são médicos são ignorados)"""
+    medicos = {
+        medico.id: medico
+        for medico in db.query(User.id, User.nome, User.especialidade).filter(
+            User.id.in_(medico_ids),
+            User.role == UserRole.MEDICO
+        ).all()
+    }
+
+    janelas: Dict[int, Dict[int, List[Tuple[time, time]]]] = defaultdict(lambda: defaultdict(list))
+    if medicos:
+        for horario in db.query(
+            HorarioDisponivel.medico_id,
+            HorarioDisponivel.dia_semana,
+            HorarioDisponivel.hora_inicio,
+            HorarioDisponivel.hora_fim
+        ).filter(
+            HorarioDisponivel.medico_id.in_(medicos),
+            HorarioDisponivel.ativo == True
+        ).order_by(HorarioDisponivel.hora_inicio).all():
+            dia = dia_da_semana(horario.dia_semana)
+            if dia is not None:
+                janelas[horario.medico_id][dia].append((horario.hora_inicio, horario.hora_fim))
+
+    consultas: Dict[Tuple[int, date], List[ConsultaAgendaPeriodo]] = defaultdict(list)
+    if medicos:
+        for linha in db.query(
+            Consulta.id,
+            Consulta.medico_id,
+            Consulta.data_hora,
+            Consulta.duracao,
+            Consulta.paciente_id,
+            Paciente.nome.label("paciente_nome"),
+            Consulta.tipo,
+            Consulta.status
+        ).join(
+            Paciente, Paciente.id == Consulta.paciente_id
+        ).filter(
+            Consulta.medico_id.in_(medicos),
+            Consulta.data_hora >= datetime.combine(data_inicio, time.min),
+            Consulta.data_hora < datetime.combine(data_fim + timedelta(days=1), time.min)
+        ).order_by(Consulta.data_hora, Consulta.id).all():
+            consultas[(linha.medico_id, linha.data_hora.date())].append(ConsultaAgendaPeriodo(
+                id=linha.id,
+                hora=linha.data_hora.time(),
+                duracao=linha.duracao or DURACAO_PADRAO_MINUTOS,
+                paciente_id=linha.paciente_id,
+                paciente_nome=linha.paciente_nome,
+                tipo=linha.tipo,
+                status=linha.status
+            ))
+
+    resultado = []
+    for medico_id in dict.fromkeys(medico_ids):
+        medico = medicos.get(medico_id)
+        if medico is None:
+            continue
+        dias = []
+        dia = data_inicio
+        while dia <= data_fim:
+            janelas_dia = janelas[medico_id].get(dia.weekday(), [])
+            consultas_dia = consultas.get((medico_id, dia), [])
+            if janelas_dia or consultas_dia:
+                dias.append(AgendaPeriodoDia(
+                    data=dia,
+                    janelas=[JanelaAtendimento(hora_inicio=i, hora_fim=f) for i, f in janelas_dia],
+                    consultas=consultas_dia
+                ))
+            dia += timedelta(days=1)
+        resultado.append(AgendaPeriodoMedico(
+            medico_id=medico_id,
+            medico_nome=medico.nome,
+            especialidade=medico.especialidade,
+            dias=dias
+        ))
+
+    return AgendaPeriodo(data_inicio=data_inicio, data_fim=data_fim, medicos=resultado)
@@ -0,0 +1,111 @@
+"""
+Agendamento recorrente de consultas
+
+Expande a regra (semanal, quinzenal ou mensal; por quantidade ou até uma
+data) nas datas da série, verifica todas as ocorrências contra a agenda do
+médico numa única query (agenda.buscar_conflitos) e insere as livres num
+único INSERT com vários VALUES, atualizando o rollup diário com um upsert
+por dia, tudo na transação do chamador. Por padrão a série é tudo ou nada:
+havendo colisão, nenhuma ocorrência é gravada.
+"""
+import calendar
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from app.models.consulta import Consulta, StatusConsulta
+from app.schemas.consulta import (
+    ConsultaRecorrenteCreate, ConsultaRecorrenteResultado, FrequenciaRecorrencia,
+    OcorrenciaRecorrente, MAXIMO_OCORRENCIAS
+)
+from app.services import agenda, estatisticas_diarias
+
+_INTERVALO_DIAS = {
+    FrequenciaRecorrencia.SEMANAL: 7,
+    FrequenciaRecorrencia.QUINZENAL: 14,
+}
+
+
+def _somar_meses(data_hora: datetime, meses: int) -> datetime:
+    """Mesmo dia em `meses` meses depois (ou o último dia, se o mês for mais curto)"""
+    indice = data_hora.month - 1 + meses
+    ano, mes = data_hora.year + indice // 12, indice % 12 + 1
+    return data_hora.replace(year=ano, month=mes, day=min(data_hora.day, calendar.monthrange(ano, mes)[1]))
+
+
+def expandir_ocorrencias(
+    inicio: datetime,
+    frequencia: FrequenciaRecorrencia,
+    quantidade: Optional[int] = None,
+    ate: Optional[date] = None
+) -> List[datetime]:
+    """
+    Datas da série, começando em `inicio`.
+
+    ValueError se não for informado exatamente um entre quantidade e ate, ou
+    se a série passar de MAXIMO_OCORRENCIAS.
+    """
+    if (quantidade is None) == (ate is None):
+        raise ValueError("Informe a quantidade de ocorrências ou a data final da série (apenas um)")
+    if ate is not None and ate < inicio.date():
+        raise ValueError("A data final da série deve ser maior ou igual à da primeira consulta")
+
+    ocorrencias = []
+    while True:
+        n = len(ocorrencias)
+        if frequencia == FrequenciaRecorrencia.MENSAL:
+            data_hora = _somar_meses(inicio, n)
+        else:
+            data_hora = inicio + timedelta(days=_INTERVALO_DIAS[frequencia] * n)
+        if quantidade is not None and n >= quantidade:
+            break
+        if ate is not None and data_hora.date() > ate:
+            break
+        if n >= MAXIMO_OCORRENCIAS:
+            raise ValueError(f"A série deve ter no máximo {MAXIMO_OCORRENCIAS} ocorrências")
+        ocorrencias.append(data_hora)
+    return ocorrencias
+
+
+def agendar_recorrente(db: Session, dados: ConsultaRecorrenteCreate) -> ConsultaRecorrenteResultado:
+    """
+    Agendar a série (não faz commit; o chamador deve ter chamado
+    agenda.bloquear_agenda para o médico).
+
+    Sem `parcial`, nada é gravado se alguma ocorrência colidir; o resultado
+    informa as colisões (criadas == 0).
+    """
+    datas = expandir_ocorrencias(dados.data_hora, dados.frequencia, dados.quantidade, dados.ate)
+    conflitos = agenda.buscar_conflitos(db, dados.medico_id, [(d, dados.duracao) for d in datas])
+
+    ocorrencias = [
+        OcorrenciaRecorrente(data_hora=d, conflito_com=conflitos.get(i))
+        for i, d in enumerate(datas)
+    ]
+    livres = [o for o in ocorrencias if o.conflito_com is None]
+    if conflitos and not dados.parcial:
+        livres = []
+
+    if livres:
+        campos = dados.model_dump(include={"paciente_id", "medico_id", "duracao", "tipo", "observacoes"})
+        inseridas = db.execute(
+            insert(Consulta.__table__).values([
+                {**campos, "data_hora": o.data_hora, "status": StatusConsulta.AGENDADA}
+                for o in livres
+            ]).returning(Consulta.id, Consulta.data_hora)
+        ).all()
+
+        # A ordem do RETURNING não é garantida: as datas da série são únicas
+        por_data: Dict[datetime, OcorrenciaRecorrente] = {o.data_hora: o for o in livres}
+        for consulta_id, data_hora in inseridas:
+            por_data[data_hora].consulta_id = consulta_id
+        estatisticas_diarias.somar_consultas(db, [
+            (o.data_hora.date(), dados.medico_id, StatusConsulta.AGENDADA) for o in livres
+        ])
+
+    return ConsultaRecorrenteResultado(
+        total=len(ocorrencias),
+        criadas=len(livres),
+        conflitos=len(conflitos),
+        ocorrencias=ocorrencias
+    )
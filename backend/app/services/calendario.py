@@ -0,0 +1,202 @@
+"""
+Feed iCalendar (.ics) da agenda de cada médico
+
+O feed é acessado por um token secreto na URL (aplicativos de calendário não
+enviam o login). Os aplicativos consultam o feed a cada poucos minutos, e
+quase sempre nada mudou. Por isso o ETag é calculado numa única query: o
+médico do token (com o nome, que vai no título do calendário), a última
+alteração das suas consultas (índice ix_consultas_medico_id_alterado_em), a
+quantidade delas e a última alteração dos pacientes com consulta no período
+(os nomes vão nos eventos). Ele inclui também o dia e as semanas pedidas. Se o ETag confere com o If-None-Match, a rota
+responde 304 sem mais nenhuma query.
+
+O .ics é gerado do banco, numa única query (consultas do período pelo
+índice ix_consultas_medico_id_data_hora, com o nome do paciente), e fica no
+cache de respostas sob o próprio ETag. O índice de agenda em memória não é
+usado: ele pode estar atrasado em relação ao banco de onde saiu o ETag.
+Consultas canceladas saem do feed. Os horários são locais (floating time),
+como data_hora.
+"""
+import hashlib
+import secrets
+from datetime import datetime, date, time, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from app.models.user import User, UserRole
+from app.models.paciente import Paciente
+from app.models.consulta import Consulta, StatusConsulta, DURACAO_PADRAO_MINUTOS
+from app.services.sincronizacao import alterado_em
+
+# Status do evento no calendário (canceladas não entram no feed)
+_STATUS_EVENTO = {
+    StatusConsulta.AGENDADA: "TENTATIVE",
+    StatusConsulta.CONFIRMADA: "CONFIRMED",
+    StatusConsulta.REALIZADA: "CONFIRMED",
+}
+
+_TIPOS = {
+    "primeira_consulta": "Primeira consulta",
+    "retorno": "Retorno",
+    "exame": "Exame",
+}
+
+
+def gerar_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def buscar_medico(db: Session, token: str, inicio: datetime, fim: datetime):
+    """
+    (id, nome, ultima_alteracao, total, pacientes_alterados) do médico dono
+    do token, numa query; None se não houver. pacientes_alterados é a última
+    alteração dos pacientes com consulta em [inicio, fim).
+    """
+    alterado = alterado_em()
+    ultima_alteracao = select(func.max(alterado)).where(
+        Consulta.medico_id == User.id
+    ).correlate(User).scalar_subquery()
+    total = select(func.count(Consulta.id)).where(
+        Consulta.medico_id == User.id
+    ).correlate(User).scalar_subquery()
+    pacientes_alterados = select(
+        func.max(func.coalesce(Paciente.updated_at, Paciente.created_at))
+    ).join(
+        Consulta, Consulta.paciente_id == Paciente.id
+    ).where(
+        Consulta.medico_id == User.id,
+        Consulta.data_hora >= inicio,
+        Consulta.data_hora < fim
+    ).correlate(User).scalar_subquery()
+
+    return db.query(
+        User.id,
+        User.nome,
+        ultima_alteracao.label("ultima_alteracao"),
+        total.label("total"),
+        pacientes_alterados.label("pacientes_alterados")
+    ).filter(
+        User.token_calendario == token,
+        User.role == UserRole.MEDICO,
+        User.is_active == True
+    ).first()
+
+
+def periodo(data_inicio: date, semanas: int) -> Tuple[datetime, datetime]:
+    """[início, fim) do feed"""
+    inicio = datetime.combine(data_inicio, time.min)
+    return inicio, inicio + timedelta(weeks=semanas)
+
+
+def calcular_etag(medico, hoje: date, semanas: int) -> str:
+    """ETag forte do feed: muda quando algo que aparece no .ics muda, ou quando a janela anda"""
+    partes = [
+        medico.id,
+        medico.nome,
+        medico.ultima_alteracao.isoformat() if medico.ultima_alteracao else "-",
+        medico.total,
+        medico.pacientes_alterados.isoformat() if medico.pacientes_alterados else "-",
+        hoje,
+        semanas,
+    ]
+    base = "|".join(str(parte) for parte in partes)
+    return '"' + hashlib.sha256(base.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """Se o If-None-Match (lista, com ou sem W/) contém o ETag atual"""
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*":
+            return True
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == etag:
+            return True
+    return False
+
+
+def _escapar(texto: str) -> str:
+    """Escapar um valor TEXT (RFC 5545, 3.3.11)"""
+    return (
+        texto.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _dobrar(linha: str) -> str:
+    """Quebrar linhas com mais de 75 octetos (RFC 5545, 3.1)"""
+    dados = linha.encode("utf-8")
+    if len(dados) <= 75:
+        return linha
+    partes, atual, tamanho = [], "", 0
+    for caractere in linha:
+        octetos = len(caractere.encode("utf-8"))
+        if tamanho + octetos > (75 if not partes else 74):
+            partes.append(atual)
+            atual, tamanho = "", 0
+        atual += caractere
+        tamanho += octetos
+    partes.append(atual)
+    return "\r\n ".join(partes)
+
+
+def _formatar(instante: datetime) -> str:
+    return instante.strftime("%Y%m%dT%H%M%S")
+
+
+def _consultas_periodo(db: Session, medico_id: int, inicio: datetime, fim: datetime) -> List[Tuple[Consulta, Optional[str]]]:
+    """(consulta, nome do paciente) das consultas não canceladas do período, numa query"""
+    return db.query(Consulta, Paciente.nome).outerjoin(
+        Paciente, Paciente.id == Consulta.paciente_id
+    ).filter(
+        Consulta.medico_id == medico_id,
+        Consulta.data_hora >= inicio,
+        Consulta.data_hora < fim,
+        Consulta.status != StatusConsulta.CANCELADA
+    ).order_by(Consulta.data_hora, Consulta.id).all()
+
+
+def gerar_ics(db: Session, medico_id: int, medico_nome: str, data_inicio: date, semanas: int) -> str:
+    """Conteúdo .ics das consultas não canceladas de data_inicio até `semanas` depois"""
+    inicio, fim = periodo(data_inicio, semanas)
+    consultas = _consultas_periodo(db, medico_id, inicio, fim)
+    carimbo = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    linhas = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Clinica Medica//Agenda//PT-BR",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escapar(f'Agenda - {medico_nome}')}",
+        "REFRESH-INTERVAL;VALUE=DURATION:PT15M",
+        "X-PUBLISHED-TTL:PT15M",
+    ]
+    for consulta, paciente in consultas:
+        tipo = _TIPOS.get(getattr(consulta.tipo, "value", consulta.tipo), str(consulta.tipo))
+        paciente = paciente or f"Paciente {consulta.paciente_id}"
+        termino = consulta.data_hora + timedelta(minutes=consulta.duracao or DURACAO_PADRAO_MINUTOS)
+        alteracao = consulta.updated_at or consulta.created_at
+        linhas += [
+            "BEGIN:VEVENT",
+            f"UID:consulta-{consulta.id}@clinica-medica",
+            f"DTSTAMP:{carimbo}",
+            f"DTSTART:{_formatar(consulta.data_hora)}",
+            f"DTEND:{_formatar(termino)}",
+            f"SUMMARY:{_escapar(f'{tipo} - {paciente}')}",
+            f"STATUS:{_STATUS_EVENTO.get(consulta.status, 'CONFIRMED')}",
+        ]
+        if consulta.observacoes:
+            linhas.append(f"DESCRIPTION:{_escapar(consulta.observacoes)}")
+        if alteracao:
+            if alteracao.tzinfo is None:
+                # SQLite devolve a data sem fuso (gravada em UTC por now())
+                alteracao = alteracao.replace(tzinfo=timezone.utc)
+            linhas.append(f"LAST-MODIFIED:{alteracao.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}")
+        linhas.append("END:VEVENT")
+    linhas.append("END:VCALENDAR")
+
+    return "".join(_dobrar(linha) + "\r\n" for linha in linhas)
@@ -0,0 +1,279 @@
+"""
+Conciliação de extrato bancário com pagamentos pendentes
+
+Os pagamentos PENDENTES com vencimento (ou lançamento, se não houver
+vencimento) dentro do período do extrato, alargado pela janela de dias, são
+lidos numa única consulta e indexados por valor em centavos. Cada crédito do
+extrato consulta apenas o balde do seu valor:
+- candidatos fora da janela de datas são descartados;
+- o pagador é reconhecido pelo CPF (dígitos na descrição) ou pelo nome do
+  paciente; havendo pagador reconhecido, vence o melhor escore e, no
+  empate, a data mais próxima;
+- sem pagador reconhecido, só há conciliação se houver um único candidato.
+Cada pagamento é conciliado no máximo uma vez, e os lançados num mês já
+fechado não são alterados (a linha fica não conciliada). Os conciliados são
+marcados PAGO com UPDATEs em lote (um por até mil pagamentos), na transação
+do chamador.
+"""
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, NamedTuple
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, case, update
+from app.models.paciente import Paciente
+from app.models.pagamento import Pagamento, StatusPagamento
+from app.schemas.conciliacao import ConciliacaoResultado, LinhaConciliada, LinhaNaoConciliada
+from app.services import estatisticas_diarias, fechamento
+from app.services.extrato_bancario import LinhaExtrato, normalizar_texto
+
+_NAO_DIGITOS = re.compile(r"\D")
+# Palavras do nome que não identificam o pagador
+_PARTICULAS = {"da", "de", "do", "das", "dos", "e"}
+
+# Escore do reconhecimento do pagador
+ESCORE_CPF = 3
+ESCORE_NOME_COMPLETO = 2
+ESCORE_NOME_PARCIAL = 1
+
+# Pagamentos por UPDATE (o CASE da data de pagamento cresce com o lote)
+TAMANHO_LOTE_UPDATE = 1000
+
+
+class _Candidato(NamedTuple):
+    id: int
+    paciente_id: int
+    paciente_nome: str
+    tokens_nome: frozenset
+    cpf: str
+    data_referencia: object  # date
+    created_at: datetime
+    metodo_pagamento: object
+    valor: Decimal
+
+
+def _centavos(valor: Decimal) -> int:
+    return int((Decimal(valor) * 100).to_integral_value())
+
+
+def _tokens(texto: str) -> frozenset:
+    return frozenset(
+        palavra for palavra in normalizar_texto(texto).split()
+        if len(palavra) > 1 and palavra not in _PARTICULAS
+    )
+
+
+def _escore_pagador(candidato: _Candidato, digitos: str, tokens: frozenset) -> int:
+    if candidato.cpf and candidato.cpf in digitos:
+        return ESCORE_CPF
+    comuns = candidato.tokens_nome & tokens
+    if comuns and comuns == candidato.tokens_nome:
+        return ESCORE_NOME_COMPLETO
+    if len(comuns) >= 2:
+        return ESCORE_NOME_PARCIAL
+    return 0
+
+
+def _carregar_candidatos(db: Session, data_inicio, data_fim) -> Dict[int, List[_Candidato]]:
+    """Pagamentos pendentes do período indexados por valor em centavos"""
+    inicio_dt = datetime.combine(data_inicio, datetime.min.time())
+    fim_dt = datetime.combine(data_fim + timedelta(days=1), datetime.min.time())
+
+    linhas = db.query(
+        Pagamento.id,
+        Pagamento.paciente_id,
+        Paciente.nome,
+        Paciente.cpf,
+        Pagamento.data_vencimento,
+        Pagamento.created_at,
+        Pagamento.metodo_pagamento,
+        Pagamento.valor
+    ).join(
+        Paciente, Paciente.id == Pagamento.paciente_id
+    ).filter(
+        Pagamento.status == StatusPagamento.PENDENTE,
+        or_(
+            and_(
+                Pagamento.data_vencimento >= data_inicio,
+                Pagamento.data_vencimento <= data_fim
+            ),
+            and_(
+                Pagamento.data_vencimento.is_(None),
+                Pagamento.created_at >= inicio_dt,
+                Pagamento.created_at < fim_dt
+            )
+        )
+    ).all()
+
+    indice: Dict[int, List[_Candidato]] = {}
+    for linha in linhas:
+        indice.setdefault(_centavos(linha.valor), []).append(_Candidato(
+            id=linha.id,
+            paciente_id=linha.paciente_id,
+            paciente_nome=linha.nome,
+            tokens_nome=_tokens(linha.nome),
+            cpf=_NAO_DIGITOS.sub("", linha.cpf or ""),
+            data_referencia=linha.data_vencimento or linha.created_at.date(),
+            created_at=linha.created_at,
+            metodo_pagamento=linha.metodo_pagamento,
+            valor=linha.valor,
+        ))
+    return indice
+
+
+def _escolher(
+    candidatos: List[_Candidato],
+    linha: LinhaExtrato,
+    janela: timedelta
+) -> tuple:
+    """Devolver (candidato, motivo da recusa)"""
+    na_janela = [c for c in candidatos if abs(c.data_referencia - linha.data) <= janela]
+    if not na_janela:
+        return None, "Nenhum pagamento pendente com esse valor na janela de datas"
+
+    digitos = _NAO_DIGITOS.sub("", linha.descricao)
+    tokens = _tokens(linha.descricao)
+    pontuados = [(_escore_pagador(c, digitos, tokens), c) for c in na_janela]
+    melhor = max(escore for escore, _ in pontuados)
+
+    if melhor == 0:
+        if len(na_janela) == 1:
+            return na_janela[0], None
+        return None, "Mais de um pagamento pendente compatível e pagador não identificado"
+
+    return min(
+        (c for escore, c in pontuados if escore == melhor),
+        key=lambda c: (abs(c.data_referencia - linha.data), c.id)
+    ), None
+
+
+def conciliar(
+    db: Session,
+    linhas_extrato: Iterable[LinhaExtrato],
+    janela_dias: int = 3,
+    aplicar: bool = True
+) -> ConciliacaoResultado:
+    """Conciliar os créditos do extrato (não faz commit; aplicar=False apenas simula)"""
+    linhas_lidas = 0
+    debitos = 0
+    creditos: List[LinhaExtrato] = []
+    for linha in linhas_extrato:
+        linhas_lidas += 1
+        if linha.valor > 0:
+            creditos.append(linha)
+        else:
+            debitos += 1
+
+    conciliadas: List[LinhaConciliada] = []
+    nao_conciliadas: List[LinhaNaoConciliada] = []
+    escolhidos: List[tuple] = []  # (candidato, linha)
+
+    if creditos:
+        janela = timedelta(days=janela_dias)
+        indice = _carregar_candidatos(
+            db,
+            min(linha.data for linha in creditos) - janela,
+            max(linha.data for linha in creditos) + janela
+        )
+
+        # Pagamentos de meses fechados não concorrem: a escolha é feita entre
+        # os que podem mudar, e eles só servem para explicar a recusa
+        fechados = fechamento.meses_fechados(
+            db, {c.created_at.date() for candidatos in indice.values() for c in candidatos if c.created_at}
+        )
+        congelados: Dict[int, List[_Candidato]] = {}
+        if fechados:
+            for centavos, candidatos in indice.items():
+                abertos = []
+                for candidato in candidatos:
+                    if candidato.created_at and candidato.created_at.date().replace(day=1) in fechados:
+                        congelados.setdefault(centavos, []).append(candidato)
+                    else:
+                        abertos.append(candidato)
+                indice[centavos] = abertos
+
+        for linha in creditos:
+            candidato, motivo = _escolher(indice.get(_centavos(linha.valor), []), linha, janela)
+            if candidato is None and congelados.get(_centavos(linha.valor)):
+                congelado, _ = _escolher(congelados[_centavos(linha.valor)], linha, janela)
+                if congelado is not None:
+                    motivo = f"Pagamento {congelado.id} lançado num mês já fechado"
+            if candidato is None:
+                nao_conciliadas.append(LinhaNaoConciliada(
+                    linha=linha.numero,
+                    data=linha.data,
+                    valor=linha.valor,
+                    descricao=linha.descricao,
+                    documento=linha.documento,
+                    motivo=motivo
+                ))
+                continue
+
+            indice[_centavos(linha.valor)].remove(candidato)
+            escolhidos.append((candidato, linha))
+            conciliadas.append(LinhaConciliada(
+                linha=linha.numero,
+                data=linha.data,
+                valor=linha.valor,
+                descricao=linha.descricao,
+                pagamento_id=candidato.id,
+                paciente_id=candidato.paciente_id,
+                paciente_nome=candidato.paciente_nome
+            ))
+
+    if aplicar and escolhidos:
+        tabela = Pagamento.__table__
+        atualizados = set()
+        for inicio in range(0, len(escolhidos), TAMANHO_LOTE_UPDATE):
+            lote = escolhidos[inicio:inicio + TAMANHO_LOTE_UPDATE]
+            atualizados.update(db.execute(
+                update(tabela).where(
+                    tabela.c.id.in_([c.id for c, _ in lote]),
+                    tabela.c.status == StatusPagamento.PENDENTE
+                ).values(
+                    status=StatusPagamento.PAGO,
+                    data_pagamento=case(
+                        {c.id: datetime.combine(linha.data, datetime.min.time()) for c, linha in lote},
+                        value=tabela.c.id
+                    )
+                ).returning(tabela.c.id)
+            ).scalars())
+
+        # Pagamentos que deixaram de estar pendentes desde a leitura (outra
+        # requisição os alterou) não foram atualizados: a linha não é conciliada
+        if len(atualizados) < len(escolhidos):
+            pares = list(zip(escolhidos, conciliadas))
+            escolhidos = [par for par, _ in pares if par[0].id in atualizados]
+            conciliadas = [conciliada for par, conciliada in pares if par[0].id in atualizados]
+            nao_conciliadas += [
+                LinhaNaoConciliada(
+                    linha=linha.numero,
+                    data=linha.data,
+                    valor=linha.valor,
+                    descricao=linha.descricao,
+                    documento=linha.documento,
+                    motivo=f"Pagamento {candidato.id} deixou de estar pendente"
+                )
+                for (candidato, linha), _ in pares if candidato.id not in atualizados
+            ]
+
+        # Rollup: de (dia, PENDENTE, método) para (dia, PAGO, método)
+        for status_pagamento, sinal in ((StatusPagamento.PENDENTE, -1), (StatusPagamento.PAGO, 1)):
+            estatisticas_diarias.somar_pagamentos(
+                db,
+                (((c.created_at.date(), status_pagamento, c.metodo_pagamento), Decimal(c.valor))
+                 for c, _ in escolhidos if c.created_at is not None),
+                sinal
+            )
+
+    return ConciliacaoResultado(
+        linhas_lidas=linhas_lidas,
+        creditos=len(creditos),
+        debitos_ignorados=debitos,
+        conciliadas=len(conciliadas),
+        nao_conciliadas=len(nao_conciliadas),
+        valor_conciliado=sum((c.valor for c in conciliadas), Decimal("0")),
+        aplicado=aplicar,
+        itens_conciliados=conciliadas,
+        itens_nao_conciliados=nao_conciliadas
+    )
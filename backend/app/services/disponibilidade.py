@@ -0,0 +1,296 @@
+"""
+Horários livres dos médicos calculados com bitmaps
+
+O período consultado é dividido em fatias de RESOLUCAO_MINUTOS; a fatia i
+corresponde ao bit i de um inteiro Python. A grade de cada médico tem dois
+bitmaps:
+- aberto: fatias dentro dos HorarioDisponivel ativos do dia da semana;
+- livre: aberto menos as fatias ocupadas por consultas ativas.
+
+Uma consulta de duracao minutos cabe a partir da fatia i quando as
+k = ceil(duracao / RESOLUCAO_MINUTOS) fatias seguintes estão livres; o
+bitmap desses inícios sai de O(log k) operações de AND com deslocamento
+sobre o período inteiro, seja ele um dia ou um mês.
+"""
+import heapq
+import unicodedata
+from collections import defaultdict
+from datetime import datetime, date, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, cast, Integer, String
+from app.models.consulta import Consulta, DURACAO_MAXIMA_MINUTOS, DURACAO_PADRAO_MINUTOS
+from app.models.horario_disponivel import HorarioDisponivel, DiaSemana
+from app.services.agenda import STATUS_OCUPAM_HORARIO
+
+RESOLUCAO_MINUTOS = 5
+FATIAS_POR_DIA = 24 * 60 // RESOLUCAO_MINUTOS
+
+# Maior período aceito por consulta de disponibilidade
+MAXIMO_DIAS = 62
+
+# dia_semana é texto livre: aceitar os valores de DiaSemana, os nomes em
+# inglês (strftime('%A')) e os números do frontend (0 = domingo)
+_DIAS_SEMANA = {
+    DiaSemana.SEGUNDA.value: 0,
+    DiaSemana.TERCA.value: 1,
+    DiaSemana.QUARTA.value: 2,
+    DiaSemana.QUINTA.value: 3,
+    DiaSemana.SEXTA.value: 4,
+    DiaSemana.SABADO.value: 5,
+    DiaSemana.DOMINGO.value: 6,
+    "monday": 0,
+    "tuesday": 1,
+    "wednesday": 2,
+    "thursday": 3,
+    "friday": 4,
+    "saturday": 5,
+    "sunday": 6,
+    "1": 0,
+    "2": 1,
+    "3": 2,
+    "4": 3,
+    "5": 4,
+    "6": 5,
+    "0": 6,
+}
+
+
+def dia_da_semana(valor) -> Optional[int]:
+    """Converter HorarioDisponivel.dia_semana para date.weekday() (None se desconhecido)"""
+    texto = unicodedata.normalize("NFKD", str(valor).strip().lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.split("-")[0]  # "segunda-feira"
+    return _DIAS_SEMANA.get(texto)
+
+
+def _fatia_teto(minutos: float) -> int:
+    return -int(-minutos // RESOLUCAO_MINUTOS)
+
+
+def _inicios_com_sequencia(bitmap: int, k: int) -> int:
+    """Bits i tais que os bits i..i+k-1 de bitmap estão todos ligados"""
+    resultado = bitmap
+    largura = 1
+    while largura * 2 <= k:
+        resultado &= resultado >> largura
+        largura *= 2
+    if largura < k:
+        resultado &= resultado >> (k - largura)
+    return resultado
+
+
+def _sequencias(bitmap: int) -> Iterator[Tuple[int, int]]:
+    """Sequências máximas de bits ligados, como (início, fim exclusivo)"""
+    while bitmap:
+        inicio = (bitmap & -bitmap).bit_length() - 1
+        deslocado = bitmap >> inicio
+        tamanho = ((deslocado + 1) & ~deslocado).bit_length() - 1
+        yield inicio, inicio + tamanho
+        bitmap &= ~((1 << (inicio + tamanho)) - 1)
+
+
+def mascaras_semanais(horarios: Iterable[HorarioDisponivel]) -> Dict[int, int]:
+    """Fatias de atendimento de um dia, por date.weekday(), dos horários ativos"""
+    mascaras: Dict[int, int] = defaultdict(int)
+    for horario in horarios:
+        dia = dia_da_semana(horario.dia_semana)
+        if dia is None or horario.ativo is False:
+            continue
+        inicio = _fatia_teto(horario.hora_inicio.hour * 60 + horario.hora_inicio.minute)
+        fim = (horario.hora_fim.hour * 60 + horario.hora_fim.minute) // RESOLUCAO_MINUTOS
+        if fim > inicio:
+            mascaras[dia] |= ((1 << (fim - inicio)) - 1) << inicio
+    return dict(mascaras)
+
+
+class GradeDisponibilidade:
+    """Bitmaps de disponibilidade de um médico entre data_inicio e data_fim (inclusive)"""
+
+    def __init__(self, data_inicio: date, data_fim: date):
+        self.data_inicio = data_inicio
+        self.dias = (data_fim - data_inicio).days + 1
+        self.origem = datetime.combine(data_inicio, time.min)
+        self.aberto = 0
+        self.livre = 0
+
+    @property
+    def total_fatias(self) -> int:
+        return self.dias * FATIAS_POR_DIA
+
+    def abrir(self, mascaras: Dict[int, int]) -> "GradeDisponibilidade":
+        """Ligar as fatias de atendimento a partir das máscaras por dia da semana"""
+        for deslocamento in range(self.dias):
+            mascara = mascaras.get((self.data_inicio + timedelta(days=deslocamento)).weekday())
+            if mascara:
+                self.aberto |= mascara << (deslocamento * FATIAS_POR_DIA)
+        self.livre |= self.aberto
+        return self
+
+    def ocupar(self, intervalos: Iterable[Tuple[int, int]]) -> "GradeDisponibilidade":
+        """Desligar as fatias [início, fim) de cada intervalo ocupado"""
+        ocupado = 0
+        total = self.total_fatias
+        for inicio, fim in intervalos:
+            inicio, fim = max(inicio, 0), min(fim, total)
+            if fim > inicio:
+                ocupado |= ((1 << (fim - inicio)) - 1) << inicio
+        self.livre &= ~ocupado
+        return self
+
+    def fatias(self, data_hora: datetime, duracao: Optional[int]) -> Tuple[int, int]:
+        """Intervalo de fatias tocado por uma consulta"""
+        minutos = (data_hora - self.origem).total_seconds() / 60
+        return (
+            int(minutos // RESOLUCAO_MINUTOS),
+            _fatia_teto(minutos + (duracao or DURACAO_PADRAO_MINUTOS))
+        )
+
+    def inicios_livres(self, duracao: int) -> int:
+        """Bitmap das fatias em que começa um intervalo livre de `duracao` minutos"""
+        return _inicios_com_sequencia(self.livre, _fatia_teto(duracao))
+
+    def para_datetime(self, fatia: int) -> datetime:
+        return self.origem + timedelta(minutes=fatia * RESOLUCAO_MINUTOS)
+
+    def slots(
+        self,
+        duracao: int,
+        passo: Optional[int] = None,
+        apenas_livres: bool = False
+    ) -> Iterator[Tuple[datetime, bool]]:
+        """
+        Slots de `duracao` minutos a cada `passo` minutos (padrão: a própria
+        duração) contados do início de cada período de atendimento, com a
+        indicação de livre ou ocupado
+        """
+        k = _fatia_teto(duracao)
+        salto = max(_fatia_teto(passo or duracao), 1)
+        livres = self.inicios_livres(duracao)
+        for inicio, fim in _sequencias(self.aberto):
+            # Bits do período num inteiro pequeno: evita deslocar o bitmap inteiro a cada slot
+            janela = livres >> inicio
+            for posicao in range(0, fim - inicio - k + 1, salto):
+                livre = bool((janela >> posicao) & 1)
+                if livre or not apenas_livres:
+                    yield self.para_datetime(inicio + posicao), livre
+
+
+def _fatias_ocupadas(db: Session, origem: datetime):
+    """
+    Expressão SQL "inicio:fim" com as fatias tocadas pela consulta a partir de
+    origem, agregada por médico em um único texto
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        segundos = cast(func.extract("epoch", Consulta.data_hora - origem), Integer)
+    else:
+        segundos = cast(func.round(
+            (func.julianday(Consulta.data_hora) - func.julianday(origem.strftime("%Y-%m-%d %H:%M:%S"))) * 86400
+        ), Integer)
+    segundos_fatia = RESOLUCAO_MINUTOS * 60
+    duracao = func.coalesce(Consulta.duracao, DURACAO_PADRAO_MINUTOS) * 60
+    par = (
+        cast(segundos // segundos_fatia, String) + ":"
+        + cast((segundos + duracao + segundos_fatia - 1) // segundos_fatia, String)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        return func.string_agg(par, ",")
+    return func.group_concat(par, ",")
+
+
+def carregar_mascaras(db: Session, medico_ids: Sequence[int]) -> Dict[int, Dict[int, int]]:
+    """Máscaras semanais de atendimento de vários médicos numa única consulta"""
+    horarios: Dict[int, List[HorarioDisponivel]] = defaultdict(list)
+    for horario in db.query(HorarioDisponivel).filter(
+        HorarioDisponivel.medico_id.in_(medico_ids),
+        HorarioDisponivel.ativo == True
+    ).all():
+        horarios[horario.medico_id].append(horario)
+    return {medico_id: mascaras_semanais(lista) for medico_id, lista in horarios.items()}
+
+
+def carregar_grades(
+    db: Session,
+    medico_ids: Sequence[int],
+    data_inicio: date,
+    data_fim: date,
+    mascaras: Optional[Dict[int, Dict[int, int]]] = None
+) -> Dict[int, GradeDisponibilidade]:
+    """Grades de vários médicos com duas consultas (horários e consultas ativas do período)"""
+    if not medico_ids:
+        return {}
+    inicio = datetime.combine(data_inicio, time.min)
+    fim = datetime.combine(data_fim + timedelta(days=1), time.min)
+    if mascaras is None:
+        mascaras = carregar_mascaras(db, medico_ids)
+
+    # As fatias de cada consulta já vêm calculadas do banco, agregadas numa
+    # linha por médico: evita converter data_hora e montar uma linha por consulta
+    ocupacao: Dict[int, Iterable[Tuple[int, int]]] = {}
+    for medico_id, pares in db.execute(
+        select(Consulta.medico_id, _fatias_ocupadas(db, inicio)).where(
+            Consulta.medico_id.in_(medico_ids),
+            Consulta.status.in_(STATUS_OCUPAM_HORARIO),
+            # Mesmos limites de agenda.filtro_sobreposicao (índice (medico_id, data_hora))
+            Consulta.data_hora > inicio - timedelta(minutes=DURACAO_MAXIMA_MINUTOS),
+            Consulta.data_hora < fim
+        ).group_by(Consulta.medico_id)
+    ):
+        numeros = [int(numero) for numero in pares.replace(":", ",").split(",")]
+        ocupacao[medico_id] = zip(numeros[::2], numeros[1::2])
+
+    return {
+        medico_id: GradeDisponibilidade(data_inicio, data_fim)
+        .abrir(mascaras.get(medico_id, {}))
+        .ocupar(ocupacao.get(medico_id, ()))
+        for medico_id in medico_ids
+    }
+
+
+# Dias do primeiro bloco lido na busca dos primeiros horários: a resposta
+# costuma estar nos primeiros dias, então não vale ler o período inteiro.
+# Cada bloco seguinte tem o dobro de dias do anterior.
+DIAS_PRIMEIRO_BLOCO = 3
+
+
+def primeiros_horarios(
+    db: Session,
+    medico_ids: Sequence[int],
+    duracao: int,
+    data_inicio: date,
+    data_fim: date,
+    limite: int,
+    passo: Optional[int] = None,
+    depois_de: Optional[datetime] = None
+) -> List[Tuple[datetime, int]]:
+    """
+    Os `limite` primeiros slots livres entre todos os médicos, como
+    (início, medico_id), em ordem cronológica (empate pelo id do médico).
+
+    Os horários de atendimento são lidos uma vez e as consultas em blocos de
+    dias crescentes, uma query por bloco para todos os médicos; os slots
+    livres de cada médico já saem em ordem e são intercalados com
+    heapq.merge.
+    """
+    if not medico_ids:
+        return []
+    mascaras = carregar_mascaras(db, medico_ids)
+    resultado: List[Tuple[datetime, int]] = []
+    bloco_inicio = data_inicio
+    dias_bloco = DIAS_PRIMEIRO_BLOCO
+    while bloco_inicio <= data_fim and len(resultado) < limite:
+        bloco_fim = min(bloco_inicio + timedelta(days=dias_bloco - 1), data_fim)
+        grades = carregar_grades(db, medico_ids, bloco_inicio, bloco_fim, mascaras)
+
+        def livres(medico_id: int, grade: GradeDisponibilidade):
+            for inicio, _ in grade.slots(duracao, passo, apenas_livres=True):
+                if depois_de is None or inicio >= depois_de:
+                    yield inicio, medico_id
+
+        for slot in heapq.merge(*(livres(medico_id, grade) for medico_id, grade in grades.items())):
+            resultado.append(slot)
+            if len(resultado) >= limite:
+                break
+        bloco_inicio = bloco_fim + timedelta(days=1)
+        dias_bloco *= 2
+    return resultado
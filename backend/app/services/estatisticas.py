@@ -0,0 +1,107 @@
+"""
+Núcleo de agregação das estatísticas do dashboard
+
+Calcula, para um período arbitrário, uma granularidade e opcionalmente um
+médico, os totais, as séries de consultas e faturamento e o ranking de
+médicos. Tudo sai de no máximo três consultas agrupadas (duas sobre as
+tabelas de rollup), independentemente do tamanho do período ou do número
+de médicos.
+"""
+from typing import List, Optional
+from datetime import date
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_
+from app.models.user import User, UserRole
+from app.models.estatistica_diaria import EstatisticaDiariaConsulta
+from app.schemas.dashboard import EstatisticasPeriodo, Granularidade, MedicoTop
+from app.services import graficos
+from app.services.paralelo import executar_em_paralelo
+
+# Maior período (em dias) por granularidade: limita os pontos das séries e
+# as linhas lidas do rollup por requisição
+MAXIMO_DIAS = {
+    Granularidade.DIA: 366,
+    Granularidade.SEMANA: 3 * 366,
+    Granularidade.MES: 10 * 366,
+}
+
+
+def listar_medicos_top(
+    db: Session,
+    data_inicio: date,
+    data_fim: Optional[date] = None,
+    limite: int = 5
+) -> List[MedicoTop]:
+    """Médicos com mais consultas no período (data_fim=None: sem limite superior)"""
+    total = func.sum(EstatisticaDiariaConsulta.quantidade)
+    filtros = [
+        User.role == UserRole.MEDICO,
+        EstatisticaDiariaConsulta.data >= data_inicio,
+    ]
+    if data_fim:
+        filtros.append(EstatisticaDiariaConsulta.data <= data_fim)
+
+    medicos_top = db.query(
+        User.id,
+        User.nome,
+        User.especialidade,
+        total.label("total_consultas")
+    ).join(
+        EstatisticaDiariaConsulta, EstatisticaDiariaConsulta.medico_id == User.id
+    ).filter(
+        and_(*filtros)
+    ).group_by(
+        User.id, User.nome, User.especialidade
+    ).order_by(total.desc(), User.id).limit(limite).all()
+
+    return [
+        MedicoTop(
+            id=medico.id,
+            nome=medico.nome,
+            especialidade=medico.especialidade or "Sem especialidade",
+            total_consultas=medico.total_consultas
+        )
+        for medico in medicos_top
+    ]
+
+
+def calcular_estatisticas_periodo(
+    db: Session,
+    data_inicio: date,
+    data_fim: date,
+    granularidade: Granularidade = Granularidade.DIA,
+    medico_id: Optional[int] = None
+) -> EstatisticasPeriodo:
+    """Estatísticas de [data_inicio, data_fim] da clínica ou de um médico"""
+    secoes = {
+        "grafico_consultas": lambda sessao: graficos.grafico_consultas(
+            sessao, data_inicio, data_fim, granularidade, medico_id
+        ),
+        "grafico_faturamento": lambda sessao: graficos.grafico_faturamento(
+            sessao, data_inicio, data_fim, granularidade, medico_id
+        ),
+    }
+    # O ranking só faz sentido na visão da clínica
+    if not medico_id:
+        secoes["medicos_top"] = lambda sessao: listar_medicos_top(sessao, data_inicio, data_fim)
+
+    resultados, _ = executar_em_paralelo(db, secoes)
+    grafico_consultas = resultados["grafico_consultas"]
+    grafico_faturamento = resultados["grafico_faturamento"]
+
+    # Os totais do período são a soma dos buckets das séries
+    return EstatisticasPeriodo(
+        periodo_inicio=data_inicio,
+        periodo_fim=data_fim,
+        granularidade=granularidade,
+        medico_id=medico_id,
+        total_consultas=sum(ponto.total for ponto in grafico_consultas),
+        consultas_realizadas=sum(ponto.realizadas for ponto in grafico_consultas),
+        consultas_canceladas=sum(ponto.canceladas for ponto in grafico_consultas),
+        consultas_pendentes=sum(ponto.pendentes for ponto in grafico_consultas),
+        faturamento=sum((Decimal(ponto.valor) for ponto in grafico_faturamento), Decimal("0")),
+        medicos_top=resultados.get("medicos_top", []),
+        grafico_consultas=grafico_consultas,
+        grafico_faturamento=grafico_faturamento
+    )
@@ -0,0 +1,178 @@
+"""
+Manutenção das tabelas de rollup diário (estatisticas_diarias_*)
+
+As rotas de consultas e financeiro chamam atualizar_consulta/atualizar_pagamento
+na mesma transação da escrita, aplicando apenas a diferença entre o estado
+anterior e o novo do registro. reconstruir() recalcula um período inteiro a
+partir das tabelas brutas (backfill ou correção).
+"""
+from typing import Dict, Iterable, Optional, Tuple
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, insert, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models.consulta import Consulta
+from app.models.pagamento import Pagamento
+from app.models.estatistica_diaria import EstatisticaDiariaConsulta, EstatisticaDiariaPagamento
+
+ChaveConsulta = Tuple[date, int, str]
+ChavePagamento = Tuple[Tuple[date, str, str], Decimal]
+
+
+def _acumular(db: Session, modelo, chave: Dict, incrementos: Dict):
+    """Somar incrementos na linha identificada por chave, criando-a se necessário"""
+    dialeto = db.get_bind().dialect.name
+    tabela = modelo.__table__
+
+    if dialeto in ("postgresql", "sqlite"):
+        insert_dialeto = postgresql.insert if dialeto == "postgresql" else sqlite.insert
+        stmt = insert_dialeto(tabela).values(**chave, **incrementos)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(chave.keys()),
+            set_={
+                coluna: tabela.c[coluna] + stmt.excluded[coluna]
+                for coluna in incrementos
+            }
+        )
+        db.execute(stmt)
+        return
+
+    linha = db.get(modelo, tuple(chave.values()))
+    if linha is None:
+        db.add(modelo(**chave, **incrementos))
+    else:
+        for coluna, valor in incrementos.items():
+            setattr(linha, coluna, getattr(linha, coluna) + valor)
+
+
+def chave_consulta(consulta: Optional[Consulta]) -> Optional[ChaveConsulta]:
+    """Chave do rollup de uma consulta (dia, médico, status)"""
+    if consulta is None or consulta.data_hora is None or consulta.status is None:
+        return None
+    return (consulta.data_hora.date(), consulta.medico_id, consulta.status)
+
+
+def atualizar_consulta(db: Session, antes: Optional[ChaveConsulta], consulta: Optional[Consulta]):
+    """Aplicar no rollup a mudança de uma consulta (antes = chave_consulta antes da escrita)"""
+    depois = chave_consulta(consulta)
+    if antes == depois:
+        return
+
+    if antes:
+        dia, medico_id, status_consulta = antes
+        _acumular(db, EstatisticaDiariaConsulta,
+                  {"data": dia, "medico_id": medico_id, "status": status_consulta},
+                  {"quantidade": -1})
+    if depois:
+        dia, medico_id, status_consulta = depois
+        _acumular(db, EstatisticaDiariaConsulta,
+                  {"data": dia, "medico_id": medico_id, "status": status_consulta},
+                  {"quantidade": 1})
+
+
+def somar_consultas(db: Session, chaves: Iterable[ChaveConsulta], sinal: int = 1):
+    """Incluir (sinal=1) ou retirar (sinal=-1) do rollup várias consultas, com um upsert por chave"""
+    acumulado: Dict[ChaveConsulta, int] = {}
+    for chave in chaves:
+        acumulado[chave] = acumulado.get(chave, 0) + sinal
+
+    for (dia, medico_id, status_consulta), quantidade in acumulado.items():
+        _acumular(db, EstatisticaDiariaConsulta,
+                  {"data": dia, "medico_id": medico_id, "status": status_consulta},
+                  {"quantidade": quantidade})
+
+
+def chave_pagamento(pagamento: Optional[Pagamento]) -> Optional[ChavePagamento]:
+    """Chave do rollup de um pagamento ((dia de lançamento, status, método), valor)"""
+    if pagamento is None or pagamento.created_at is None or pagamento.status is None:
+        return None
+    return (
+        (pagamento.created_at.date(), pagamento.status, pagamento.metodo_pagamento),
+        Decimal(pagamento.valor)
+    )
+
+
+def atualizar_pagamento(db: Session, antes: Optional[ChavePagamento], pagamento: Optional[Pagamento]):
+    """Aplicar no rollup a mudança de um pagamento (antes = chave_pagamento antes da escrita)"""
+    depois = chave_pagamento(pagamento)
+    if antes == depois:
+        return
+
+    for snapshot, sinal in ((antes, -1), (depois, 1)):
+        if not snapshot:
+            continue
+        (dia, status_pagamento, metodo), valor = snapshot
+        _acumular(db, EstatisticaDiariaPagamento,
+                  {"data": dia, "status": status_pagamento, "metodo_pagamento": metodo},
+                  {"quantidade": sinal, "valor": sinal * valor})
+
+
+def somar_pagamentos(db: Session, chaves: Iterable[ChavePagamento], sinal: int = 1):
+    """
+    Incluir (sinal=1) ou retirar (sinal=-1) do rollup vários pagamentos,
+    com um upsert por (dia, status, método)
+    """
+    acumulado: Dict[Tuple[date, str, str], list] = {}
+    for (chave, valor) in chaves:
+        totais = acumulado.setdefault(chave, [0, Decimal("0")])
+        totais[0] += sinal
+        totais[1] += sinal * valor
+
+    for (dia, status_pagamento, metodo), (quantidade, valor) in acumulado.items():
+        _acumular(db, EstatisticaDiariaPagamento,
+                  {"data": dia, "status": status_pagamento, "metodo_pagamento": metodo},
+                  {"quantidade": quantidade, "valor": valor})
+
+
+def reconstruir(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> Tuple[int, int]:
+    """
+    Recalcular o rollup de [data_inicio, data_fim] (ou de todo o histórico)
+    a partir das tabelas brutas. Não faz commit.
+
+    Retorna a quantidade de linhas geradas (consultas, pagamentos).
+    """
+    def _periodo(coluna_bruta, coluna_rollup):
+        filtros_brutos, filtros_rollup = [], []
+        if data_inicio:
+            filtros_brutos.append(coluna_bruta >= datetime.combine(data_inicio, datetime.min.time()))
+            filtros_rollup.append(coluna_rollup >= data_inicio)
+        if data_fim:
+            filtros_brutos.append(coluna_bruta < datetime.combine(data_fim + timedelta(days=1), datetime.min.time()))
+            filtros_rollup.append(coluna_rollup <= data_fim)
+        return filtros_brutos, filtros_rollup
+
+    # Consultas
+    brutos, rollup = _periodo(Consulta.data_hora, EstatisticaDiariaConsulta.data)
+    db.execute(delete(EstatisticaDiariaConsulta).where(*rollup))
+
+    dia_consulta = func.date(Consulta.data_hora)
+    agrupadas = db.query(
+        dia_consulta, Consulta.medico_id, Consulta.status, func.count(Consulta.id)
+    ).filter(
+        and_(Consulta.status.isnot(None), *brutos)
+    ).group_by(dia_consulta, Consulta.medico_id, Consulta.status)
+    total_consultas = db.execute(
+        insert(EstatisticaDiariaConsulta).from_select(
+            ["data", "medico_id", "status", "quantidade"], agrupadas.statement
+        )
+    ).rowcount
+
+    # Pagamentos
+    brutos, rollup = _periodo(Pagamento.created_at, EstatisticaDiariaPagamento.data)
+    db.execute(delete(EstatisticaDiariaPagamento).where(*rollup))
+
+    dia_pagamento = func.date(Pagamento.created_at)
+    agrupados = db.query(
+        dia_pagamento, Pagamento.status, Pagamento.metodo_pagamento,
+        func.count(Pagamento.id), func.sum(Pagamento.valor)
+    ).filter(
+        and_(Pagamento.status.isnot(None), Pagamento.created_at.isnot(None), *brutos)
+    ).group_by(dia_pagamento, Pagamento.status, Pagamento.metodo_pagamento)
+    total_pagamentos = db.execute(
+        insert(EstatisticaDiariaPagamento).from_select(
+            ["data", "status", "metodo_pagamento", "quantidade", "valor"], agrupados.statement
+        )
+    ).rowcount
+
+    return total_consultas, total_pagamentos
@@ -0,0 +1,101 @@
+"""
+Exportação em streaming (CSV ou NDJSON)
+
+As linhas são lidas do banco em lotes por um cursor do lado do servidor
+(yield_per) e escritas na resposta à medida que chegam, então o uso de
+memória não depende do tamanho do período exportado. A leitura usa uma
+sessão própria, aberta sobre a mesma engine da sessão da requisição,
+porque a resposta continua sendo enviada depois que a rota retorna.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Iterator, List
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, Query
+
+
+class FormatoExportacao(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+_MEDIA_TYPES = {
+    FormatoExportacao.CSV: "text/csv",
+    FormatoExportacao.NDJSON: "application/x-ndjson",
+}
+
+TAMANHO_LOTE = 1000
+
+
+def _normalizar(valor):
+    """Converter enums, decimais e datas para valores serializáveis"""
+    if isinstance(valor, enum.Enum):
+        return valor.value
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _linhas(bind, montar_query: Callable[[Session], Query]) -> Iterator[dict]:
+    with Session(bind=bind) as sessao:
+        query = montar_query(sessao).execution_options(yield_per=TAMANHO_LOTE)
+        for linha in query:
+            yield {chave: _normalizar(valor) for chave, valor in linha._mapping.items()}
+
+
+def _gerar_csv(colunas: List[str], linhas: Iterator[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=colunas)
+    escritor.writeheader()
+    for i, linha in enumerate(linhas, 1):
+        escritor.writerow(linha)
+        if i % TAMANHO_LOTE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _gerar_ndjson(linhas: Iterator[dict]) -> Iterator[str]:
+    lote = []
+    for linha in linhas:
+        lote.append(json.dumps(linha, ensure_ascii=False))
+        if len(lote) == TAMANHO_LOTE:
+            yield "\n".join(lote) + "\n"
+            lote = []
+    if lote:
+        yield "\n".join(lote) + "\n"
+
+
+def exportar(
+    db: Session,
+    montar_query: Callable[[Session], Query],
+    formato: FormatoExportacao,
+    nome_arquivo: str
+) -> StreamingResponse:
+    """
+    Resposta em streaming com o resultado de montar_query(sessao).
+
+    montar_query deve devolver uma query de colunas (não de entidades), cujos
+    rótulos viram o cabeçalho do CSV ou as chaves do NDJSON.
+    """
+    bind = db.get_bind()
+    colunas = [coluna["name"] for coluna in montar_query(db).column_descriptions]
+    linhas = _linhas(bind, montar_query)
+
+    if formato == FormatoExportacao.CSV:
+        corpo = _gerar_csv(colunas, linhas)
+    else:
+        corpo = _gerar_ndjson(linhas)
+
+    return StreamingResponse(
+        corpo,
+        media_type=_MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}.{formato.value}"'}
+    )
@@ -0,0 +1,152 @@
+"""
+Leitura de extratos bancários (CSV e OFX)
+
+Os leitores percorrem o arquivo linha a linha e geram um LinhaExtrato por
+lançamento, sem carregar o arquivo inteiro na memória. Só os créditos
+interessam à conciliação; débitos também são gerados (valor negativo) para
+que o chamador possa contá-los.
+"""
+import codecs
+import csv
+import enum
+import io
+import re
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+from typing import BinaryIO, Iterator, NamedTuple, Optional, TextIO
+
+
+class FormatoExtrato(str, enum.Enum):
+    CSV = "csv"
+    OFX = "ofx"
+
+
+class LinhaExtrato(NamedTuple):
+    numero: int  # linha do arquivo (CSV) ou posição da transação (OFX)
+    data: date
+    valor: Decimal
+    descricao: str
+    documento: Optional[str] = None  # identificador do banco (FITID, nº do documento)
+
+
+class ErroExtrato(ValueError):
+    """Arquivo de extrato inválido"""
+
+
+# Cabeçalhos aceitos no CSV (comparados sem acento e em minúsculas)
+_COLUNAS_CSV = {
+    "data": ("data", "data lancamento", "data movimento", "date"),
+    "valor": ("valor", "valor (r$)", "amount"),
+    "descricao": ("descricao", "historico", "pagador", "nome", "memo", "description"),
+    "documento": ("documento", "id", "identificador", "fitid"),
+}
+
+_SEM_ACENTO = str.maketrans("áàâãäéèêëíìîïóòôõöúùûüç", "aaaaaeeeeiiiiooooouuuuc")
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sem acentos e com espaços simples"""
+    return " ".join((texto or "").lower().translate(_SEM_ACENTO).split())
+
+
+def _ler_data(texto: str) -> date:
+    texto = texto.strip()
+    for formato, tamanho in (("%d/%m/%Y", 10), ("%Y-%m-%d", 10), ("%d/%m/%y", 8), ("%Y%m%d", 8)):
+        try:
+            return datetime.strptime(texto[:tamanho], formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"data inválida: {texto!r}")
+
+
+def _ler_valor(texto: str) -> Decimal:
+    """Aceita 1234.56, 1.234,56 e 1234,56 (com ou sem R$)"""
+    texto = texto.strip().replace("R$", "").replace(" ", "")
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    try:
+        valor = Decimal(texto)
+    except InvalidOperation:
+        raise ValueError(f"valor inválido: {texto!r}")
+    # Decimal aceita "NaN" e "Infinity"
+    if not valor.is_finite():
+        raise ValueError(f"valor inválido: {texto!r}")
+    return valor
+
+
+def ler_csv(arquivo: TextIO) -> Iterator[LinhaExtrato]:
+    """Ler um extrato CSV com cabeçalho (separador ; ou , detectado pelo cabeçalho)"""
+    cabecalho = arquivo.readline()
+    if not cabecalho:
+        return
+    separador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+    nomes = [normalizar_texto(nome) for nome in next(csv.reader([cabecalho], delimiter=separador))]
+
+    posicoes = {}
+    for campo, aceitos in _COLUNAS_CSV.items():
+        for i, nome in enumerate(nomes):
+            if nome in aceitos:
+                posicoes[campo] = i
+                break
+    if "data" not in posicoes or "valor" not in posicoes:
+        raise ErroExtrato("O CSV precisa das colunas 'data' e 'valor'")
+
+    for numero, campos in enumerate(csv.reader(arquivo, delimiter=separador), 2):
+        if not any(campo.strip() for campo in campos):
+            continue
+        try:
+            yield LinhaExtrato(
+                numero=numero,
+                data=_ler_data(campos[posicoes["data"]]),
+                valor=_ler_valor(campos[posicoes["valor"]]),
+                descricao=campos[posicoes["descricao"]].strip() if "descricao" in posicoes else "",
+                documento=campos[posicoes["documento"]].strip() if "documento" in posicoes else None,
+            )
+        except (ValueError, IndexError) as e:
+            raise ErroExtrato(f"Linha {numero}: {e}")
+
+
+_TAG_OFX = re.compile(r"<(/?)([A-Z0-9.]+)>([^<\r\n]*)")
+
+
+def ler_ofx(arquivo: TextIO) -> Iterator[LinhaExtrato]:
+    """Ler as transações (<STMTTRN>) de um OFX, em SGML (v1) ou XML (v2)"""
+    transacao = None
+    numero = 0
+    for linha in arquivo:
+        for fechamento, tag, valor in _TAG_OFX.findall(linha):
+            if tag == "STMTTRN":
+                if not fechamento:
+                    transacao = {}
+                elif transacao is not None:
+                    numero += 1
+                    try:
+                        yield LinhaExtrato(
+                            numero=numero,
+                            data=_ler_data(transacao["DTPOSTED"]),
+                            valor=_ler_valor(transacao["TRNAMT"]),
+                            descricao=" ".join(
+                                transacao[campo] for campo in ("NAME", "MEMO") if transacao.get(campo)
+                            ),
+                            documento=transacao.get("FITID"),
+                        )
+                    except (KeyError, ValueError) as e:
+                        raise ErroExtrato(f"Transação {numero}: {e}")
+                    transacao = None
+            elif transacao is not None and not fechamento and valor.strip():
+                transacao[tag] = valor.strip()
+
+
+def ler_extrato(
+    arquivo: BinaryIO,
+    formato: FormatoExtrato,
+    codificacao: str = "utf-8"
+) -> Iterator[LinhaExtrato]:
+    """Ler um extrato binário (ex.: UploadFile.file) no formato indicado"""
+    # Bancos costumam exportar UTF-8 com BOM, que quebraria o cabeçalho
+    if codecs.lookup(codificacao).name == "utf-8":
+        codificacao = "utf-8-sig"
+    texto = io.TextIOWrapper(arquivo, encoding=codificacao, errors="replace", newline="")
+    if formato == FormatoExtrato.OFX:
+        return ler_ofx(texto)
+    return ler_csv(texto)
@@ -0,0 +1,106 @@
+"""
+Fechamento mensal
+
+Congela os números de um mês encerrado: os pagamentos lançados no mês
+agrupados por (status, método, médico) e os totais de despesas com
+vencimento no mês, por status e categoria. Um fechamento não é alterado
+depois de criado; o relatório financeiro passa a ler o mês do snapshot.
+
+Por isso, pagamentos lançados num mês fechado não podem mais mudar de valor,
+método ou status, nem ser excluídos (MesFechado); as rotas respondem 409.
+"""
+from datetime import datetime, date
+from decimal import Decimal
+from typing import Iterable, Optional, Set
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from app.models.despesa import Despesa, CategoriaDespesa, StatusDespesa
+from app.models.fechamento import FechamentoMensal
+from app.models.pagamento import StatusPagamento
+from app.schemas.dashboard import Granularidade
+from app.services.graficos import inicio_do_periodo, proximo_periodo
+from app.services.relatorio_financeiro import agrupar_pagamentos
+
+# Campos do pagamento congelados no snapshot
+CAMPOS_CONGELADOS = ("valor", "metodo_pagamento", "status")
+
+
+class MesFechado(ValueError):
+    """Alteração de um pagamento lançado num mês já fechado"""
+
+
+def meses_fechados(db: Session, datas: Iterable[date]) -> Set[date]:
+    """Meses (primeiro dia) já fechados entre os meses das datas, numa query"""
+    meses = {inicio_do_periodo(dia, Granularidade.MES) for dia in datas}
+    if not meses:
+        return set()
+    return {
+        linha[0] for linha in
+        db.query(FechamentoMensal.mes).filter(FechamentoMensal.mes.in_(meses)).all()
+    }
+
+
+def verificar_mes_aberto(db: Session, pagamento) -> None:
+    """MesFechado se o pagamento foi lançado num mês já fechado"""
+    if pagamento.created_at is None:
+        return
+    if meses_fechados(db, [pagamento.created_at.date()]):
+        raise MesFechado(
+            f"Pagamento lançado em {pagamento.created_at:%m/%Y}, mês já fechado"
+        )
+
+
+def fechar_mes(db: Session, mes: date, usuario_id: Optional[int] = None) -> FechamentoMensal:
+    """
+    Criar o fechamento do mês que contém `mes` (não faz commit).
+
+    ValueError se o mês ainda não terminou.
+    """
+    inicio = inicio_do_periodo(mes, Granularidade.MES)
+    fim = proximo_periodo(inicio, Granularidade.MES)
+    if fim > date.today():
+        raise ValueError("Só é possível fechar meses já encerrados")
+
+    linhas = agrupar_pagamentos(
+        db,
+        datetime.combine(inicio, datetime.min.time()),
+        datetime.combine(fim, datetime.min.time()),
+        por_medico=True
+    )
+    por_status = {s: Decimal("0") for s in StatusPagamento}
+    for linha in linhas:
+        # Pagamentos sem status entram nos totais por método, não nos por status
+        if linha.status is not None:
+            por_status[linha.status] += linha.valor
+
+    despesas = db.query(
+        Despesa.status,
+        Despesa.categoria,
+        func.sum(Despesa.valor).label("valor")
+    ).filter(
+        Despesa.data_vencimento >= inicio,
+        Despesa.data_vencimento < fim,
+        Despesa.status != StatusDespesa.CANCELADO
+    ).group_by(Despesa.status, Despesa.categoria).all()
+
+    despesas_por_status = {s: Decimal("0") for s in StatusDespesa}
+    despesas_por_categoria = {c.value: Decimal("0") for c in CategoriaDespesa}
+    for linha in despesas:
+        valor = Decimal(linha.valor or 0)
+        despesas_por_status[linha.status] += valor
+        despesas_por_categoria[linha.categoria.value] += valor
+
+    fechamento = FechamentoMensal(
+        mes=inicio,
+        total_recebido=por_status[StatusPagamento.PAGO],
+        total_pendente=por_status[StatusPagamento.PENDENTE],
+        total_cancelado=por_status[StatusPagamento.CANCELADO],
+        quantidade_pagamentos=sum(linha.quantidade for linha in linhas),
+        linhas_pagamentos=[linha.para_json() for linha in linhas],
+        total_despesas_pagas=despesas_por_status[StatusDespesa.PAGO],
+        total_despesas_pendentes=despesas_por_status[StatusDespesa.PENDENTE],
+        despesas_por_categoria={c: str(v) for c, v in despesas_por_categoria.items()},
+        fechado_por_id=usuario_id
+    )
+    db.add(fechamento)
+    return fechamento
@@ -0,0 +1,152 @@
+"""
+Fluxo de caixa mensal (entradas de pagamentos x saídas de despesas)
+
+Para cada mês do período:
+- realizado: pagamentos e despesas PAGOS, pela data de pagamento;
+- previsto: pagamentos e despesas PENDENTES, pela data de vencimento
+  (lançamentos pendentes sem vencimento ficam de fora);
+e os saldos acumulados realizado e previsto (realizado + pendente) a partir
+de um saldo inicial. Cancelados não entram no fluxo.
+
+Cada lado sai de uma única consulta agrupada por (mês, status[, categoria]).
+"""
+from typing import Dict, List
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, or_, case
+from app.models.pagamento import Pagamento, StatusPagamento
+from app.models.despesa import Despesa, CategoriaDespesa, StatusDespesa
+from app.schemas.dashboard import Granularidade
+from app.schemas.fluxo_caixa import FluxoCaixa, FluxoCaixaMes
+from app.services.graficos import truncar, para_data, inicio_do_periodo, proximo_periodo
+from app.services.paralelo import executar_em_paralelo
+
+ZERO = Decimal("0")
+
+
+def _agrupar_por_mes(
+    db: Session,
+    modelo,
+    status_pago,
+    status_pendente,
+    data_inicio: date,
+    data_fim: date,
+    coluna_extra=None
+) -> list:
+    """
+    Soma de `valor` por (mês, realizado?[, coluna_extra]) de pagamentos ou despesas.
+
+    O mês é o da data de pagamento para os pagos e o do vencimento para os
+    pendentes; os dois modelos têm as mesmas colunas para isso.
+    """
+    inicio_dt = datetime.combine(data_inicio, datetime.min.time())
+    fim_dt = datetime.combine(data_fim + timedelta(days=1), datetime.min.time())
+
+    realizado = modelo.status == status_pago
+    mes = truncar(
+        db,
+        case((realizado, modelo.data_pagamento), else_=modelo.data_vencimento),
+        Granularidade.MES
+    ).label("mes")
+    colunas = [mes, modelo.status]
+    if coluna_extra is not None:
+        colunas.append(coluna_extra)
+
+    return db.query(
+        *colunas,
+        func.sum(modelo.valor).label("valor")
+    ).filter(
+        or_(
+            and_(
+                realizado,
+                modelo.data_pagamento >= inicio_dt,
+                modelo.data_pagamento < fim_dt
+            ),
+            and_(
+                modelo.status == status_pendente,
+                modelo.data_vencimento >= data_inicio,
+                modelo.data_vencimento <= data_fim
+            )
+        )
+    ).group_by(*colunas).all()
+
+
+def calcular_fluxo_caixa(
+    db: Session,
+    data_inicio: date,
+    data_fim: date,
+    saldo_inicial: Decimal = ZERO
+) -> FluxoCaixa:
+    """Fluxo de caixa mês a mês de [data_inicio, data_fim]"""
+    resultados, _ = executar_em_paralelo(db, {
+        "entradas": lambda sessao: _agrupar_por_mes(
+            sessao, Pagamento, StatusPagamento.PAGO, StatusPagamento.PENDENTE,
+            data_inicio, data_fim
+        ),
+        "saidas": lambda sessao: _agrupar_por_mes(
+            sessao, Despesa, StatusDespesa.PAGO, StatusDespesa.PENDENTE,
+            data_inicio, data_fim, Despesa.categoria
+        ),
+    })
+
+    # (mês, realizado?) -> valor e (mês, realizado?) -> {categoria: valor}
+    entradas: Dict[tuple, Decimal] = {}
+    for linha in resultados["entradas"]:
+        chave = (para_data(linha.mes), linha.status == StatusPagamento.PAGO)
+        entradas[chave] = entradas.get(chave, ZERO) + Decimal(linha.valor or 0)
+
+    saidas: Dict[tuple, Dict[str, Decimal]] = {}
+    for linha in resultados["saidas"]:
+        chave = (para_data(linha.mes), linha.status == StatusDespesa.PAGO)
+        por_categoria = saidas.setdefault(chave, {})
+        categoria = linha.categoria.value
+        por_categoria[categoria] = por_categoria.get(categoria, ZERO) + Decimal(linha.valor or 0)
+
+    meses: List[FluxoCaixaMes] = []
+    saldo_realizado = saldo_previsto = Decimal(saldo_inicial)
+    atual = inicio_do_periodo(data_inicio, Granularidade.MES)
+    while atual <= data_fim:
+        entradas_realizadas = entradas.get((atual, True), ZERO)
+        entradas_previstas = entradas.get((atual, False), ZERO)
+        saidas_realizadas_cat = saidas.get((atual, True), {})
+        saidas_previstas_cat = saidas.get((atual, False), {})
+        saidas_realizadas = sum(saidas_realizadas_cat.values(), ZERO)
+        saidas_previstas = sum(saidas_previstas_cat.values(), ZERO)
+
+        resultado_realizado = entradas_realizadas - saidas_realizadas
+        resultado_previsto = resultado_realizado + entradas_previstas - saidas_previstas
+        saldo_realizado += resultado_realizado
+        saldo_previsto += resultado_previsto
+
+        meses.append(FluxoCaixaMes(
+            mes=atual.strftime("%Y-%m"),
+            entradas_realizadas=entradas_realizadas,
+            entradas_previstas=entradas_previstas,
+            saidas_realizadas=saidas_realizadas,
+            saidas_previstas=saidas_previstas,
+            saidas_realizadas_por_categoria={
+                c.value: saidas_realizadas_cat.get(c.value, ZERO) for c in CategoriaDespesa
+            },
+            saidas_previstas_por_categoria={
+                c.value: saidas_previstas_cat.get(c.value, ZERO) for c in CategoriaDespesa
+            },
+            resultado_realizado=resultado_realizado,
+            resultado_previsto=resultado_previsto,
+            saldo_realizado=saldo_realizado,
+            saldo_previsto=saldo_previsto
+        ))
+        atual = proximo_periodo(atual, Granularidade.MES)
+
+    return FluxoCaixa(
+        periodo_inicio=data_inicio,
+        periodo_fim=data_fim,
+        saldo_inicial=saldo_inicial,
+        total_entradas_realizadas=sum((m.entradas_realizadas for m in meses), ZERO),
+        total_entradas_previstas=sum((m.entradas_previstas for m in meses), ZERO),
+        total_saidas_realizadas=sum((m.saidas_realizadas for m in meses), ZERO),
+        total_saidas_previstas=sum((m.saidas_previstas for m in meses), ZERO),
+        saldo_final_realizado=saldo_realizado,
+        saldo_final_previsto=saldo_previsto,
+        meses=meses
+    )
@@ -0,0 +1,251 @@
+from typing import Dict, List, Optional, Sequence
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, case, Date
+from sqlalchemy.sql.elements import ColumnElement
+from app.models.consulta import StatusConsulta
+from app.models.pagamento import Pagamento, StatusPagamento
+from app.models.estatistica_diaria import EstatisticaDiariaConsulta, EstatisticaDiariaPagamento
+from app.schemas.dashboard import GraficoConsultas, GraficoFaturamento, Granularidade
+from app.schemas.pagamento import GraficoFinanceiro
+
+# Unidades do date_trunc do PostgreSQL e modificadores do date() do SQLite
+_UNIDADE_POSTGRES = {
+    Granularidade.DIA: "day",
+    Granularidade.SEMANA: "week",
+    Granularidade.MES: "month",
+}
+_MODIFICADORES_SQLITE = {
+    Granularidade.DIA: (),
+    Granularidade.SEMANA: ("weekday 0", "-6 days"),
+    Granularidade.MES: ("start of month",),
+}
+
+
+def truncar(db: Session, coluna, granularidade: Granularidade = Granularidade.DIA):
+    """Expressão que agrupa uma coluna de data/hora por dia, semana (ISO) ou mês, conforme o banco"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(_UNIDADE_POSTGRES[granularidade], coluna)
+    return func.date(coluna, *_MODIFICADORES_SQLITE[granularidade])
+
+
+def truncar_dia(db: Session, coluna):
+    """Expressão que agrupa uma coluna de data/hora por dia, conforme o banco"""
+    return truncar(db, coluna, Granularidade.DIA)
+
+
+def para_data(valor) -> date:
+    """Normalizar o valor do bucket (datetime, date ou string) para date"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(str(valor)[:10], "%Y-%m-%d").date()
+
+
+def inicio_do_periodo(dia: date, granularidade: Granularidade) -> date:
+    """Primeiro dia do bucket que contém dia (semanas começam na segunda-feira)"""
+    if granularidade == Granularidade.SEMANA:
+        return dia - timedelta(days=dia.weekday())
+    if granularidade == Granularidade.MES:
+        return dia.replace(day=1)
+    return dia
+
+
+def proximo_periodo(inicio: date, granularidade: Granularidade) -> date:
+    """Primeiro dia do bucket seguinte"""
+    if granularidade == Granularidade.SEMANA:
+        return inicio + timedelta(days=7)
+    if granularidade == Granularidade.MES:
+        return (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return inicio + timedelta(days=1)
+
+
+def contar_se(condicao) -> ColumnElement:
+    """Contagem condicional (equivalente a COUNT(*) FILTER (WHERE ...))"""
+    return func.sum(case((condicao, 1), else_=0))
+
+
+def somar_se(coluna, condicao) -> ColumnElement:
+    """Soma condicional de uma coluna"""
+    return func.sum(case((condicao, coluna), else_=0))
+
+
+def serie_temporal(
+    db: Session,
+    coluna_data,
+    agregados: Dict[str, ColumnElement],
+    data_inicio: date,
+    data_fim: date,
+    granularidade: Granularidade = Granularidade.DIA,
+    filtros: Sequence = ()
+) -> List[tuple]:
+    """
+    Montar uma série temporal com uma única consulta agrupada.
+
+    Retorna uma lista de (início do bucket, valores) cobrindo o período
+    [data_inicio, data_fim]; os buckets sem registros são preenchidos em
+    Python com None. Colunas do tipo Date (tabelas de rollup) agrupadas por
+    dia não precisam de truncamento.
+    """
+    if isinstance(coluna_data.type, Date):
+        inicio, fim = data_inicio, data_fim + timedelta(days=1)
+    else:
+        inicio = datetime.combine(data_inicio, datetime.min.time())
+        fim = datetime.combine(data_fim + timedelta(days=1), datetime.min.time())
+
+    if isinstance(coluna_data.type, Date) and granularidade == Granularidade.DIA:
+        bucket = coluna_data.label("bucket")
+    else:
+        bucket = truncar(db, coluna_data, granularidade).label("bucket")
+    nomes = list(agregados.keys())
+
+    linhas = db.query(
+        bucket,
+        *[expr.label(nome) for nome, expr in agregados.items()]
+    ).filter(
+        and_(
+            coluna_data >= inicio,
+            coluna_data < fim,
+            *filtros
+        )
+    ).group_by(bucket).all()
+
+    por_bucket = {
+        para_data(linha[0]): dict(zip(nomes, linha[1:]))
+        for linha in linhas
+    }
+    vazio = dict.fromkeys(nomes)
+
+    serie = []
+    atual = inicio_do_periodo(data_inicio, granularidade)
+    while atual <= data_fim:
+        serie.append((atual, por_bucket.get(atual, vazio)))
+        atual = proximo_periodo(atual, granularidade)
+    return serie
+
+
+def serie_diaria(
+    db: Session,
+    coluna_data,
+    agregados: Dict[str, ColumnElement],
+    data_inicio: date,
+    dias: int,
+    filtros: Sequence = ()
+) -> List[tuple]:
+    """Série diária de `dias` dias a partir de data_inicio (ver serie_temporal)"""
+    return serie_temporal(
+        db, coluna_data, agregados, data_inicio,
+        data_inicio + timedelta(days=dias - 1), Granularidade.DIA, filtros
+    )
+
+
+def grafico_consultas(
+    db: Session,
+    data_inicio: date,
+    data_fim: date,
+    granularidade: Granularidade = Granularidade.DIA,
+    medico_id: Optional[int] = None
+) -> List[GraficoConsultas]:
+    """Consultas por período (total, realizadas, canceladas e pendentes), lidas do rollup diário"""
+    filtros = []
+    if medico_id:
+        filtros.append(EstatisticaDiariaConsulta.medico_id == medico_id)
+
+    quantidade = EstatisticaDiariaConsulta.quantidade
+    status_consulta = EstatisticaDiariaConsulta.status
+    serie = serie_temporal(
+        db,
+        EstatisticaDiariaConsulta.data,
+        {
+            "total": func.sum(quantidade),
+            "realizadas": somar_se(quantidade, status_consulta == StatusConsulta.REALIZADA),
+            "canceladas": somar_se(quantidade, status_consulta == StatusConsulta.CANCELADA),
+            "pendentes": somar_se(
+                quantidade,
+                status_consulta.in_([StatusConsulta.AGENDADA, StatusConsulta.CONFIRMADA])
+            ),
+        },
+        data_inicio,
+        data_fim,
+        granularidade,
+        filtros
+    )
+
+    return [
+        GraficoConsultas(
+            data=inicio.strftime("%Y-%m-%d"),
+            total=valores["total"] or 0,
+            realizadas=valores["realizadas"] or 0,
+            canceladas=valores["canceladas"] or 0,
+            pendentes=valores["pendentes"] or 0
+        )
+        for inicio, valores in serie
+    ]
+
+
+def grafico_faturamento(
+    db: Session,
+    data_inicio: date,
+    data_fim: date,
+    granularidade: Granularidade = Granularidade.DIA,
+    medico_id: Optional[int] = None
+) -> List[GraficoFaturamento]:
+    """Faturamento recebido por período (pela data de pagamento)"""
+    filtros = [Pagamento.status == StatusPagamento.PAGO]
+    if medico_id:
+        filtros.append(Pagamento.medico_id == medico_id)
+
+    serie = serie_temporal(
+        db,
+        Pagamento.data_pagamento,
+        {"valor": func.sum(Pagamento.valor)},
+        data_inicio,
+        data_fim,
+        granularidade,
+        filtros
+    )
+
+    return [
+        GraficoFaturamento(
+            data=inicio.strftime("%Y-%m-%d"),
+            valor=valores["valor"] or 0
+        )
+        for inicio, valores in serie
+    ]
+
+
+def grafico_financeiro(
+    db: Session,
+    data_inicio: date,
+    data_fim: date,
+    granularidade: Granularidade = Granularidade.DIA
+) -> List[GraficoFinanceiro]:
+    """Valores recebidos e pendentes por período (pela data de criação), lidos do rollup diário"""
+    valor = EstatisticaDiariaPagamento.valor
+    status_pagamento = EstatisticaDiariaPagamento.status
+    serie = serie_temporal(
+        db,
+        EstatisticaDiariaPagamento.data,
+        {
+            "recebido": somar_se(valor, status_pagamento == StatusPagamento.PAGO),
+            "pendente": somar_se(valor, status_pagamento == StatusPagamento.PENDENTE),
+        },
+        data_inicio,
+        data_fim,
+        granularidade
+    )
+
+    grafico = []
+    for inicio, valores in serie:
+        recebido = Decimal(valores["recebido"] or 0)
+        pendente = Decimal(valores["pendente"] or 0)
+        grafico.append(GraficoFinanceiro(
+            data=inicio.strftime("%Y-%m-%d"),
+            recebido=recebido,
+            pendente=pendente,
+            total=recebido + pendente
+        ))
+
+    return grafico
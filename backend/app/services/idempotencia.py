@@ -0,0 +1,87 @@
+"""
+Respostas guardadas para o cabeçalho Idempotency-Key
+
+O cliente envia uma chave única por operação; a resposta de sucesso é
+gravada na mesma transação da operação e, se a requisição for repetida com
+a mesma chave (ex.: nova tentativa depois de um timeout), a resposta
+guardada é devolvida sem executar nada de novo. A chave pertence ao usuário
+que a usou: a mesma chave vinda de outro usuário, com outra rota ou com outro
+corpo é um erro do cliente (ValueError), e a resposta guardada nunca é
+devolvida a outro usuário. As chaves valem settings.idempotencia_validade_horas.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.chave_idempotencia import ChaveIdempotencia
+
+# Cabeçalho marcando as respostas repetidas a partir do registro guardado
+CABECALHO_REPETICAO = "Idempotent-Replayed"
+
+
+def hash_requisicao(corpo: Any) -> str:
+    """sha256 do corpo da requisição (JSON com as chaves ordenadas)"""
+    return hashlib.sha256(
+        json.dumps(corpo, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _limite_validade() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(hours=settings.idempotencia_validade_horas)
+
+
+def buscar(
+    db: Session,
+    chave: str,
+    rota: str,
+    hash_corpo: str,
+    usuario_id: Optional[int] = None
+) -> Optional[ChaveIdempotencia]:
+    """
+    Resposta guardada para a chave, se houver e ainda for válida.
+
+    ValueError se a chave já foi usada por outro usuário, com outra rota ou
+    com outro corpo.
+    """
+    registro = db.query(ChaveIdempotencia).filter(ChaveIdempotencia.chave == chave).first()
+    if registro is None:
+        return None
+    criado_em = registro.criado_em
+    if criado_em is not None and criado_em.tzinfo is None:
+        # SQLite devolve a data sem fuso (gravada em UTC por now())
+        criado_em = criado_em.replace(tzinfo=timezone.utc)
+    if criado_em is not None and criado_em < _limite_validade():
+        db.delete(registro)
+        db.flush()
+        return None
+    if registro.usuario_id != usuario_id or registro.rota != rota or registro.hash_requisicao != hash_corpo:
+        raise ValueError("Idempotency-Key já usada em outra requisição")
+    return registro
+
+
+def registrar(
+    db: Session,
+    chave: str,
+    rota: str,
+    hash_corpo: str,
+    status_code: int,
+    resposta: Any,
+    usuario_id: Optional[int] = None
+) -> ChaveIdempotencia:
+    """Guardar a resposta da operação (não faz commit) e descartar chaves vencidas"""
+    db.query(ChaveIdempotencia).filter(
+        ChaveIdempotencia.criado_em < _limite_validade()
+    ).delete(synchronize_session=False)
+    registro = ChaveIdempotencia(
+        chave=chave,
+        rota=rota,
+        hash_requisicao=hash_corpo,
+        usuario_id=usuario_id,
+        status_code=status_code,
+        resposta=resposta
+    )
+    db.add(registro)
+    db.flush()
+    return registro
@@ -0,0 +1,136 @@
+"""
+Inadimplência agregada no banco
+
+Os pagamentos pendentes vencidos são agrupados por paciente numa única
+consulta (soma, quantidade, último vencimento e faixas de atraso). A lista é
+ordenada pelo total devido (maior primeiro) e paginada por keyset sobre
+(total devido, paciente_id), de modo que cada página custa o mesmo
+independentemente da posição.
+"""
+import base64
+from typing import Optional, Tuple
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, or_, Numeric
+from app.models.paciente import Paciente
+from app.models.pagamento import Pagamento, StatusPagamento
+from app.schemas.pagamento import FaixasAtraso, Inadimplencia, InadimplenciaList
+from app.services.graficos import somar_se
+
+# Faixas de atraso (em dias, inclusivas): 0–30, 31–60, 61–90 e acima de 90
+FAIXAS_ATRASO = (
+    ("ate_30", 0, 30),
+    ("de_31_a_60", 31, 60),
+    ("de_61_a_90", 61, 90),
+    ("acima_90", 91, None),
+)
+
+
+def codificar_cursor(total_devendo: Decimal, paciente_id: int) -> str:
+    """Cursor opaco da posição (total devido, paciente_id) do último item da página"""
+    return base64.urlsafe_b64encode(f"{total_devendo}:{paciente_id}".encode()).decode()
+
+
+def decodificar_cursor(cursor: str) -> Tuple[Decimal, int]:
+    """Inverso de codificar_cursor; ValueError se o cursor for inválido"""
+    try:
+        total, paciente_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return Decimal(total), int(paciente_id)
+    except (ValueError, InvalidOperation, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+
+
+def _faixas(hoje: date) -> dict:
+    """Somas condicionais do valor por faixa de atraso (pela data de vencimento)"""
+    agregados = {}
+    for nome, minimo, maximo in FAIXAS_ATRASO:
+        condicao = Pagamento.data_vencimento <= hoje - timedelta(days=minimo)
+        if maximo is not None:
+            condicao = and_(condicao, Pagamento.data_vencimento >= hoje - timedelta(days=maximo))
+        agregados[nome] = somar_se(Pagamento.valor, condicao)
+    return agregados
+
+
+def _montar_faixas(linha) -> FaixasAtraso:
+    return FaixasAtraso(**{
+        nome: Decimal(getattr(linha, nome) or 0) for nome, _, _ in FAIXAS_ATRASO
+    })
+
+
+def listar_inadimplencia(
+    db: Session,
+    dias_atraso_minimo: int = 1,
+    limite: int = 100,
+    cursor: Optional[str] = None
+) -> InadimplenciaList:
+    """Pacientes com pagamentos pendentes vencidos, do maior para o menor total devido"""
+    hoje = date.today()
+    filtros = [
+        Pagamento.status == StatusPagamento.PENDENTE,
+        Pagamento.data_vencimento < hoje - timedelta(days=dias_atraso_minimo),
+    ]
+    faixas = _faixas(hoje)
+
+    # Arredondado para que o valor do cursor compare por igualdade também no SQLite
+    total_devendo = func.round(func.sum(Pagamento.valor), 2, type_=Numeric(12, 2))
+
+    query = db.query(
+        Pagamento.paciente_id,
+        Paciente.nome.label("paciente_nome"),
+        total_devendo.label("total_devendo"),
+        func.count(Pagamento.id).label("quantidade_pendente"),
+        func.max(Pagamento.data_vencimento).label("ultimo_vencimento"),
+        *[expr.label(nome) for nome, expr in faixas.items()]
+    ).join(
+        Paciente, Paciente.id == Pagamento.paciente_id
+    ).filter(
+        and_(*filtros)
+    ).group_by(
+        Pagamento.paciente_id, Paciente.nome
+    )
+
+    if cursor:
+        total_cursor, paciente_cursor = decodificar_cursor(cursor)
+        query = query.having(or_(
+            total_devendo < total_cursor,
+            and_(total_devendo == total_cursor, Pagamento.paciente_id > paciente_cursor)
+        ))
+
+    # Um item a mais indica se existe próxima página
+    linhas = query.order_by(
+        total_devendo.desc(), Pagamento.paciente_id
+    ).limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo_cursor = codificar_cursor(linhas[-1].total_devendo, linhas[-1].paciente_id)
+
+    itens = [
+        Inadimplencia(
+            paciente_id=linha.paciente_id,
+            paciente_nome=linha.paciente_nome,
+            total_devendo=linha.total_devendo,
+            quantidade_pendente=linha.quantidade_pendente,
+            ultimo_vencimento=linha.ultimo_vencimento,
+            dias_atraso=(hoje - linha.ultimo_vencimento).days,
+            faixas=_montar_faixas(linha)
+        )
+        for linha in linhas
+    ]
+
+    # Totais de todos os inadimplentes (não apenas da página)
+    geral = db.query(
+        func.sum(Pagamento.valor).label("total"),
+        func.count(func.distinct(Pagamento.paciente_id)).label("quantidade_pacientes"),
+        *[expr.label(nome) for nome, expr in faixas.items()]
+    ).filter(and_(*filtros)).one()
+
+    return InadimplenciaList(
+        items=itens,
+        total=Decimal(geral.total or 0),
+        quantidade_pacientes=geral.quantidade_pacientes,
+        faixas=_montar_faixas(geral),
+        proximo_cursor=proximo_cursor
+    )
@@ -0,0 +1,323 @@
+"""
+Índice em memória da agenda próxima de cada médico
+
+Cada processo mantém, por médico, as consultas das próximas
+settings.agenda_indice_semanas semanas ordenadas por data_hora (listas
+paralelas consultadas com bisect, substituídas por cópias a cada alteração), as máscaras semanais de atendimento e os
+dados do médico. A entrada é carregada na primeira leitura (três queries) e
+depois serve a agenda do dia e os horários disponíveis sem ir ao banco.
+
+Consistência:
+- a rota que altera uma consulta chama registrar() depois do commit, o que
+  atualiza o índice local e publica o médico no canal Redis
+  settings.agenda_indice_canal;
+- os outros workers escutam o canal numa thread e descartam a entrada do
+  médico, que é recarregada na próxima leitura;
+- ao (re)conectar no canal todas as entradas são descartadas, pois
+  mensagens podem ter sido perdidas; sem o canal, uma entrada vale só
+  settings.agenda_indice_ttl_sem_redis segundos;
+- cada médico tem um número de versão incrementado a cada alteração: uma
+  carga que começou antes de uma alteração não é guardada.
+
+A verificação de conflito ao gravar continua no banco (agenda.buscar_conflito),
+que enxerga os commits dos outros workers antes de a invalidação chegar.
+"""
+import bisect
+import logging
+import os
+import threading
+import time as relogio
+import uuid
+from datetime import datetime, date, time, timedelta
+from typing import Dict, List, Optional, Tuple
+import redis
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.logs import LogLimitado
+from app.models.consulta import Consulta, DURACAO_MAXIMA_MINUTOS
+from app.models.horario_disponivel import HorarioDisponivel
+from app.models.user import User, UserRole
+from app.schemas.consulta import Consulta as ConsultaSchema
+from app.services.agenda import STATUS_OCUPAM_HORARIO
+from app.services.disponibilidade import GradeDisponibilidade, dia_da_semana, mascaras_semanais
+
+logger = logging.getLogger(__name__)
+log_limitado = LogLimitado(logger)
+
+# Mensagem do canal que descarta todos os médicos
+TODOS = "*"
+
+
+class AgendaMedicoIndice:
+    """Agenda de um médico entre inicio e fim (inclusive), como carregada do banco"""
+
+    def __init__(
+        self,
+        medico: User,
+        horarios: List[HorarioDisponivel],
+        consultas: List[Consulta],
+        inicio: date,
+        fim: date
+    ):
+        self.medico_id = medico.id
+        self.medico_nome = medico.nome
+        self.especialidade = medico.especialidade
+        self.inicio = inicio
+        self.fim = fim
+        self.carregado_em = relogio.monotonic()
+        self.mascaras = mascaras_semanais(horarios)
+        self.horarios: Dict[int, List[Tuple[time, time]]] = {}
+        for horario in horarios:
+            dia = dia_da_semana(horario.dia_semana)
+            if dia is not None and horario.ativo is not False:
+                self.horarios.setdefault(dia, []).append((horario.hora_inicio, horario.hora_fim))
+        ordenadas = sorted(consultas, key=lambda c: (c.data_hora, c.id))
+        # (chaves, consultas): listas paralelas trocadas juntas, numa atribuição,
+        # por aplicar(); os leitores pegam o par uma vez e não usam lock
+        self._agenda: Tuple[List[tuple], List[ConsultaSchema]] = (
+            [(c.data_hora, c.id) for c in ordenadas],
+            [ConsultaSchema.model_validate(c) for c in ordenadas],
+        )
+
+    def cobre(self, data_inicio: date, data_fim: date) -> bool:
+        return self.inicio <= data_inicio and data_fim <= self.fim
+
+    def consultas_entre(self, inicio: datetime, fim: datetime) -> List[ConsultaSchema]:
+        """Consultas (qualquer status) com inicio <= data_hora < fim"""
+        chaves, consultas = self._agenda
+        esquerda = bisect.bisect_left(chaves, (inicio,))
+        direita = bisect.bisect_left(chaves, (fim,))
+        return consultas[esquerda:direita]
+
+    def horarios_do_dia(self, dia: date) -> List[Tuple[time, time]]:
+        return self.horarios.get(dia.weekday(), [])
+
+    def grade(self, data_inicio: date, data_fim: date) -> GradeDisponibilidade:
+        """Grade de disponibilidade do período, sem consultar o banco"""
+        grade = GradeDisponibilidade(data_inicio, data_fim).abrir(self.mascaras)
+        inicio = datetime.combine(data_inicio, time.min)
+        ocupadas = self.consultas_entre(
+            inicio - timedelta(minutes=DURACAO_MAXIMA_MINUTOS),
+            datetime.combine(data_fim + timedelta(days=1), time.min)
+        )
+        return grade.ocupar(
+            grade.fatias(c.data_hora, c.duracao) for c in ocupadas if c.status in STATUS_OCUPAM_HORARIO
+        )
+
+    def aplicar(self, consulta: ConsultaSchema):
+        """Inserir, substituir ou remover (fora da janela) uma consulta (cópia na escrita)"""
+        chaves, consultas = self._agenda
+        chaves, consultas = list(chaves), list(consultas)
+        for posicao, atual in enumerate(consultas):
+            if atual.id == consulta.id:
+                del consultas[posicao]
+                del chaves[posicao]
+                break
+        limite_inferior = datetime.combine(self.inicio, time.min) - timedelta(minutes=DURACAO_MAXIMA_MINUTOS)
+        limite_superior = datetime.combine(self.fim + timedelta(days=1), time.min)
+        if consulta.medico_id == self.medico_id and limite_inferior < consulta.data_hora < limite_superior:
+            chave = (consulta.data_hora, consulta.id)
+            posicao = bisect.bisect_left(chaves, chave)
+            chaves.insert(posicao, chave)
+            consultas.insert(posicao, consulta)
+        self._agenda = (chaves, consultas)
+
+
+class IndiceAgenda:
+    """Entradas AgendaMedicoIndice por médico, invalidadas entre workers via Redis pub/sub"""
+
+    # Espera entre tentativas de reconectar ao canal
+    PAUSA_RECONEXAO = 5
+    # Tempo sem tentar publicar depois de uma falha (sem o canal os outros
+    # workers já usam a validade curta)
+    PAUSA_APOS_FALHA = 30
+
+    def __init__(
+        self,
+        redis_url: str,
+        canal: str,
+        semanas: int,
+        ttl: int,
+        ttl_sem_redis: int,
+        ativo: bool = True
+    ):
+        self.canal = canal
+        self.semanas = semanas
+        self.ttl = ttl
+        self.ttl_sem_redis = ttl_sem_redis
+        self.ativo = ativo
+        self._redis_url = redis_url
+        self._redis: Optional[redis.Redis] = None
+        self._origem = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._entradas: Dict[int, AgendaMedicoIndice] = {}
+        self._versoes: Dict[int, int] = {}
+        self._geracao = 0  # incrementada ao descartar todos os médicos
+        self._lock = threading.Lock()
+        self._assinatura_ativa = False
+        self._publicacao_indisponivel_ate = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Leitura -----------------------------------------------------------
+
+    def janela(self, hoje: Optional[date] = None) -> Tuple[date, date]:
+        """Período coberto por uma carga feita hoje"""
+        hoje = hoje or date.today()
+        return hoje, hoje + timedelta(days=7 * self.semanas - 1)
+
+    def _valida(self, entrada: AgendaMedicoIndice) -> bool:
+        idade = relogio.monotonic() - entrada.carregado_em
+        return idade < (self.ttl if self._assinatura_ativa else self.ttl_sem_redis)
+
+    def obter(
+        self,
+        db: Session,
+        medico_id: int,
+        data_inicio: date,
+        data_fim: date
+    ) -> Optional[AgendaMedicoIndice]:
+        """
+        Entrada do médico se o período estiver na janela do índice (carregando
+        se preciso); None se o período estiver fora da janela, o índice estiver
+        desligado ou o médico não existir (o chamador consulta o banco)
+        """
+        if not self.ativo:
+            return None
+        inicio, fim = self.janela()
+        if data_inicio < inicio or data_fim > fim:
+            return None
+        self._garantir_assinatura()
+
+        with self._lock:
+            entrada = self._entradas.get(medico_id)
+            if entrada is not None and entrada.cobre(data_inicio, data_fim) and self._valida(entrada):
+                return entrada
+            versao = (self._geracao, self._versoes.get(medico_id, 0))
+
+        entrada = self._carregar(db, medico_id, inicio, fim)
+        if entrada is None:
+            return None
+        with self._lock:
+            # Uma alteração durante a carga pode não estar no snapshot
+            if (self._geracao, self._versoes.get(medico_id, 0)) == versao:
+                self._entradas[medico_id] = entrada
+        return entrada
+
+    def _carregar(self, db: Session, medico_id: int, inicio: date, fim: date) -> Optional[AgendaMedicoIndice]:
+        medico = db.query(User).filter(User.id == medico_id).first()
+        if not medico or medico.role != UserRole.MEDICO:
+            return None
+        horarios = db.query(HorarioDisponivel).filter(
+            HorarioDisponivel.medico_id == medico_id,
+            HorarioDisponivel.ativo == True
+        ).all()
+        inicio_dt = datetime.combine(inicio, time.min)
+        consultas = db.query(Consulta).filter(
+            Consulta.medico_id == medico_id,
+            Consulta.data_hora > inicio_dt - timedelta(minutes=DURACAO_MAXIMA_MINUTOS),
+            Consulta.data_hora < datetime.combine(fim + timedelta(days=1), time.min)
+        ).all()
+        return AgendaMedicoIndice(medico, horarios, consultas, inicio, fim)
+
+    # --- Escrita -----------------------------------------------------------
+
+    def registrar(self, consulta: Consulta):
+        """Aplicar uma consulta gravada (depois do commit) e avisar os outros workers"""
+        snapshot = ConsultaSchema.model_validate(consulta)
+        with self._lock:
+            self._versoes[consulta.medico_id] = self._versoes.get(consulta.medico_id, 0) + 1
+            entrada = self._entradas.get(consulta.medico_id)
+            if entrada is not None:
+                entrada.aplicar(snapshot)
+        self._publicar(str(consulta.medico_id))
+
+    def invalidar(self, medico_id: Optional[int] = None):
+        """Descartar um médico (ou todos) aqui e nos outros workers"""
+        self._descartar(medico_id)
+        self._publicar(TODOS if medico_id is None else str(medico_id))
+
+    def _descartar(self, medico_id: Optional[int]):
+        with self._lock:
+            if medico_id is None:
+                self._geracao += 1
+                self._entradas.clear()
+            else:
+                self._versoes[medico_id] = self._versoes.get(medico_id, 0) + 1
+                self._entradas.pop(medico_id, None)
+
+    # --- Redis pub/sub -----------------------------------------------------
+
+    def _cliente(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(
+                self._redis_url,
+                socket_timeout=0.2,
+                socket_connect_timeout=0.2,
+                decode_responses=True
+            )
+        return self._redis
+
+    def _publicar(self, mensagem: str):
+        if not self.ativo or relogio.monotonic() < self._publicacao_indisponivel_ate:
+            return
+        try:
+            self._cliente().publish(self.canal, f"{self._origem}:{mensagem}")
+        except redis.RedisError as e:
+            self._publicacao_indisponivel_ate = relogio.monotonic() + self.PAUSA_APOS_FALHA
+            log_limitado.warning(
+                "indice_agenda:publicar",
+                "indice_agenda: não foi possível publicar a invalidação",
+                erro=str(e)
+            )
+
+    def _garantir_assinatura(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._escutar, name="indice-agenda-pubsub", daemon=True
+                    )
+                    self._thread.start()
+
+    def _escutar(self):
+        while True:
+            try:
+                # Sem timeout de leitura: a conexão fica parada à espera de mensagens
+                conexao = redis.Redis.from_url(
+                    self._redis_url, socket_connect_timeout=1, decode_responses=True
+                )
+                pubsub = conexao.pubsub(ignore_subscribe_messages=False)
+                pubsub.subscribe(self.canal)
+                for mensagem in pubsub.listen():
+                    if mensagem["type"] == "subscribe":
+                        # Mensagens podem ter sido perdidas enquanto o canal esteve fora
+                        self._descartar(None)
+                        self._assinatura_ativa = True
+                    elif mensagem["type"] == "message":
+                        self._receber(mensagem["data"])
+            except Exception as e:
+                log_limitado.warning(
+                    "indice_agenda:assinatura",
+                    "indice_agenda: canal de invalidação indisponível",
+                    erro=str(e)
+                )
+            self._assinatura_ativa = False
+            relogio.sleep(self.PAUSA_RECONEXAO)
+
+    def _receber(self, dados: str):
+        origem, _, alvo = dados.rpartition(":")
+        if origem == self._origem:
+            return
+        if alvo == TODOS:
+            self._descartar(None)
+        elif alvo.isdigit():
+            self._descartar(int(alvo))
+
+
+indice_agenda = IndiceAgenda(
+    settings.redis_url,
+    settings.agenda_indice_canal,
+    settings.agenda_indice_semanas,
+    settings.agenda_indice_ttl,
+    settings.agenda_indice_ttl_sem_redis,
+    settings.agenda_indice_ativo
+)
@@ -0,0 +1,118 @@
+"""
+Canal de métricas ao vivo (Server-Sent Events)
+
+Um único estado por processo é compartilhado por todos os clientes
+conectados: as escritas apenas sinalizam o canal, que recalcula as métricas
+uma vez (com um pequeno atraso para agrupar escritas em rajada) e envia o
+resultado a todos os assinantes somente se algo mudou. Enquanto houver
+assinantes, as métricas também são recalculadas a cada intervalo_maximo
+segundos, para refletir escritas feitas em outros workers e a virada do dia.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Optional, Set
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class CanalMetricas:
+    """Fan-out de um snapshot de métricas para vários clientes"""
+
+    def __init__(
+        self,
+        calcular: Callable[[Session], dict],
+        intervalo_maximo: float = 30,
+        espera_agrupamento: float = 0.5,
+        intervalo_keepalive: float = 15
+    ):
+        self._calcular = calcular
+        self.intervalo_maximo = intervalo_maximo
+        self.espera_agrupamento = espera_agrupamento
+        self.intervalo_keepalive = intervalo_keepalive
+        self._assinantes: Set[asyncio.Queue] = set()
+        self._atual: Optional[dict] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._alterado: Optional[asyncio.Event] = None
+        self._tarefa: Optional[asyncio.Task] = None
+
+    @property
+    def total_assinantes(self) -> int:
+        return len(self._assinantes)
+
+    def notificar(self):
+        """Sinalizar que os dados mudaram (pode ser chamado de qualquer thread)"""
+        if self._loop is not None and self._alterado is not None and self._assinantes:
+            self._loop.call_soon_threadsafe(self._alterado.set)
+
+    def _calcular_com_sessao(self) -> dict:
+        db = SessionLocal()
+        try:
+            return self._calcular(db)
+        finally:
+            db.close()
+
+    async def _atualizar(self):
+        metricas = await run_in_threadpool(self._calcular_com_sessao)
+        # O último assinante pode ter saído durante o cálculo: não guardar o
+        # snapshot que o reset de assinar() acabou de descartar
+        if not self._assinantes or metricas == self._atual:
+            return
+        self._atual = metricas
+        for fila in self._assinantes:
+            # Fila de tamanho 1: o cliente lento recebe apenas o snapshot mais recente
+            if fila.full():
+                fila.get_nowait()
+            fila.put_nowait(metricas)
+
+    async def _publicar(self):
+        while self._assinantes:
+            try:
+                await asyncio.wait_for(self._alterado.wait(), timeout=self.intervalo_maximo)
+                await asyncio.sleep(self.espera_agrupamento)
+            except asyncio.TimeoutError:
+                pass
+            self._alterado.clear()
+            if not self._assinantes:
+                break
+            try:
+                await self._atualizar()
+            except Exception:
+                logger.exception("metricas_ao_vivo: erro ao recalcular métricas")
+        self._tarefa = None
+
+    async def assinar(self) -> AsyncIterator[dict]:
+        """
+        Gerar o snapshot atual e, depois, cada snapshot alterado.
+
+        Gera None a cada intervalo_keepalive segundos sem mudanças, para que
+        o chamador mantenha a conexão viva.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._alterado = asyncio.Event()
+            self._tarefa = None
+
+        fila: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._assinantes.add(fila)
+        try:
+            if self._atual is None:
+                self._atual = await run_in_threadpool(self._calcular_com_sessao)
+            yield self._atual
+
+            if self._tarefa is None:
+                self._tarefa = asyncio.create_task(self._publicar())
+
+            while True:
+                try:
+                    yield await asyncio.wait_for(fila.get(), timeout=self.intervalo_keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._assinantes.discard(fila)
+            if not self._assinantes:
+                # Sem clientes o snapshot pode envelhecer; recalcular na próxima conexão
+                self._atual = None
@@ -0,0 +1,93 @@
+"""
+Registro de pagamentos em lote
+
+Valida todos os itens com uma consulta IN por tabela referenciada
+(pacientes, consultas e médicos), insere os válidos num único INSERT com
+vários VALUES (com RETURNING dos ids) e atualiza o rollup diário com um
+upsert por chave, tudo na transação do chamador. Itens inválidos não impedem o registro dos demais e
+são informados na resposta.
+"""
+from datetime import datetime
+from typing import Dict, List, Set
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from app.models.user import User
+from app.models.paciente import Paciente
+from app.models.consulta import Consulta
+from app.models.pagamento import Pagamento, StatusPagamento
+from app.schemas.pagamento import PagamentoCreate, PagamentoLoteItem, PagamentoLoteResultado
+from app.services import estatisticas_diarias
+
+CENTAVO = Decimal("0.01")
+
+
+def _existentes(db: Session, coluna, ids: Set[int]) -> Set[int]:
+    if not ids:
+        return set()
+    return {linha[0] for linha in db.query(coluna).filter(coluna.in_(ids)).all()}
+
+
+def registrar_em_lote(db: Session, itens: List[PagamentoCreate]) -> PagamentoLoteResultado:
+    """Registrar os itens válidos (não faz commit) e devolver o resultado de cada item"""
+    pacientes = _existentes(db, Paciente.id, {item.paciente_id for item in itens})
+    consultas = _existentes(db, Consulta.id, {item.consulta_id for item in itens if item.consulta_id})
+    medicos = _existentes(db, User.id, {item.medico_id for item in itens if item.medico_id})
+
+    resultados: List[PagamentoLoteItem] = []
+    validos: List[int] = []
+    linhas: List[dict] = []
+    for indice, item in enumerate(itens):
+        erro = None
+        if item.paciente_id not in pacientes:
+            erro = "Paciente não encontrado"
+        elif item.consulta_id and item.consulta_id not in consultas:
+            erro = "Consulta não encontrada"
+        elif item.medico_id and item.medico_id not in medicos:
+            erro = "Médico não encontrado"
+
+        if erro:
+            resultados.append(PagamentoLoteItem(indice=indice, sucesso=False, erro=erro))
+            continue
+
+        dados = item.model_dump()
+        dados["status"] = item.status or StatusPagamento.PENDENTE
+        # Mesmo arredondamento da coluna Numeric(10, 2)
+        dados["valor"] = item.valor.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+        linhas.append(dados)
+        validos.append(indice)
+        resultados.append(PagamentoLoteItem(indice=indice, sucesso=True))
+
+    if linhas:
+        colunas = list(linhas[0].keys())
+        inseridos = db.execute(
+            insert(Pagamento.__table__).values(linhas).returning(
+                Pagamento.id, Pagamento.created_at, *[Pagamento.__table__.c[c] for c in colunas]
+            )
+        ).all()
+
+        # A ordem do RETURNING não é garantida: associar cada linha ao seu item pelo conteúdo
+        # (itens idênticos são intercambiáveis)
+        pendentes: Dict[tuple, List[int]] = {}
+        for indice, dados in zip(validos, linhas):
+            pendentes.setdefault(tuple(dados[c] for c in colunas), []).append(indice)
+
+        chaves = []
+        for linha in inseridos:
+            dados = linha._mapping
+            indice = pendentes[tuple(dados[c] for c in colunas)].pop(0)
+            resultados[indice].pagamento_id = dados["id"]
+            criado_em = dados["created_at"] or datetime.now()
+            chaves.append((
+                (criado_em.date(), dados["status"], dados["metodo_pagamento"]),
+                Decimal(dados["valor"])
+            ))
+        estatisticas_diarias.somar_pagamentos(db, chaves)
+
+    criados = len(linhas)
+    return PagamentoLoteResultado(
+        total=len(itens),
+        criados=criados,
+        falhas=len(itens) - criados,
+        itens=resultados
+    )
@@ -0,0 +1,64 @@
+"""
+Execução paralela de seções independentes de uma resposta
+
+Cada seção recebe a sua própria sessão, aberta sobre a mesma engine (e,
+portanto, o mesmo pool de conexões) da sessão da requisição. O pool de
+threads é compartilhado e limitado por settings.secoes_max_workers, o que
+também limita quantas conexões extras as seções ocupam ao mesmo tempo.
+
+Antes de disparar as seções a sessão da requisição encerra a sua transação
+e devolve a conexão ao pool. Se a segurasse, requisições simultâneas
+esperando conexões para as suas seções poderiam esgotar o pool e travar
+umas às outras.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+_executor = ThreadPoolExecutor(
+    max_workers=max(settings.secoes_max_workers, 1),
+    thread_name_prefix="secoes"
+)
+
+
+def _executar(bind, secao: Callable[[Session], Any]) -> Tuple[Any, float]:
+    inicio = time.perf_counter()
+    with Session(bind=bind) as sessao:
+        resultado = secao(sessao)
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+def executar_em_paralelo(
+    db: Session,
+    secoes: Dict[str, Callable[[Session], Any]]
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Executar as seções em paralelo e devolver (resultados, tempos em ms).
+
+    Em SQLite (testes/benchmarks) ou com secoes_max_workers <= 1 as seções
+    rodam em sequência na própria sessão da requisição.
+    """
+    bind = db.get_bind()
+    resultados: Dict[str, Any] = {}
+    tempos: Dict[str, float] = {}
+
+    if settings.secoes_max_workers <= 1 or bind.dialect.name == "sqlite":
+        for nome, secao in secoes.items():
+            inicio = time.perf_counter()
+            resultados[nome] = secao(db)
+            tempos[nome] = (time.perf_counter() - inicio) * 1000
+        return resultados, tempos
+
+    # A sessão volta a pegar uma conexão se for usada depois
+    db.commit()
+    futuros = {nome: _executor.submit(_executar, bind, secao) for nome, secao in secoes.items()}
+    for nome, futuro in futuros.items():
+        resultados[nome], tempos[nome] = futuro.result()
+    return resultados, tempos
+
+
+def formatar_server_timing(tempos: Dict[str, float]) -> str:
+    """Formatar os tempos no padrão do header Server-Timing"""
+    return ", ".join(f"{nome};dur={duracao:.1f}" for nome, duracao in tempos.items())
@@ -0,0 +1,243 @@
+"""
+Relatório financeiro calculado com uma única consulta agrupada
+
+A consulta agrupa os pagamentos do período por (status, método) e, quando
+pedido, também por médico e/ou mês. Como o resultado tem no máximo algumas
+centenas de linhas, todos os totais e quebras são somados em Python.
+
+Meses inteiros do período que já têm fechamento (ver services.fechamento)
+são lidos das linhas congeladas no snapshot; a consulta agrupada cobre
+apenas o restante do período (tipicamente o mês em aberto).
+"""
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, or_
+from app.models.user import User
+from app.models.pagamento import Pagamento, MetodoPagamento, StatusPagamento
+from app.models.fechamento import FechamentoMensal
+from app.schemas.dashboard import Granularidade
+from app.schemas.pagamento import RelatorioFinanceiro, RelatorioFinanceiroMedico, RelatorioFinanceiroMes
+from app.services.graficos import truncar, para_data, inicio_do_periodo, proximo_periodo
+
+
+class LinhaPagamentos(NamedTuple):
+    """Uma linha agrupada de pagamentos (ao vivo ou de um fechamento)"""
+    status: Optional[StatusPagamento]
+    metodo_pagamento: MetodoPagamento
+    medico_id: Optional[int]
+    medico_nome: Optional[str]
+    mes: Optional[date]
+    quantidade: int
+    valor: Decimal
+
+    def para_json(self) -> dict:
+        return {
+            "status": self.status.value if self.status is not None else None,
+            "metodo_pagamento": self.metodo_pagamento.value,
+            "medico_id": self.medico_id,
+            "medico_nome": self.medico_nome,
+            "quantidade": self.quantidade,
+            "valor": str(self.valor),
+        }
+
+    @classmethod
+    def de_json(cls, dados: dict, mes: date) -> "LinhaPagamentos":
+        return cls(
+            status=StatusPagamento(dados["status"]) if dados["status"] is not None else None,
+            metodo_pagamento=MetodoPagamento(dados["metodo_pagamento"]),
+            medico_id=dados["medico_id"],
+            medico_nome=dados["medico_nome"],
+            mes=mes,
+            quantidade=dados["quantidade"],
+            valor=Decimal(dados["valor"]),
+        )
+
+
+class _Totais:
+    """Acumulador dos totais por status/método de um recorte do relatório"""
+
+    def __init__(self):
+        self.por_status: Dict[StatusPagamento, Decimal] = {s: Decimal("0") for s in StatusPagamento}
+        self.por_metodo: Dict[MetodoPagamento, Decimal] = {m: Decimal("0") for m in MetodoPagamento}
+        self.quantidade = 0
+
+    def somar(self, status_pagamento, metodo, quantidade: int, valor):
+        valor = Decimal(valor or 0)
+        if status_pagamento is not None:
+            self.por_status[status_pagamento] += valor
+        self.por_metodo[metodo] += valor
+        self.quantidade += quantidade
+
+    @property
+    def total_recebido(self) -> Decimal:
+        return self.por_status[StatusPagamento.PAGO]
+
+    @property
+    def total_pendente(self) -> Decimal:
+        return self.por_status[StatusPagamento.PENDENTE]
+
+    @property
+    def total_cancelado(self) -> Decimal:
+        return self.por_status[StatusPagamento.CANCELADO]
+
+    @property
+    def total_geral(self) -> Decimal:
+        return self.total_recebido + self.total_pendente + self.total_cancelado
+
+    def resumo(self) -> dict:
+        return {
+            "total_recebido": self.total_recebido,
+            "total_pendente": self.total_pendente,
+            "total_cancelado": self.total_cancelado,
+            "total_geral": self.total_geral,
+            "quantidade_pagamentos": self.quantidade,
+        }
+
+
+def _inicio(dia: date) -> datetime:
+    return datetime.combine(dia, datetime.min.time())
+
+
+def agrupar_pagamentos(
+    db: Session,
+    inicio_dt: datetime,
+    fim_dt: datetime,
+    por_medico: bool = False,
+    por_mes: bool = False,
+    excluir: List[Tuple[datetime, datetime]] = ()
+) -> List[LinhaPagamentos]:
+    """Pagamentos lançados em [inicio_dt, fim_dt) agrupados, fora dos intervalos em `excluir`"""
+    colunas = [Pagamento.status, Pagamento.metodo_pagamento]
+    if por_medico:
+        colunas += [Pagamento.medico_id, User.nome.label("medico_nome")]
+    if por_mes:
+        colunas.append(truncar(db, Pagamento.created_at, Granularidade.MES).label("mes"))
+
+    query = db.query(
+        *colunas,
+        func.count(Pagamento.id).label("quantidade"),
+        func.sum(Pagamento.valor).label("valor")
+    )
+    if por_medico:
+        query = query.outerjoin(User, User.id == Pagamento.medico_id)
+    linhas = query.filter(
+        and_(
+            Pagamento.created_at >= inicio_dt,
+            Pagamento.created_at < fim_dt,
+            *[
+                or_(Pagamento.created_at < inicio, Pagamento.created_at >= fim)
+                for inicio, fim in excluir
+            ]
+        )
+    ).group_by(*colunas).all()
+
+    return [
+        LinhaPagamentos(
+            status=linha.status,
+            metodo_pagamento=linha.metodo_pagamento,
+            medico_id=linha.medico_id if por_medico else None,
+            medico_nome=linha.medico_nome if por_medico else None,
+            mes=para_data(linha.mes) if por_mes else None,
+            quantidade=linha.quantidade,
+            valor=Decimal(linha.valor or 0),
+        )
+        for linha in linhas
+    ]
+
+
+def _meses_fechados(db: Session, data_inicio: date, data_fim: date) -> List[FechamentoMensal]:
+    """Fechamentos dos meses inteiramente contidos em [data_inicio, data_fim]"""
+    primeiro = inicio_do_periodo(data_inicio, Granularidade.MES)
+    if primeiro < data_inicio:
+        primeiro = proximo_periodo(primeiro, Granularidade.MES)
+    ultimo = inicio_do_periodo(data_fim + timedelta(days=1), Granularidade.MES)
+    if ultimo <= primeiro:
+        return []
+
+    return db.query(FechamentoMensal).filter(
+        FechamentoMensal.mes >= primeiro,
+        FechamentoMensal.mes < ultimo
+    ).order_by(FechamentoMensal.mes).all()
+
+
+def _intervalos(meses: List[date]) -> List[Tuple[datetime, datetime]]:
+    """Agrupar meses ordenados em intervalos contínuos [início, fim)"""
+    intervalos: List[Tuple[datetime, datetime]] = []
+    for mes in meses:
+        fim = _inicio(proximo_periodo(mes, Granularidade.MES))
+        if intervalos and intervalos[-1][1] == _inicio(mes):
+            intervalos[-1] = (intervalos[-1][0], fim)
+        else:
+            intervalos.append((_inicio(mes), fim))
+    return intervalos
+
+
+def calcular_relatorio(
+    db: Session,
+    data_inicio: date,
+    data_fim: date,
+    por_medico: bool = False,
+    por_mes: bool = False
+) -> RelatorioFinanceiro:
+    """Relatório dos pagamentos lançados (created_at) em [data_inicio, data_fim]"""
+    inicio_dt = _inicio(data_inicio)
+    fim_dt = _inicio(data_fim + timedelta(days=1))
+
+    fechamentos = _meses_fechados(db, data_inicio, data_fim)
+    linhas: List[LinhaPagamentos] = [
+        LinhaPagamentos.de_json(dados, fechamento.mes)
+        for fechamento in fechamentos
+        for dados in fechamento.linhas_pagamentos
+    ]
+
+    # Só o que não está coberto pelos fechamentos é calculado ao vivo
+    excluir = _intervalos([fechamento.mes for fechamento in fechamentos])
+    if excluir != [(inicio_dt, fim_dt)]:
+        linhas += agrupar_pagamentos(db, inicio_dt, fim_dt, por_medico, por_mes, excluir)
+
+    geral = _Totais()
+    medicos: Dict[Optional[int], _Totais] = {}
+    nomes_medicos: Dict[Optional[int], Optional[str]] = {}
+    meses: Dict[date, _Totais] = {}
+
+    for linha in linhas:
+        geral.somar(linha.status, linha.metodo_pagamento, linha.quantidade, linha.valor)
+        if por_medico:
+            medicos.setdefault(linha.medico_id, _Totais()).somar(
+                linha.status, linha.metodo_pagamento, linha.quantidade, linha.valor
+            )
+            nomes_medicos[linha.medico_id] = linha.medico_nome
+        if por_mes:
+            meses.setdefault(linha.mes, _Totais()).somar(
+                linha.status, linha.metodo_pagamento, linha.quantidade, linha.valor
+            )
+
+    relatorio = RelatorioFinanceiro(
+        periodo_inicio=data_inicio,
+        periodo_fim=data_fim,
+        **geral.resumo(),
+        pagamentos_por_metodo={m.value: float(v) for m, v in geral.por_metodo.items()},
+        pagamentos_por_status={s.value: float(v) for s, v in geral.por_status.items()},
+        meses_fechados=[fechamento.mes.strftime("%Y-%m") for fechamento in fechamentos]
+    )
+
+    if por_medico:
+        relatorio.por_medico = [
+            RelatorioFinanceiroMedico(
+                medico_id=medico_id,
+                medico_nome=nomes_medicos[medico_id],
+                **totais.resumo()
+            )
+            for medico_id, totais in sorted(
+                medicos.items(), key=lambda item: item[1].total_geral, reverse=True
+            )
+        ]
+    if por_mes:
+        relatorio.por_mes = [
+            RelatorioFinanceiroMes(mes=mes.strftime("%Y-%m"), **totais.resumo())
+            for mes, totais in sorted(meses.items())
+        ]
+
+    return relatorio
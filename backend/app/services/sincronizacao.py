@@ -0,0 +1,114 @@
+"""
+Sincronização incremental de consultas ("o que mudou desde o cursor")
+
+Cada consulta tem um instante de alteração, coalesce(updated_at, created_at),
+e o feed devolve as consultas na ordem (alteração, id), continuando do
+cursor da chamada anterior pelo índice ix_consultas_alterado_em_id. Como
+consultas nunca são apagadas, o cancelamento é a remoção: canceladas saem
+como tombstones (só o id).
+
+O cursor só avança. Uma transação ainda aberta pode gravar depois um
+instante anterior ao cursor já entregue (updated_at vem de now(), o início
+da transação, e o agendamento pode esperar o lock da agenda do médico). Por
+isso o feed só lê alterações com mais de MARGEM_SEGUNDOS e, no PostgreSQL,
+anteriores ao início da transação aberta mais antiga do banco
+(pg_stat_activity); as mais recentes saem numa chamada seguinte. Conta-se
+qualquer transação aberta, não só as que já têm xid: quem espera o lock da
+agenda ainda não escreveu nada.
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_, literal_column, text
+from app.models.consulta import Consulta, StatusConsulta
+from app.schemas.consulta import Consulta as ConsultaSchema, SincronizacaoConsultas
+
+# Alterações mais novas que isto ficam para a próxima chamada
+MARGEM_SEGUNDOS = 5
+
+LIMITE_PADRAO = 500
+LIMITE_MAXIMO = 2000
+
+# Formato de CURRENT_TIMESTAMP no SQLite (as datas são texto)
+_FORMATO_SQLITE = "%Y-%m-%d %H:%M:%S"
+
+
+def alterado_em():
+    """Expressão SQL do instante da última alteração da consulta (coberta pelo índice)"""
+    return func.coalesce(Consulta.updated_at, Consulta.created_at)
+
+
+# Início da transação aberta mais antiga das outras conexões ao banco
+_TRANSACAO_MAIS_ANTIGA = text(
+    "(SELECT min(xact_start) FROM pg_stat_activity"
+    " WHERE datname = current_database() AND pid <> pg_backend_pid())"
+)
+
+
+def _horizonte(db: Session):
+    """Último instante que o feed pode entregar, no relógio do banco"""
+    if db.get_bind().dialect.name == "postgresql":
+        margem = func.now() - literal_column(f"interval '{MARGEM_SEGUNDOS} seconds'")
+        # least() ignora o NULL de quando não há outra transação aberta
+        return func.least(margem, _TRANSACAO_MAIS_ANTIGA)
+    # No SQLite as escritas são serializadas e CURRENT_TIMESTAMP é o da instrução
+    return func.datetime("now", f"-{MARGEM_SEGUNDOS} seconds")
+
+
+def codificar_cursor(instante: datetime, consulta_id: int) -> str:
+    """Cursor opaco para (instante da alteração, id)"""
+    texto = f"{instante.isoformat()}|{consulta_id}"
+    return base64.urlsafe_b64encode(texto.encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    """(instante, id) de um cursor; ValueError se ele for inválido"""
+    try:
+        instante, consulta_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(instante), int(consulta_id)
+    except (ValueError, UnicodeError):
+        raise ValueError("Cursor inválido")
+
+
+def buscar_alteracoes(db: Session, cursor: Optional[str] = None, limite: int = LIMITE_PADRAO) -> SincronizacaoConsultas:
+    """
+    Consultas alteradas depois do cursor (todas, sem cursor), até `limite`.
+
+    ValueError se o cursor for inválido.
+    """
+    alterado = alterado_em()
+    query = db.query(Consulta, alterado.label("alterado_em")).filter(alterado <= _horizonte(db))
+
+    if cursor:
+        instante, consulta_id = decodificar_cursor(cursor)
+        instante_sql = instante
+        if db.get_bind().dialect.name != "postgresql":
+            instante_sql = instante.strftime(_FORMATO_SQLITE)
+        # O >= delimita a faixa no índice; o OR desempata pelo id no mesmo instante
+        query = query.filter(
+            alterado >= instante_sql,
+            or_(alterado > instante_sql, and_(alterado == instante_sql, Consulta.id > consulta_id))
+        )
+
+    linhas = query.order_by(alterado, Consulta.id).limit(limite + 1).all()
+    mais = len(linhas) > limite
+    linhas = linhas[:limite]
+
+    alteradas, removidas = [], []
+    for consulta, _ in linhas:
+        if consulta.status == StatusConsulta.CANCELADA:
+            removidas.append(consulta.id)
+        else:
+            alteradas.append(ConsultaSchema.model_validate(consulta))
+
+    if linhas:
+        consulta, instante = linhas[-1]
+        cursor = codificar_cursor(instante, consulta.id)
+
+    return SincronizacaoConsultas(
+        alteradas=alteradas,
+        removidas=removidas,
+        cursor=cursor or "",
+        mais=mais
+    )
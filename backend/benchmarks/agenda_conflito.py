@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark da verificação de conflito de horário ao agendar consultas
+
+Compara a verificação antiga (carregar todas as consultas ativas do médico e
+percorrê-las em Python) com agenda.buscar_conflito à medida que o histórico
+do médico cresce. Termina com código 1 se as duas divergirem ou se a consulta
+nova não usar o índice (medico_id, data_hora).
+
+Uso: python benchmarks/agenda_conflito.py
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from utils import criar_sessao, popular_dados, cronometro
+
+from sqlalchemy import text
+from app.models.consulta import Consulta, TipoConsulta, StatusConsulta
+from app.services import agenda
+
+SONDAGENS = 50
+
+
+def conflito_legado(db, medico_id, inicio, duracao):
+    fim = inicio + timedelta(minutes=duracao)
+    for existente in db.query(Consulta).filter(
+        Consulta.medico_id == medico_id,
+        Consulta.status.in_([StatusConsulta.AGENDADA, StatusConsulta.CONFIRMADA])
+    ).all():
+        fim_existente = existente.data_hora + timedelta(minutes=existente.duracao)
+        if inicio < fim_existente and fim > existente.data_hora:
+            return True
+    return False
+
+
+def adicionar_historico(db, medico_id, paciente_id, quantidade, inicio, rnd):
+    """Consultas sem sobreposição, uma por slot de 30 minutos a partir de `inicio`"""
+    db.bulk_insert_mappings(Consulta, [
+        {
+            "paciente_id": paciente_id,
+            "medico_id": medico_id,
+            "data_hora": inicio + timedelta(minutes=30 * i),
+            "duracao": rnd.choice((15, 30)),
+            "tipo": TipoConsulta.RETORNO,
+            "status": rnd.choice(list(StatusConsulta)),
+        }
+        for i in range(quantidade)
+    ])
+    db.commit()
+
+
+def main():
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    rnd = random.Random(3)
+    erros = 0
+    try:
+        medicos, pacientes = popular_dados(db, n_consultas=0, n_pagamentos=0)
+        medico_id, paciente_id = medicos[0].id, pacientes[0].id
+        base = datetime(2020, 1, 1, 8, 0)
+        total = 0
+
+        print(f"{'histórico':>10} | {'antigo ms':>10} | {'novo ms':>8}")
+        for quantidade in (1000, 10000, 50000):
+            adicionar_historico(
+                db, medico_id, paciente_id, quantidade - total,
+                base + timedelta(minutes=30 * total), rnd
+            )
+            total = quantidade
+            fim_historico = base + timedelta(minutes=30 * total)
+            sondagens = [
+                (base + (fim_historico - base) * rnd.random(), rnd.choice((15, 30, 60, 120)))
+                for _ in range(SONDAGENS)
+            ]
+
+            tempos = {}
+            with cronometro(tempos, "antigo"):
+                esperado = [conflito_legado(db, medico_id, h, d) for h, d in sondagens]
+            with cronometro(tempos, "novo"):
+                obtido = [agenda.buscar_conflito(db, medico_id, h, d) is not None for h, d in sondagens]
+
+            divergencias = sum(e != o for e, o in zip(esperado, obtido))
+            erros += divergencias
+            print(f"{quantidade:>10} | {tempos['antigo'] / SONDAGENS:>10.2f} | {tempos['novo'] / SONDAGENS:>8.2f}"
+                  + (f"  [{divergencias} divergências]" if divergencias else ""))
+
+        if engine.dialect.name == "sqlite":
+            consulta = db.query(Consulta.id).filter(
+                agenda.filtro_sobreposicao(db, medico_id, base, base + timedelta(minutes=30))
+            ).statement.compile(engine, compile_kwargs={"literal_binds": True})
+            plano = " ".join(
+                str(linha[-1]) for linha in db.execute(text(f"EXPLAIN QUERY PLAN {consulta}"))
+            )
+            print(f"Plano: {plano}")
+            if "ix_consultas_medico_id_data_hora" not in plano:
+                print("[ERRO] A verificação não usa o índice (medico_id, data_hora)")
+                sys.exit(1)
+    finally:
+        db.close()
+
+    if erros:
+        print(f"[ERRO] {erros} sondagens divergiram da verificação antiga")
+        sys.exit(1)
+    print("[OK] Mesmo resultado, com custo independente do histórico")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark da agenda de vários médicos num período
+(GET /consultas/agenda-periodo/)
+
+Compara a visão de semana e de mês montada pelo novo endpoint com o caminho
+antigo do calendário (uma chamada de /consultas/agenda/{medico_id} por médico
+e por dia, com o índice em memória desligado): mesmas consultas e janelas de
+atendimento, número de queries constante e tamanho da resposta em JSON.
+Termina com código 1 se o conteúdo divergir ou se o número de queries
+crescer com os médicos ou os dias.
+
+Uso: python benchmarks/agenda_periodo.py
+"""
+import json
+import random
+import sys
+from datetime import datetime, date, time, timedelta
+
+from utils import criar_sessao, popular_dados, cronometro, ContadorQueries
+
+from app.api.v1.consultas import get_agenda_medico, get_agenda_periodo
+from app.models.consulta import Consulta, TipoConsulta, StatusConsulta
+from app.models.horario_disponivel import HorarioDisponivel
+from app.services.indice_agenda import indice_agenda
+
+N_MEDICOS = 20
+DATA_INICIO = date(2030, 6, 3)
+DIAS_SEMANA = ["segunda", "terca", "quarta", "quinta", "sexta"]
+
+
+def popular(db, medico_ids, paciente_ids, rnd):
+    db.add_all([
+        HorarioDisponivel(medico_id=m, dia_semana=dia, hora_inicio=inicio, hora_fim=fim, ativo=True)
+        for m in medico_ids for dia in DIAS_SEMANA
+        for inicio, fim in ((time(8), time(12)), (time(13), time(18)))
+    ])
+    linhas = []
+    for medico_id in medico_ids:
+        for d in range(31):
+            dia = DATA_INICIO + timedelta(days=d)
+            for meia_hora in range(20):
+                if rnd.random() < 0.5:
+                    linhas.append({
+                        "paciente_id": rnd.choice(paciente_ids), "medico_id": medico_id,
+                        "data_hora": datetime.combine(dia, time(8)) + timedelta(minutes=30 * meia_hora),
+                        "duracao": 30, "tipo": TipoConsulta.RETORNO,
+                        "status": rnd.choice(list(StatusConsulta)),
+                    })
+    db.bulk_insert_mappings(Consulta, linhas)
+    db.commit()
+    return len(linhas)
+
+
+def legado(db, medico_ids, data_inicio, data_fim):
+    """Uma chamada da agenda do dia por médico e por dia, reduzida ao mesmo conteúdo"""
+    resultado = {}
+    for medico_id in medico_ids:
+        dia = data_inicio
+        while dia <= data_fim:
+            agenda = get_agenda_medico(medico_id=medico_id, data=dia, db=db, current_user=None)
+            resultado[(medico_id, dia)] = (
+                [(h.hora_inicio, h.hora_fim) for h in agenda.horarios_disponiveis],
+                [(c.id, c.data_hora.time(), c.duracao, c.paciente_id, c.tipo, c.status) for c in agenda.consultas],
+            )
+            dia += timedelta(days=1)
+    return resultado
+
+
+def reduzir(periodo, medico_ids, data_inicio, data_fim):
+    dias = {
+        (medico.medico_id, d.data): d
+        for medico in periodo.medicos for d in medico.dias
+    }
+    resultado = {}
+    for medico_id in medico_ids:
+        dia = data_inicio
+        while dia <= data_fim:
+            d = dias.get((medico_id, dia))
+            resultado[(medico_id, dia)] = (
+                [(j.hora_inicio, j.hora_fim) for j in d.janelas] if d else [],
+                [(c.id, c.hora, c.duracao, c.paciente_id, c.tipo, c.status) for c in d.consultas] if d else [],
+            )
+            dia += timedelta(days=1)
+    return resultado
+
+
+def main():
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    rnd = random.Random(21)
+    erros = 0
+    indice_agenda.ativo = False
+    try:
+        medicos, pacientes = popular_dados(db, n_medicos=N_MEDICOS, n_pacientes=50, n_consultas=0, n_pagamentos=0)
+        medico_ids = [m.id for m in medicos]
+        total = popular(db, medico_ids, [p.id for p in pacientes], rnd)
+        print(f"{N_MEDICOS} médicos, {total} consultas em 31 dias")
+
+        print(f"{'visão':>6} | {'médicos':>7} | {'queries antes':>13} | {'ms antes':>8} | "
+              f"{'queries agora':>13} | {'ms agora':>8} | {'KB JSON':>7}")
+        queries_novas = set()
+        for visao, dias in (("semana", 7), ("mês", 31)):
+            for n in (1, 5, N_MEDICOS):
+                ids = medico_ids[:n]
+                data_fim = DATA_INICIO + timedelta(days=dias - 1)
+                tempos = {}
+                with ContadorQueries(engine) as antes:
+                    with cronometro(tempos, "antes"):
+                        esperado = legado(db, ids, DATA_INICIO, data_fim)
+                with ContadorQueries(engine) as agora:
+                    with cronometro(tempos, "agora"):
+                        periodo = get_agenda_periodo(
+                            medico_ids=ids, data_inicio=DATA_INICIO, data_fim=data_fim, db=db, current_user=None
+                        )
+                queries_novas.add(agora.total)
+                tamanho = len(json.dumps(periodo.model_dump(mode="json"))) / 1024
+                if reduzir(periodo, ids, DATA_INICIO, data_fim) != esperado:
+                    erros += 1
+                    print(f"[ERRO] {visao} com {n} médicos divergiu da agenda diária")
+                print(f"{visao:>6} | {n:>7} | {antes.total:>13} | {tempos['antes']:>8.1f} | "
+                      f"{agora.total:>13} | {tempos['agora']:>8.1f} | {tamanho:>7.1f}")
+        if len(queries_novas) != 1:
+            erros += 1
+            print(f"[ERRO] O número de queries variou com o período ou os médicos: {sorted(queries_novas)}")
+    finally:
+        indice_agenda.ativo = True
+        db.close()
+
+    if erros:
+        sys.exit(1)
+    print("[OK] Mesma agenda com número constante de queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark do agendamento recorrente (POST /consultas/recorrentes/)
+
+Com a agenda de alguns médicos parcialmente ocupada, agenda séries
+aleatórias (semanais, quinzenais e mensais, parciais) e confere cada
+ocorrência com a verificação unitária agenda.buscar_conflito feita antes
+da série: as que colidem devem ser informadas com a consulta que ocupa o
+horário e as demais devem ter sido gravadas, com o rollup diário em dia.
+Depois compara o custo de uma série de 52 semanas com 52 chamadas de
+POST /consultas/. Termina com código 1 se alguma ocorrência divergir.
+
+Uso: python benchmarks/agenda_recorrente.py
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from utils import criar_sessao, popular_dados, cronometro, ContadorQueries
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from app.api.v1.consultas import create_consulta, create_consultas_recorrentes
+from app.models.consulta import Consulta, TipoConsulta, StatusConsulta
+from app.models.estatistica_diaria import EstatisticaDiariaConsulta
+from app.schemas.consulta import ConsultaCreate, ConsultaRecorrenteCreate, FrequenciaRecorrencia
+from app.services import agenda, estatisticas_diarias
+from app.services.agenda_recorrente import expandir_ocorrencias
+from app.services.indice_agenda import indice_agenda
+
+SERIES = 150
+INICIO = datetime(2030, 6, 3, 8)
+
+
+def popular(db, medico_ids, paciente_id, rnd):
+    linhas = []
+    for medico_id in medico_ids:
+        for _ in range(1500):
+            linhas.append({
+                "paciente_id": paciente_id, "medico_id": medico_id,
+                "data_hora": INICIO + timedelta(days=rnd.randrange(0, 400), minutes=15 * rnd.randrange(0, 40)),
+                "duracao": rnd.choice((15, 30, 60)), "tipo": TipoConsulta.RETORNO,
+                "status": rnd.choice(list(StatusConsulta)),
+            })
+    db.bulk_insert_mappings(Consulta, linhas)
+    db.commit()
+
+
+def rollup_confere(db):
+    por_consultas = {
+        (d, m, s): n for d, m, s, n in db.query(
+            func.date(Consulta.data_hora), Consulta.medico_id, Consulta.status, func.count()
+        ).group_by(func.date(Consulta.data_hora), Consulta.medico_id, Consulta.status).all()
+    }
+    por_rollup = {
+        (str(e.data), e.medico_id, e.status): e.quantidade
+        for e in db.query(EstatisticaDiariaConsulta).all() if e.quantidade
+    }
+    return {(str(d), m, s): n for (d, m, s), n in por_consultas.items()} == por_rollup
+
+
+def main():
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    rnd = random.Random(23)
+    erros = 0
+    indice_agenda.ativo = False
+    try:
+        medicos, pacientes = popular_dados(db, n_medicos=3, n_pacientes=10, n_consultas=0, n_pagamentos=0)
+        medico_ids = [m.id for m in medicos]
+        popular(db, medico_ids, pacientes[0].id, rnd)
+        # O rollup precisa refletir as consultas populadas em massa
+        estatisticas_diarias.reconstruir(db)
+        db.commit()
+
+        criadas = conflitos = recusadas = 0
+        for _ in range(SERIES):
+            frequencia = rnd.choice(list(FrequenciaRecorrencia))
+            primeira = INICIO + timedelta(days=rnd.randrange(0, 300), minutes=15 * rnd.randrange(0, 40))
+            serie = ConsultaRecorrenteCreate(
+                paciente_id=rnd.choice(pacientes).id, medico_id=rnd.choice(medico_ids),
+                data_hora=primeira, duracao=rnd.choice((15, 30, 45, 60)), tipo=TipoConsulta.RETORNO,
+                frequencia=frequencia, parcial=True,
+                **({"quantidade": rnd.randrange(1, 30)} if rnd.random() < 0.5
+                   else {"ate": primeira.date() + timedelta(days=rnd.randrange(0, 200))})
+            )
+            datas = expandir_ocorrencias(serie.data_hora, serie.frequencia, serie.quantidade, serie.ate)
+            esperado = [
+                agenda.buscar_conflito(db, serie.medico_id, d, serie.duracao) is not None for d in datas
+            ]
+            try:
+                resultado = create_consultas_recorrentes(serie=serie, db=db, current_user=None)
+            except HTTPException as e:
+                if e.status_code != 409 or not all(esperado):
+                    erros += 1
+                    print(f"[ERRO] série recusada: {e.status_code} {e.detail}")
+                recusadas += 1
+                continue
+            obtido = [o.conflito_com is not None for o in resultado.ocorrencias]
+            gravadas = [
+                o for o in resultado.ocorrencias
+                if o.consulta_id and db.get(Consulta, o.consulta_id).data_hora == o.data_hora
+            ]
+            if obtido != esperado or [o.data_hora for o in resultado.ocorrencias] != datas \
+                    or len(gravadas) != esperado.count(False):
+                erros += 1
+                print(f"[ERRO] série {frequencia.value} em {serie.data_hora}: esperado {esperado}, obtido {obtido}")
+            criadas += resultado.criadas
+            conflitos += resultado.conflitos
+        print(f"{SERIES} séries: {criadas} consultas criadas, {conflitos} colisões informadas, "
+              f"{recusadas} séries sem nenhum horário livre")
+        if not rollup_confere(db):
+            erros += 1
+            print("[ERRO] Rollup diário diverge das consultas")
+
+        # Uma série de 52 semanas contra 52 agendamentos avulsos
+        tempos = {}
+        inicio = datetime(2035, 1, 1, 10)
+        with ContadorQueries(engine) as avulsos:
+            with cronometro(tempos, "avulsos"):
+                for semana in range(52):
+                    create_consulta(
+                        consulta=ConsultaCreate(
+                            paciente_id=pacientes[0].id, medico_id=medico_ids[0],
+                            data_hora=inicio + timedelta(weeks=semana), duracao=30, tipo=TipoConsulta.RETORNO
+                        ),
+                        idempotency_key=None, db=db, current_user=None
+                    )
+        with ContadorQueries(engine) as serie:
+            with cronometro(tempos, "serie"):
+                create_consultas_recorrentes(
+                    serie=ConsultaRecorrenteCreate(
+                        paciente_id=pacientes[0].id, medico_id=medico_ids[0],
+                        data_hora=inicio + timedelta(hours=2), duracao=30, tipo=TipoConsulta.RETORNO,
+                        frequencia=FrequenciaRecorrencia.SEMANAL, quantidade=52
+                    ),
+                    db=db, current_user=None
+                )
+        print(f"52 semanas: avulsos {avulsos.total} queries / {tempos['avulsos']:.1f} ms; "
+              f"série {serie.total} queries / {tempos['serie']:.1f} ms")
+    finally:
+        indice_agenda.ativo = True
+        db.close()
+
+    if erros:
+        sys.exit(1)
+    print("[OK] Colisões e consultas gravadas iguais à verificação unitária")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Vazão do agendamento concorrente (POST /consultas/)
+
+Dispara centenas de agendamentos em paralelo (várias threads, uma sessão
+por requisição) para poucos médicos e poucos horários, de modo que quase
+todos disputam o mesmo horário; parte das requisições é repetida com a
+mesma Idempotency-Key, simulando novas tentativas depois de um timeout.
+Informa a vazão com e sem o bloqueio por médico e, para comparação, quantas
+consultas sobrepostas ou duplicadas cada caso deixou (as verificações ficam
+em tests/test_agendamento_concorrente.py).
+
+Roda num SQLite em arquivo temporário (BENCH_DATABASE_URL aponta para outro
+banco, ex.: um PostgreSQL descartável).
+
+Uso: python benchmarks/agendamento_concorrente.py
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time as relogio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+
+from utils import criar_sessao, popular_dados
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from app.api.v1.consultas import create_consulta
+from app.models.consulta import Consulta, TipoConsulta
+from app.schemas.consulta import ConsultaCreate
+from app.services import agenda
+from app.services.indice_agenda import indice_agenda
+
+REQUISICOES = 600
+THREADS = 12
+N_MEDICOS = 4
+# Requisições que são novas tentativas de uma anterior (mesma chave e corpo)
+FRACAO_REPETICOES = 0.3
+DIA = datetime.combine(datetime.now().date() + timedelta(days=30), time(8))
+
+
+def gerar_requisicoes(medico_ids, paciente_ids, rnd):
+    """(chave, corpo) embaralhados; horários de 15 em 15 minutos numa manhã"""
+    requisicoes = []
+    for i in range(REQUISICOES):
+        if requisicoes and rnd.random() < FRACAO_REPETICOES:
+            requisicoes.append(rnd.choice(requisicoes))
+            continue
+        corpo = ConsultaCreate(
+            paciente_id=rnd.choice(paciente_ids),
+            medico_id=rnd.choice(medico_ids),
+            data_hora=DIA + timedelta(minutes=15 * rnd.randrange(0, 16)),
+            duracao=rnd.choice((15, 30, 45, 60)),
+            tipo=TipoConsulta.RETORNO
+        )
+        requisicoes.append((f"agendamento-{i}", corpo))
+    rnd.shuffle(requisicoes)
+    return requisicoes
+
+
+def executar(SessionLocal, requisicoes):
+    """Disparar as requisições em paralelo; devolve (respostas por chave, falhas, segundos)"""
+    respostas = defaultdict(list)
+    falhas = []
+    trava = threading.Lock()
+
+    def agendar(requisicao):
+        chave, corpo = requisicao
+        db = SessionLocal()
+        try:
+            resultado = create_consulta(consulta=corpo, idempotency_key=chave, db=db, current_user=None)
+            if isinstance(resultado, JSONResponse):
+                consulta_id = json.loads(resultado.body)["id"]
+            else:
+                consulta_id = resultado.id
+            with trava:
+                respostas[chave].append(consulta_id)
+        except HTTPException as e:
+            if e.status_code != 400:
+                with trava:
+                    falhas.append(chave)
+        except Exception:
+            with trava:
+                falhas.append(chave)
+        finally:
+            db.close()
+
+    inicio = relogio.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        list(executor.map(agendar, requisicoes))
+    return respostas, falhas, relogio.perf_counter() - inicio
+
+
+def verificar(db, medico_ids, respostas):
+    """(sobreposições, chaves com consultas duplicadas)"""
+    sobreposicoes = 0
+    for medico_id in medico_ids:
+        ativas = db.query(Consulta).filter(
+            Consulta.medico_id == medico_id,
+            Consulta.status.in_(agenda.STATUS_OCUPAM_HORARIO)
+        ).order_by(Consulta.data_hora).all()
+        fim_anterior = None
+        for consulta in ativas:
+            if fim_anterior is not None and consulta.data_hora < fim_anterior:
+                sobreposicoes += 1
+            fim = consulta.data_hora + timedelta(minutes=consulta.duracao)
+            fim_anterior = fim if fim_anterior is None else max(fim_anterior, fim)
+    duplicadas = sum(1 for ids in respostas.values() if len(set(ids)) > 1)
+    return sobreposicoes, duplicadas
+
+
+def rodar(database_url, com_bloqueio, rnd):
+    engine, SessionLocal = criar_sessao(database_url)
+    db = SessionLocal()
+    try:
+        medicos, pacientes = popular_dados(db, n_medicos=N_MEDICOS, n_pacientes=50, n_consultas=0, n_pagamentos=0)
+        medico_ids = [m.id for m in medicos]
+        requisicoes = gerar_requisicoes(medico_ids, [p.id for p in pacientes], rnd)
+    finally:
+        db.close()
+
+    bloquear = agenda.bloquear_agenda
+    if not com_bloqueio:
+        agenda.bloquear_agenda = lambda db, medico_id: None
+    try:
+        respostas, falhas, segundos = executar(SessionLocal, requisicoes)
+    finally:
+        agenda.bloquear_agenda = bloquear
+
+    db = SessionLocal()
+    try:
+        sobreposicoes, duplicadas = verificar(db, medico_ids, respostas)
+        criadas = db.query(Consulta).count()
+    finally:
+        db.close()
+        engine.dispose()
+    return {
+        "criadas": criadas, "sobreposicoes": sobreposicoes, "duplicadas": duplicadas,
+        "falhas": len(falhas), "vazao": len(requisicoes) / segundos, "segundos": segundos,
+    }
+
+
+def main():
+    url_base = os.environ.get("BENCH_DATABASE_URL")
+    rnd = random.Random(22)
+    with tempfile.TemporaryDirectory() as diretorio:
+        print(f"{REQUISICOES} agendamentos em {THREADS} threads, {N_MEDICOS} médicos, "
+              f"{FRACAO_REPETICOES:.0%} repetições da mesma Idempotency-Key")
+        print(f"{'bloqueio':>8} | {'criadas':>7} | {'sobrepostas':>11} | {'duplicadas':>10} | "
+              f"{'falhas':>6} | {'req/s':>6}")
+        for com_bloqueio in (False, True):
+            if url_base and not com_bloqueio:
+                # Num banco externo só há um esquema limpo: medir apenas o caminho real
+                continue
+            url = url_base or f"sqlite:///{os.path.join(diretorio, f'agenda_{int(com_bloqueio)}.db')}"
+            r = rodar(url, com_bloqueio, rnd)
+            print(f"{'sim' if com_bloqueio else 'não':>8} | {r['criadas']:>7} | {r['sobreposicoes']:>11} | "
+                  f"{r['duplicadas']:>10} | {r['falhas']:>6} | {r['vazao']:>6.0f}")
+
+
+if __name__ == "__main__":
+    indice_agenda.ativo = False
+    main()
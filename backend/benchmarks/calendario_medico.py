@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark do feed iCalendar do médico (GET /consultas/calendario/{token}.ics)
+
+Simula um aplicativo de calendário consultando o feed repetidamente pela
+API (TestClient): a primeira leitura traz o .ics, as seguintes com
+If-None-Match recebem 304 com uma única query, e agendar ou cancelar uma
+consulta muda o ETag. Confere os eventos do .ics com as consultas não
+canceladas das próximas semanas no banco, o formato (CRLF, linhas de até 75
+octetos) e a troca do token, e compara o custo de uma leitura com a coleta
+dia a dia por /consultas/agenda/{medico_id}. Termina com código 1 se alguma
+verificação falhar.
+
+Uso: python benchmarks/calendario_medico.py
+"""
+import sys
+import time as relogio
+from datetime import datetime, date, time, timedelta
+
+from utils import criar_sessao, popular_dados, cronometro, ContadorQueries
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.deps import get_db, get_current_user
+from app.core.config import settings
+from app.models.consulta import Consulta, StatusConsulta
+
+LEITURAS = 200
+
+
+def main():
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    medicos, pacientes = popular_dados(db, n_medicos=3, n_pacientes=100, n_consultas=6000, n_pagamentos=0)
+    medico_id, paciente_id = medicos[0].id, pacientes[0].id
+    db.close()
+
+    def _db():
+        sessao = SessionLocal()
+        try:
+            yield sessao
+        finally:
+            sessao.close()
+
+    app.dependency_overrides[get_db] = _db
+    app.dependency_overrides[get_current_user] = lambda: None
+    client = TestClient(app)
+    erros = []
+
+    def verificar(condicao, mensagem):
+        if not condicao:
+            erros.append(mensagem)
+            print(f"[ERRO] {mensagem}")
+
+    try:
+        token = client.post(f"/api/v1/medicos/{medico_id}/calendario").json()["token"]
+        url = f"/api/v1/consultas/calendario/{token}.ics"
+
+        resposta = client.get(url)
+        verificar(resposta.status_code == 200, f"primeira leitura: HTTP {resposta.status_code}")
+        etag = resposta.headers["etag"]
+        corpo = resposta.content
+
+        # Conteúdo: um VEVENT por consulta não cancelada do período
+        db = SessionLocal()
+        inicio = datetime.combine(date.today(), time.min)
+        esperadas = {
+            f"UID:consulta-{c.id}@clinica-medica"
+            for c in db.query(Consulta).filter(
+                Consulta.medico_id == medico_id,
+                Consulta.data_hora >= inicio,
+                Consulta.data_hora < inicio + timedelta(weeks=settings.calendario_semanas_padrao),
+                Consulta.status != StatusConsulta.CANCELADA
+            ).all()
+        }
+        db.close()
+        linhas = corpo.decode("utf-8").split("\r\n")
+        uids = {linha for linha in linhas if linha.startswith("UID:")}
+        verificar(uids == esperadas, f"eventos do .ics ({len(uids)}) diferentes das consultas ({len(esperadas)})")
+        verificar(all(len(linha.encode("utf-8")) <= 75 for linha in linhas), "linha com mais de 75 octetos")
+        verificar(b"\n" not in corpo.replace(b"\r\n", b""), "quebra de linha sem CR")
+        print(f"Feed: {len(uids)} eventos, {len(corpo) / 1024:.1f} KB, ETag {etag}")
+
+        # Leituras repetidas sem mudança: 304 com uma query
+        tempos = {}
+        with ContadorQueries(engine) as contador:
+            with cronometro(tempos, "304"):
+                for _ in range(LEITURAS):
+                    resposta = client.get(url, headers={"If-None-Match": etag})
+                    verificar(resposta.status_code == 304, f"leitura repetida: HTTP {resposta.status_code}")
+        verificar(contador.total == LEITURAS, f"304 deveria custar 1 query, custou {contador.total / LEITURAS:.1f}")
+        print(f"{LEITURAS} leituras com If-None-Match: {contador.total} queries, "
+              f"{tempos['304'] / LEITURAS:.2f} ms por leitura")
+
+        # Mudanças na agenda mudam o ETag
+        nova = client.post("/api/v1/consultas/", json={
+            "paciente_id": paciente_id, "medico_id": medico_id, "tipo": "retorno", "duracao": 30,
+            "data_hora": (inicio + timedelta(days=3, hours=23, minutes=30)).isoformat(),
+        })
+        verificar(nova.status_code == 201, f"agendamento: HTTP {nova.status_code} {nova.text}")
+        resposta = client.get(url, headers={"If-None-Match": etag})
+        verificar(resposta.status_code == 200 and f"consulta-{nova.json()['id']}@".encode() in resposta.content,
+                  "nova consulta não apareceu no feed")
+        etag = resposta.headers["etag"]
+        # O SQLite grava updated_at com resolução de segundos
+        relogio.sleep(1.1)
+        client.delete(f"/api/v1/consultas/{nova.json()['id']}")
+        resposta = client.get(url, headers={"If-None-Match": etag})
+        verificar(resposta.status_code == 200 and f"consulta-{nova.json()['id']}@".encode() not in resposta.content,
+                  "consulta cancelada continuou no feed")
+
+        # Coleta dia a dia, como era feito antes
+        with ContadorQueries(engine) as antes:
+            with cronometro(tempos, "antes"):
+                for dia in range(7 * settings.calendario_semanas_padrao):
+                    client.get(f"/api/v1/consultas/agenda/{medico_id}",
+                               params={"data": (date.today() + timedelta(days=dia)).isoformat()})
+        with ContadorQueries(engine) as agora:
+            with cronometro(tempos, "agora"):
+                client.get(url, params={"semanas": settings.calendario_semanas_padrao + 1})
+        print(f"Agenda de {settings.calendario_semanas_padrao} semanas: dia a dia {antes.total} queries / "
+              f"{tempos['antes']:.0f} ms ({7 * settings.calendario_semanas_padrao} chamadas); "
+              f"feed sem cache {agora.total} queries / {tempos['agora']:.0f} ms (1 chamada)")
+
+        # Token trocado: o anterior deixa de valer
+        client.post(f"/api/v1/medicos/{medico_id}/calendario")
+        verificar(client.get(url).status_code == 404, "token antigo continuou válido")
+    finally:
+        app.dependency_overrides.clear()
+
+    if erros:
+        sys.exit(1)
+    print("[OK] Feed igual ao banco, 304 com uma query e ETag acompanhando a agenda")
+
+
+if __name__ == "__main__":
+    main()
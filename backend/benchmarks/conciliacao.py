@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark da conciliação de extrato bancário
+
+Gera pagamentos pendentes e um extrato CSV em que parte dos créditos
+corresponde a esses pagamentos (com o nome ou o CPF do pagador na
+descrição) e o restante é ruído. Verifica que todo crédito correspondente
+foi conciliado com o pagamento certo (termina com código 1 caso contrário)
+e mede o tempo de leitura + conciliação.
+
+Uso: python benchmarks/conciliacao.py [linhas do extrato]  (padrão: 20.000)
+"""
+import io
+import random
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+
+from utils import criar_sessao, popular_dados, ContadorQueries, cronometro
+
+from app.models.pagamento import Pagamento, MetodoPagamento, StatusPagamento
+from app.services.conciliacao import conciliar
+from app.services.extrato_bancario import FormatoExtrato, ler_extrato
+
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Hugo", "Íris", "João"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Carvalho", "Gomes", "Ribeiro", "Araújo"]
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rnd = random.Random(3)
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    try:
+        medicos, pacientes = popular_dados(db, n_pacientes=2000, n_consultas=0, n_pagamentos=0)
+        for paciente in pacientes:
+            paciente.nome = f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}"
+        db.commit()
+
+        hoje = date.today()
+        pendentes = []
+        for _ in range(quantidade):
+            paciente = rnd.choice(pacientes)
+            pendentes.append({
+                "paciente_id": paciente.id,
+                "valor": Decimal(rnd.randint(5000, 50000)) / 100,
+                "metodo_pagamento": MetodoPagamento.PIX,
+                "status": StatusPagamento.PENDENTE,
+                "data_vencimento": hoje - timedelta(days=rnd.randint(0, 60)),
+            })
+        ids = [linha[0] for linha in db.execute(
+            Pagamento.__table__.insert().returning(Pagamento.id, sort_by_parameter_order=True),
+            pendentes
+        )]
+        db.commit()
+        por_id = {p.id: p for p in pacientes}
+
+        # Extrato: 70% dos créditos correspondem a pagamentos, o resto é ruído
+        linhas = ["data;valor;descricao"]
+        esperado = {}
+        for numero, (pagamento_id, pagamento) in enumerate(zip(ids, pendentes), 2):
+            if rnd.random() < 0.7:
+                paciente = por_id[pagamento["paciente_id"]]
+                pagador = paciente.nome.upper() if rnd.random() < 0.8 else f"CPF {paciente.cpf}"
+                dia = pagamento["data_vencimento"] + timedelta(days=rnd.randint(-2, 2))
+                valor = pagamento["valor"]
+                esperado[numero] = pagamento_id
+            else:
+                pagador, dia = "TED RECEBIDA DIVERSOS", hoje - timedelta(days=rnd.randint(0, 60))
+                valor = Decimal(rnd.randint(100, 999)) / 100
+            linhas.append(f"{dia:%d/%m/%Y};{str(valor).replace('.', ',')};PIX RECEBIDO {pagador}")
+        arquivo = io.BytesIO("\n".join(linhas).encode("utf-8"))
+
+        tempos = {}
+        with ContadorQueries(engine) as contador:
+            with cronometro(tempos, "total"):
+                resultado = conciliar(db, ler_extrato(arquivo, FormatoExtrato.CSV), janela_dias=3)
+                db.commit()
+
+        obtido = {item.linha: item.pagamento_id for item in resultado.itens_conciliados}
+        corretos = sum(1 for numero, pagamento_id in esperado.items() if obtido.get(numero) == pagamento_id)
+        print(f"linhas: {resultado.linhas_lidas}  conciliadas: {resultado.conciliadas}  "
+              f"não conciliadas: {resultado.nao_conciliadas}")
+        print(f"esperadas: {len(esperado)}  corretas: {corretos}  "
+              f"queries: {contador.total}  tempo: {tempos['total']:.0f} ms")
+        pagos = db.query(Pagamento).filter(Pagamento.status == StatusPagamento.PAGO).count()
+    finally:
+        db.close()
+
+    if corretos != len(esperado) or pagos != resultado.conciliadas:
+        print("[ERRO] Conciliação incorreta")
+        sys.exit(1)
+    print("[OK] Todos os créditos correspondentes conciliados com o pagamento certo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos gráficos do dashboard: número de queries x tamanho da janela
+
+O número de queries de cada rota deve ser o mesmo para todas as janelas
+(termina com código 1 se variar).
+
+Uso: python benchmarks/dashboard_graficos.py
+"""
+import sys
+
+from utils import criar_sessao, popular_dados, ContadorQueries, cronometro
+
+from app.api.v1.dashboard import calcular_dashboard
+from app.api.v1.financeiro import get_grafico_financeiro
+
+
+def main():
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    try:
+        popular_dados(db)
+
+        contagens = set()
+        print(f"{'dias':>5} | {'queries /estatisticas':>22} | {'ms':>8} | {'queries /grafico':>17} | {'ms':>8}")
+        for dias in (7, 30, 90, 180, 365):
+            tempos = {}
+            with ContadorQueries(engine) as dashboard:
+                with cronometro(tempos, "dashboard"):
+                    calcular_dashboard(db, dias)
+            with ContadorQueries(engine) as financeiro:
+                with cronometro(tempos, "financeiro"):
+                    get_grafico_financeiro(dias=dias, db=db, current_user=None)
+            contagens.add((dashboard.total, financeiro.total))
+            print(
+                f"{dias:>5} | {dashboard.total:>22} | {tempos['dashboard']:>8.1f} | "
+                f"{financeiro.total:>17} | {tempos['financeiro']:>8.1f}"
+            )
+    finally:
+        db.close()
+
+    if len(contagens) != 1:
+        print("[ERRO] O número de queries variou com a janela")
+        sys.exit(1)
+    print("[OK] Número de queries constante")
+
+
+if __name__ == "__main__":
+    main()
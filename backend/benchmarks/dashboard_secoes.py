@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Benchmark das seções "próximas consultas" e "pacientes recentes" do dashboard
+
+Mede queries e tempo por tamanho das listas (a verificação de que o número
+de queries não cresce fica em tests/test_dashboard.py).
+
+Uso: python benchmarks/dashboard_secoes.py
+"""
+from utils import criar_sessao, popular_dados, ContadorQueries, cronometro
+
+from app.api.v1.dashboard import listar_proximas_consultas, listar_pacientes_recentes
+
+
+def main():
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    try:
+        popular_dados(db)
+
+        print(f"{'limite':>6} | {'queries proximas':>16} | {'queries pacientes':>17} | {'ms':>8}")
+        for limite in (5, 10, 25, 50):
+            tempos = {}
+            with cronometro(tempos, "total"):
+                with ContadorQueries(engine) as proximas:
+                    listar_proximas_consultas(db, limite)
+                with ContadorQueries(engine) as pacientes:
+                    listar_pacientes_recentes(db, limite)
+            print(f"{limite:>6} | {proximas.total:>16} | {pacientes.total:>17} | {tempos['total']:>8.1f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
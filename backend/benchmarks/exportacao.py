@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark da exportação em streaming de pagamentos
+
+Mede o pico de memória Python (tracemalloc) ao consumir a exportação para
+tamanhos crescentes da tabela; o pico deve ficar praticamente constante.
+
+Uso: python benchmarks/exportacao.py [quantidade máxima de pagamentos]
+     (padrão: 200.000)
+"""
+import asyncio
+import sys
+import tracemalloc
+
+from utils import criar_sessao, popular_dados, popular_pagamentos, cronometro
+
+from app.api.v1.financeiro import export_pagamentos
+from app.services.exportacao import FormatoExportacao
+
+
+async def consumir(resposta) -> int:
+    total = 0
+    async for pedaco in resposta.body_iterator:
+        total += len(pedaco)
+    return total
+
+
+def main():
+    maximo = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    try:
+        medicos, pacientes = popular_dados(db, n_consultas=0, n_pagamentos=0)
+        paciente_ids = [p.id for p in pacientes]
+        medico_ids = [m.id for m in medicos]
+
+        print(f"{'linhas':>8} | {'formato':>7} | {'MB gerados':>10} | {'pico MB':>8} | {'ms':>9}")
+        inseridos = 0
+        for alvo in (maximo // 10, maximo):
+            popular_pagamentos(db, alvo - inseridos, paciente_ids, medico_ids, seed=alvo)
+            inseridos = alvo
+            for formato in FormatoExportacao:
+                resposta = export_pagamentos(
+                    formato=formato, paciente_id=None, status=None, metodo_pagamento=None,
+                    data_inicio=None, data_fim=None, db=db, current_user=None
+                )
+                tempos = {}
+                tracemalloc.start()
+                with cronometro(tempos, "total"):
+                    tamanho = asyncio.run(consumir(resposta))
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(
+                    f"{alvo:>8} | {formato.value:>7} | {tamanho / 2**20:>10.1f} | "
+                    f"{pico / 2**20:>8.1f} | {tempos['total']:>9.1f}"
+                )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Benchmark da listagem de pagamentos (GET /financeiro/pagamentos)
+
+Mede queries e tempo por limit (a verificação de que o número de queries
+não cresce fica em tests/test_financeiro.py).
+
+Uso: python benchmarks/financeiro_pagamentos.py
+"""
+from utils import criar_sessao, popular_dados, ContadorQueries, cronometro
+
+from app.api.v1.financeiro import list_pagamentos
+
+
+def main():
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    try:
+        popular_dados(db)
+
+        print(f"{'limit':>6} | {'itens':>6} | {'queries':>7} | {'ms':>8}")
+        for limit in (10, 100, 500, 1000):
+            tempos = {}
+            with ContadorQueries(engine) as contador:
+                with cronometro(tempos, "total"):
+                    resultado = list_pagamentos(
+                        skip=0, limit=limit, paciente_id=None, status=None,
+                        metodo_pagamento=None, data_inicio=None, data_fim=None,
+                        db=db, current_user=None
+                    )
+            print(f"{limit:>6} | {len(resultado.items):>6} | {contador.total:>7} | {tempos['total']:>8.1f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
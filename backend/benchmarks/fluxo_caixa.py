@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark do fluxo de caixa mensal (GET /financeiro/fluxo-caixa)
+
+Compara o resultado com um cálculo ingênuo em Python sobre todas as linhas
+(termina com código 1 se divergir) e mede o tempo para períodos de 1 a 3
+anos, sem e com o cache de respostas.
+
+Uso: python benchmarks/fluxo_caixa.py [pagamentos] [despesas]
+     (padrão: 200.000 e 50.000)
+"""
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+
+from utils import (
+    criar_sessao, popular_dados, popular_pagamentos, popular_despesas,
+    ContadorQueries, cronometro
+)
+
+from app.api.v1.financeiro import get_fluxo_caixa
+from app.models.pagamento import Pagamento, StatusPagamento
+from app.models.despesa import Despesa, StatusDespesa
+from app.services.fluxo_caixa import calcular_fluxo_caixa
+
+
+def fluxo_ingenuo(db, data_inicio: date, data_fim: date) -> dict:
+    """mês -> [entradas realizadas, entradas previstas, saídas realizadas, saídas previstas]"""
+    meses = {}
+
+    def somar(dia, indice, valor):
+        if dia and data_inicio <= dia <= data_fim:
+            meses.setdefault(dia.strftime("%Y-%m"), [Decimal("0")] * 4)[indice] += valor
+
+    for p in db.query(Pagamento.status, Pagamento.data_pagamento, Pagamento.data_vencimento, Pagamento.valor):
+        if p.status == StatusPagamento.PAGO:
+            somar(p.data_pagamento.date(), 0, p.valor)
+        elif p.status == StatusPagamento.PENDENTE:
+            somar(p.data_vencimento, 1, p.valor)
+    for d in db.query(Despesa.status, Despesa.data_pagamento, Despesa.data_vencimento, Despesa.valor):
+        if d.status == StatusDespesa.PAGO:
+            somar(d.data_pagamento.date(), 2, d.valor)
+        elif d.status == StatusDespesa.PENDENTE:
+            somar(d.data_vencimento, 3, d.valor)
+    return meses
+
+
+def main():
+    n_pagamentos = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    n_despesas = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    try:
+        medicos, pacientes = popular_dados(db, n_consultas=0, n_pagamentos=0)
+        popular_pagamentos(db, n_pagamentos, [p.id for p in pacientes], [m.id for m in medicos])
+        popular_despesas(db, n_despesas)
+
+        hoje = date.today()
+        data_inicio, data_fim = hoje - timedelta(days=730), hoje + timedelta(days=90)
+        esperado = fluxo_ingenuo(db, data_inicio, data_fim)
+        fluxo = calcular_fluxo_caixa(db, data_inicio, data_fim)
+        obtido = {
+            m.mes: [m.entradas_realizadas, m.entradas_previstas, m.saidas_realizadas, m.saidas_previstas]
+            for m in fluxo.meses if any([m.entradas_realizadas, m.entradas_previstas, m.saidas_realizadas, m.saidas_previstas])
+        }
+        iguais = esperado == obtido
+
+        print(f"{'anos':>4} | {'meses':>5} | {'queries':>7} | {'sem cache ms':>12} | {'com cache ms':>12}")
+        for anos in (1, 2, 3):
+            inicio = hoje - timedelta(days=365 * anos)
+            tempos = {}
+            with ContadorQueries(engine) as contador:
+                with cronometro(tempos, "sem_cache"):
+                    resultado = calcular_fluxo_caixa(db, inicio, hoje)
+            get_fluxo_caixa(data_inicio=inicio, data_fim=hoje, saldo_inicial=Decimal("0"), db=db, current_user=None)
+            with cronometro(tempos, "com_cache"):
+                get_fluxo_caixa(data_inicio=inicio, data_fim=hoje, saldo_inicial=Decimal("0"), db=db, current_user=None)
+            print(
+                f"{anos:>4} | {len(resultado.meses):>5} | {contador.total:>7} | "
+                f"{tempos['sem_cache']:>12.1f} | {tempos['com_cache']:>12.1f}"
+            )
+    finally:
+        db.close()
+
+    if not iguais:
+        print("[ERRO] Fluxo de caixa diverge do cálculo ingênuo")
+        sys.exit(1)
+    print("[OK] Fluxo de caixa igual ao cálculo ingênuo")
+
+
+if __name__ == "__main__":
+    main()
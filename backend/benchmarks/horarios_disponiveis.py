@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos horários disponíveis (GET /consultas/horarios-disponiveis/)
+
+Monta uma agenda semanal com vários períodos por dia e consultas de
+durações variadas e compara, para um mês inteiro e várias durações, os
+slots da grade de bitmaps com um oráculo que testa cada slot contra cada
+consulta. Também mede a visão mensal numa chamada contra 30 chamadas diárias
+no formato antigo (slots fixos de 60 minutos). Termina com código 1 se a
+grade divergir do oráculo.
+
+Uso: python benchmarks/horarios_disponiveis.py
+"""
+import random
+import sys
+from datetime import datetime, date, time, timedelta
+
+from utils import criar_sessao, popular_dados, cronometro, ContadorQueries
+
+from app.models.consulta import Consulta, TipoConsulta, StatusConsulta
+from app.models.horario_disponivel import HorarioDisponivel
+from app.services import disponibilidade
+from app.services.agenda import STATUS_OCUPAM_HORARIO
+
+DATA_INICIO = date(2030, 4, 1)
+DATA_FIM = date(2030, 4, 30)
+PERIODOS = [(time(8, 0), time(12, 0)), (time(13, 30), time(18, 15))]
+DIAS_SEMANA = ["segunda", "terca", "quarta", "quinta", "sexta"]
+
+
+def popular_agenda(db, medico_id, paciente_id, rnd):
+    db.add_all([
+        HorarioDisponivel(medico_id=medico_id, dia_semana=dia, hora_inicio=inicio, hora_fim=fim, ativo=True)
+        for dia in DIAS_SEMANA for inicio, fim in PERIODOS
+    ] + [
+        # Sábado pelo número do frontend (6) e um período inativo
+        HorarioDisponivel(medico_id=medico_id, dia_semana="6", hora_inicio=time(9, 0), hora_fim=time(12, 0), ativo=True),
+        HorarioDisponivel(medico_id=medico_id, dia_semana="domingo", hora_inicio=time(9, 0), hora_fim=time(12, 0), ativo=False),
+    ])
+
+    consultas = []
+    ocupado = []
+    inicio_mes = datetime.combine(DATA_INICIO - timedelta(days=1), time(20, 0))
+    for _ in range(400):
+        inicio = inicio_mes + timedelta(minutes=rnd.randrange(0, 32 * 24 * 60, 5) + rnd.choice((0, 0, 0, 7)))
+        duracao = rnd.choice((15, 20, 30, 45, 60, 90, 300))
+        fim = inicio + timedelta(minutes=duracao)
+        status = rnd.choice(list(StatusConsulta))
+        if status in STATUS_OCUPAM_HORARIO:
+            if any(inicio < f and i < fim for i, f in ocupado):
+                continue
+            ocupado.append((inicio, fim))
+        consultas.append(Consulta(
+            paciente_id=paciente_id, medico_id=medico_id, data_hora=inicio,
+            duracao=duracao, tipo=TipoConsulta.RETORNO, status=status
+        ))
+    db.add_all(consultas)
+    db.commit()
+    return ocupado
+
+
+def oraculo(ocupado, duracao, passo):
+    """Slots (início, livre) testando cada slot contra cada consulta"""
+    slots = []
+    dia = DATA_INICIO
+    while dia <= DATA_FIM:
+        periodos = []
+        if dia.weekday() < 5:
+            periodos = PERIODOS
+        elif dia.weekday() == 5:
+            periodos = [(time(9, 0), time(12, 0))]
+        for hora_inicio, hora_fim in periodos:
+            inicio = datetime.combine(dia, hora_inicio)
+            fim_periodo = datetime.combine(dia, hora_fim)
+            while inicio + timedelta(minutes=duracao) <= fim_periodo:
+                fim = inicio + timedelta(minutes=duracao)
+                slots.append((inicio, not any(inicio < f and i < fim for i, f in ocupado)))
+                inicio += timedelta(minutes=passo)
+        dia += timedelta(days=1)
+    return slots
+
+
+def slots_legado(db, medico_id, dia):
+    """Implementação antiga de um dia: slots de 60 minutos testados com any()"""
+    horarios = db.query(HorarioDisponivel).filter(
+        HorarioDisponivel.medico_id == medico_id,
+        HorarioDisponivel.ativo == True
+    ).all()
+    consultas = db.query(Consulta).filter(
+        Consulta.medico_id == medico_id,
+        Consulta.data_hora >= datetime.combine(dia, time.min),
+        Consulta.data_hora <= datetime.combine(dia, time.max),
+        Consulta.status.in_(STATUS_OCUPAM_HORARIO)
+    ).all()
+    slots = []
+    for horario in horarios:
+        if disponibilidade.dia_da_semana(horario.dia_semana) != dia.weekday():
+            continue
+        hora = datetime.combine(dia, horario.hora_inicio)
+        while hora.time() < horario.hora_fim:
+            slots.append((hora, not any(
+                c.data_hora <= hora < c.data_hora + timedelta(minutes=c.duracao) for c in consultas
+            )))
+            hora += timedelta(minutes=60)
+    return slots
+
+
+def main():
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    rnd = random.Random(5)
+    erros = 0
+    try:
+        medicos, pacientes = popular_dados(db, n_medicos=1, n_pacientes=1, n_consultas=0, n_pagamentos=0)
+        medico_id = medicos[0].id
+        ocupado = popular_agenda(db, medico_id, pacientes[0].id, rnd)
+
+        print(f"{'duração':>7} | {'passo':>5} | {'slots':>5} | {'livres':>6} | {'ms':>6}")
+        for duracao, passo in ((15, None), (30, None), (45, 15), (60, None), (90, 30), (240, 60)):
+            tempos = {}
+            with cronometro(tempos, "grade"):
+                grade = disponibilidade.carregar_grades(db, [medico_id], DATA_INICIO, DATA_FIM)[medico_id]
+                obtido = list(grade.slots(duracao, passo))
+            esperado = oraculo(ocupado, duracao, passo or duracao)
+            if obtido != esperado:
+                erros += 1
+                diferentes = [par for par in zip(esperado, obtido) if par[0] != par[1]][:3]
+                print(f"[ERRO] duração {duracao}: {len(esperado)} esperados, {len(obtido)} obtidos; {diferentes}")
+            print(f"{duracao:>7} | {passo or duracao:>5} | {len(obtido):>5} | "
+                  f"{sum(livre for _, livre in obtido):>6} | {tempos['grade']:>6.1f}")
+
+        tempos = {}
+        with ContadorQueries(engine) as contador_legado:
+            with cronometro(tempos, "legado"):
+                for deslocamento in range((DATA_FIM - DATA_INICIO).days + 1):
+                    slots_legado(db, medico_id, DATA_INICIO + timedelta(days=deslocamento))
+        with ContadorQueries(engine) as contador_grade:
+            with cronometro(tempos, "grade"):
+                list(disponibilidade.carregar_grades(db, [medico_id], DATA_INICIO, DATA_FIM)[medico_id].slots(60))
+        print(f"Mês, 60 min: antigo {tempos['legado']:.1f} ms / {contador_legado.total} queries; "
+              f"grade {tempos['grade']:.1f} ms / {contador_grade.total} queries")
+    finally:
+        db.close()
+
+    if erros:
+        print("[ERRO] A grade divergiu do oráculo")
+        sys.exit(1)
+    print("[OK] Slots iguais ao oráculo em todas as durações")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark do índice em memória da agenda
+
+Com a agenda das próximas semanas de alguns médicos, executa uma sequência
+aleatória de agendamentos, remarcações e cancelamentos pelas rotas e, depois
+de cada um, compara a agenda do dia e os horários disponíveis servidos pelo
+índice com os mesmos endpoints lendo do banco. Mede as queries e o tempo das
+leituras com o índice aquecido e verifica que uma mensagem de invalidação de
+outro worker descarta a entrada do médico. Termina com código 1 se alguma
+resposta divergir ou se uma leitura aquecida consultar o banco.
+
+Uso: python benchmarks/indice_agenda.py
+"""
+import random
+import sys
+from datetime import datetime, date, time, timedelta
+
+from utils import criar_sessao, popular_dados, cronometro, ContadorQueries
+
+from fastapi import HTTPException
+from app.api.v1.consultas import (
+    create_consulta, update_consulta, cancel_consulta, get_agenda_medico, get_horarios_disponiveis
+)
+from app.models.consulta import TipoConsulta
+from app.models.horario_disponivel import HorarioDisponivel
+from app.schemas.consulta import ConsultaCreate, ConsultaUpdate
+from app.services.indice_agenda import indice_agenda, IndiceAgenda
+
+OPERACOES = 300
+LEITURAS = 200
+
+
+def ler(db, medico_id, dia, dias, duracao):
+    agenda = get_agenda_medico(medico_id=medico_id, data=dia, db=db, current_user=None)
+    horarios = get_horarios_disponiveis(
+        medico_id=medico_id, data=dia, data_fim=dia + timedelta(days=dias - 1), duracao=duracao,
+        passo=None, apenas_livres=False, db=db, current_user=None
+    )
+    return agenda.model_dump(mode="json"), [h.model_dump(mode="json") for h in horarios]
+
+
+def comparar(db, medico_id, dia, dias, duracao):
+    """Devolver True se índice e banco responderem igual"""
+    indice_agenda.ativo = True
+    pelo_indice = ler(db, medico_id, dia, dias, duracao)
+    indice_agenda.ativo = False
+    try:
+        pelo_banco = ler(db, medico_id, dia, dias, duracao)
+    finally:
+        indice_agenda.ativo = True
+    return pelo_indice == pelo_banco
+
+
+def main():
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    rnd = random.Random(20)
+    erros = 0
+    hoje = date.today()
+    # Sem Redis no benchmark: manter as entradas durante toda a execução
+    indice_agenda.ttl_sem_redis = indice_agenda.ttl
+    try:
+        medicos, pacientes = popular_dados(db, n_medicos=4, n_pacientes=20, n_consultas=0, n_pagamentos=0)
+        medico_ids = [m.id for m in medicos]
+        db.add_all([
+            HorarioDisponivel(medico_id=m, dia_semana=dia, hora_inicio=time(8), hora_fim=time(17), ativo=True)
+            for m in medico_ids for dia in ("segunda", "terca", "quarta", "quinta", "sexta", "sabado")
+        ])
+        db.commit()
+
+        criadas = []
+        recusadas = 0
+        for _ in range(OPERACOES):
+            medico_id = rnd.choice(medico_ids)
+            operacao = rnd.random()
+            try:
+                if operacao < 0.6 or not criadas:
+                    inicio = datetime.combine(hoje + timedelta(days=rnd.randrange(0, 28)), time(8)) \
+                        + timedelta(minutes=15 * rnd.randrange(0, 36))
+                    consulta = create_consulta(
+                        consulta=ConsultaCreate(
+                            paciente_id=rnd.choice(pacientes).id, medico_id=medico_id, data_hora=inicio,
+                            duracao=rnd.choice((15, 30, 45, 60)), tipo=TipoConsulta.RETORNO
+                        ),
+                        idempotency_key=None, db=db, current_user=None
+                    )
+                    criadas.append(consulta.id)
+                elif operacao < 0.85:
+                    consulta_id = rnd.choice(criadas)
+                    update_consulta(
+                        consulta_id=consulta_id,
+                        consulta_update=ConsultaUpdate(
+                            data_hora=datetime.combine(hoje + timedelta(days=rnd.randrange(0, 28)), time(8))
+                            + timedelta(minutes=15 * rnd.randrange(0, 36)),
+                            duracao=rnd.choice((15, 30, 60))
+                        ),
+                        db=db, current_user=None
+                    )
+                else:
+                    cancel_consulta(consulta_id=rnd.choice(criadas), db=db, current_user=None)
+            except HTTPException:
+                recusadas += 1
+                db.rollback()
+
+            dia = hoje + timedelta(days=rnd.randrange(0, 21))
+            if not comparar(db, medico_id, dia, rnd.choice((1, 7)), rnd.choice((15, 30, 60))):
+                erros += 1
+                print(f"[ERRO] índice divergiu do banco: médico {medico_id}, dia {dia}")
+        print(f"{OPERACOES} operações ({recusadas} recusadas por conflito), {erros} divergências")
+
+        # Leituras com o índice aquecido
+        for medico_id in medico_ids:
+            ler(db, medico_id, hoje, 28, 30)
+        tempos = {}
+        for nome, ativo in (("banco", False), ("indice", True)):
+            indice_agenda.ativo = ativo
+            with ContadorQueries(engine) as contador:
+                with cronometro(tempos, nome):
+                    for _ in range(LEITURAS):
+                        ler(db, rnd.choice(medico_ids), hoje + timedelta(days=rnd.randrange(0, 21)), 7, 30)
+            tempos[f"{nome}_queries"] = contador.total
+        indice_agenda.ativo = True
+        print(f"{LEITURAS} leituras (agenda do dia + semana de horários): "
+              f"banco {tempos['banco']:.1f} ms / {tempos['banco_queries']} queries; "
+              f"índice {tempos['indice']:.1f} ms / {tempos['indice_queries']} queries")
+        if tempos["indice_queries"]:
+            erros += 1
+            print("[ERRO] Leituras com o índice aquecido consultaram o banco")
+
+        # Invalidação vinda de outro worker
+        outro_worker = IndiceAgenda("redis://localhost:0", "teste", 8, 600, 600)
+        indice_agenda._receber(f"{outro_worker._origem}:{medico_ids[0]}")
+        if medico_ids[0] in indice_agenda._entradas:
+            erros += 1
+            print("[ERRO] A mensagem de outro worker não descartou a entrada do médico")
+        indice_agenda._receber(f"{indice_agenda._origem}:{medico_ids[1]}")
+        if medico_ids[1] not in indice_agenda._entradas:
+            erros += 1
+            print("[ERRO] A mensagem do próprio worker descartou a entrada do médico")
+    finally:
+        db.close()
+
+    if erros:
+        sys.exit(1)
+    print("[OK] Índice consistente com o banco")
+
+
+if __name__ == "__main__":
+    main()
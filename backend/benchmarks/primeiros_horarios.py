@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark da busca dos primeiros horários livres por especialidade
+(GET /consultas/primeiros-horarios/)
+
+50 médicos da mesma especialidade atendendo de segunda a sexta, em dois
+cenários de 60 dias: agenda típica (primeira semana quase cheia, depois 70%
+ocupada) e pior caso (30 dias quase sem buracos). Compara a busca (blocos
+de dias crescentes, uma query por bloco e heapq.merge) com um oráculo que
+percorre médico por médico, dia por dia, e mede o tempo contra o alvo de
+100 ms (no pior caso a busca precisa ler todas as consultas dos dias
+lotados). Termina com código 1 se o resultado divergir do oráculo.
+
+Uso: python benchmarks/primeiros_horarios.py
+"""
+import random
+import sys
+from datetime import datetime, date, time, timedelta
+
+from utils import criar_sessao, popular_dados, cronometro, ContadorQueries
+
+from app.models.consulta import Consulta, TipoConsulta, StatusConsulta
+from app.models.horario_disponivel import HorarioDisponivel
+from app.services import disponibilidade
+
+N_MEDICOS = 50
+DIAS = 60
+DATA_INICIO = date(2030, 6, 3)
+PERIODOS = [(time(8, 0), time(12, 0)), (time(13, 0), time(18, 0))]
+DIAS_SEMANA = ["segunda", "terca", "quarta", "quinta", "sexta"]
+ALVO_MS = 100
+
+
+# (nome, dias quase cheios, ocupação dos demais dias)
+CENARIOS = [("típica", 5, 0.7), ("pior caso", 30, 0.3)]
+
+
+def popular(db, medico_ids, paciente_id, dias_lotados, ocupacao_normal, rnd):
+    """Agenda de 30 em 30 minutos; nos dias lotados só sobram buracos raros"""
+    db.add_all([
+        HorarioDisponivel(medico_id=m, dia_semana=dia, hora_inicio=inicio, hora_fim=fim, ativo=True)
+        for m in medico_ids for dia in DIAS_SEMANA for inicio, fim in PERIODOS
+    ])
+    linhas = []
+    for medico_id in medico_ids:
+        for d in range(DIAS):
+            dia = DATA_INICIO + timedelta(days=d)
+            ocupacao = 0.999 if d < dias_lotados else ocupacao_normal
+            for inicio, fim in PERIODOS:
+                hora = datetime.combine(dia, inicio)
+                while hora < datetime.combine(dia, fim):
+                    if rnd.random() < ocupacao:
+                        linhas.append({
+                            "paciente_id": paciente_id, "medico_id": medico_id, "data_hora": hora,
+                            "duracao": 30, "tipo": TipoConsulta.RETORNO,
+                            "status": rnd.choice((StatusConsulta.AGENDADA, StatusConsulta.CONFIRMADA)),
+                        })
+                    hora += timedelta(minutes=30)
+    db.bulk_insert_mappings(Consulta, linhas)
+    db.commit()
+    return len(linhas)
+
+
+def oraculo(db, medico_ids, duracao, limite):
+    """Todos os slots livres, médico por médico e dia por dia, ordenados no final"""
+    todos = []
+    for medico_id in medico_ids:
+        ocupado = [
+            (c.data_hora, c.data_hora + timedelta(minutes=c.duracao))
+            for c in db.query(Consulta).filter(
+                Consulta.medico_id == medico_id,
+                Consulta.status.in_((StatusConsulta.AGENDADA, StatusConsulta.CONFIRMADA))
+            ).all()
+        ]
+        for d in range(DIAS):
+            dia = DATA_INICIO + timedelta(days=d)
+            if dia.weekday() >= 5:
+                continue
+            for hora_inicio, hora_fim in PERIODOS:
+                inicio = datetime.combine(dia, hora_inicio)
+                while inicio + timedelta(minutes=duracao) <= datetime.combine(dia, hora_fim):
+                    fim = inicio + timedelta(minutes=duracao)
+                    if not any(inicio < f and i < fim for i, f in ocupado):
+                        todos.append((inicio, medico_id))
+                    inicio += timedelta(minutes=duracao)
+    return sorted(todos)[:limite]
+
+
+def main():
+    erros = 0
+    for nome, dias_lotados, ocupacao_normal in CENARIOS:
+        engine, SessionLocal = criar_sessao()
+        db = SessionLocal()
+        rnd = random.Random(19)
+        try:
+            medicos, pacientes = popular_dados(db, n_medicos=N_MEDICOS, n_pacientes=1, n_consultas=0, n_pagamentos=0)
+            medico_ids = [m.id for m in medicos]
+            total = popular(db, medico_ids, pacientes[0].id, dias_lotados, ocupacao_normal, rnd)
+            print(f"Agenda {nome}: {N_MEDICOS} médicos, {DIAS} dias, {total} consultas")
+
+            print(f"{'duração':>7} | {'limite':>6} | {'queries':>7} | {'ms':>6}")
+            for duracao, limite in ((30, 10), (30, 100), (60, 10), (120, 5)):
+                tempos = {}
+                with ContadorQueries(engine) as contador:
+                    with cronometro(tempos, "busca"):
+                        obtido = disponibilidade.primeiros_horarios(
+                            db, medico_ids, duracao, DATA_INICIO, DATA_INICIO + timedelta(days=DIAS - 1), limite
+                        )
+                esperado = oraculo(db, medico_ids, duracao, limite)
+                if obtido != esperado:
+                    erros += 1
+                    print(f"[ERRO] duração {duracao}: esperado {esperado[:3]}..., obtido {obtido[:3]}...")
+                aviso = "" if tempos["busca"] < ALVO_MS else f"  [AVISO] acima de {ALVO_MS} ms"
+                print(f"{duracao:>7} | {limite:>6} | {contador.total:>7} | {tempos['busca']:>6.1f}{aviso}")
+        finally:
+            db.close()
+            engine.dispose()
+
+    if erros:
+        print("[ERRO] A busca divergiu do oráculo")
+        sys.exit(1)
+    print("[OK] Mesmos horários que o oráculo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark do relatório financeiro: caminho antigo (uma consulta por total,
+método e status) x consulta agrupada única x meses fechados + mês em aberto
+
+Uso: python benchmarks/relatorio_financeiro.py [quantidade de pagamentos]
+     (padrão: 1.000.000)
+"""
+import sys
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+
+from utils import criar_sessao, popular_dados, popular_pagamentos, ContadorQueries, cronometro
+
+from sqlalchemy import func, and_
+from app.models.pagamento import Pagamento, MetodoPagamento, StatusPagamento
+from app.schemas.dashboard import Granularidade
+from app.services.fechamento import fechar_mes
+from app.services.graficos import inicio_do_periodo, proximo_periodo
+from app.services.relatorio_financeiro import calcular_relatorio
+
+
+def relatorio_legado(db, data_inicio: date, data_fim: date) -> dict:
+    """Implementação anterior de get_relatorio_financeiro (13 varreduras)"""
+    inicio_dt = datetime.combine(data_inicio, datetime.min.time())
+    fim_dt = datetime.combine(data_fim, datetime.max.time())
+    periodo = [Pagamento.created_at >= inicio_dt, Pagamento.created_at <= fim_dt]
+
+    totais = {}
+    for status_pag in (StatusPagamento.PAGO, StatusPagamento.PENDENTE, StatusPagamento.CANCELADO):
+        totais[status_pag] = db.query(func.sum(Pagamento.valor)).filter(
+            and_(*periodo, Pagamento.status == status_pag)
+        ).scalar() or Decimal('0')
+
+    quantidade = db.query(Pagamento).filter(and_(*periodo)).count()
+
+    por_metodo = {}
+    for metodo in MetodoPagamento:
+        por_metodo[metodo.value] = float(db.query(func.sum(Pagamento.valor)).filter(
+            and_(*periodo, Pagamento.metodo_pagamento == metodo)
+        ).scalar() or Decimal('0'))
+
+    por_status = {}
+    for status_pag in StatusPagamento:
+        por_status[status_pag.value] = float(db.query(func.sum(Pagamento.valor)).filter(
+            and_(*periodo, Pagamento.status == status_pag)
+        ).scalar() or Decimal('0'))
+
+    return {
+        "total_recebido": totais[StatusPagamento.PAGO],
+        "total_pendente": totais[StatusPagamento.PENDENTE],
+        "total_cancelado": totais[StatusPagamento.CANCELADO],
+        "quantidade_pagamentos": quantidade,
+        "pagamentos_por_metodo": por_metodo,
+        "pagamentos_por_status": por_status,
+    }
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    try:
+        medicos, pacientes = popular_dados(db, n_consultas=0, n_pagamentos=0)
+        tempos = {}
+        with cronometro(tempos, "carga"):
+            popular_pagamentos(db, quantidade, [p.id for p in pacientes], [m.id for m in medicos])
+        print(f"{quantidade} pagamentos inseridos em {tempos['carga'] / 1000:.1f}s")
+
+        data_fim = date.today()
+        data_inicio = data_fim - timedelta(days=365)
+
+        with ContadorQueries(engine) as legado:
+            with cronometro(tempos, "legado"):
+                antigo = relatorio_legado(db, data_inicio, data_fim)
+        with ContadorQueries(engine) as agrupado:
+            with cronometro(tempos, "agrupado"):
+                novo = calcular_relatorio(db, data_inicio, data_fim)
+        with ContadorQueries(engine) as quebras:
+            with cronometro(tempos, "quebras"):
+                calcular_relatorio(db, data_inicio, data_fim, por_medico=True, por_mes=True)
+
+        print(f"{'caminho':<28} | {'queries':>7} | {'ms':>9}")
+        print(f"{'legado':<28} | {legado.total:>7} | {tempos['legado']:>9.1f}")
+        print(f"{'agrupado':<28} | {agrupado.total:>7} | {tempos['agrupado']:>9.1f}")
+        print(f"{'agrupado + médico + mês':<28} | {quebras.total:>7} | {tempos['quebras']:>9.1f}")
+
+        # Fechar todos os meses encerrados: só o mês em aberto é calculado ao vivo
+        mes = inicio_do_periodo(data_inicio, Granularidade.MES)
+        while proximo_periodo(mes, Granularidade.MES) <= data_fim:
+            fechar_mes(db, mes)
+            mes = proximo_periodo(mes, Granularidade.MES)
+        db.commit()
+        with ContadorQueries(engine) as fechados:
+            with cronometro(tempos, "fechamentos"):
+                com_fechamentos = calcular_relatorio(db, data_inicio, data_fim)
+        print(f"{'fechamentos + mês aberto':<28} | {fechados.total:>7} | {tempos['fechamentos']:>9.1f}")
+
+        iguais = (
+            antigo["quantidade_pagamentos"] == novo.quantidade_pagamentos
+            and antigo["total_recebido"] == novo.total_recebido
+            and antigo["total_pendente"] == novo.total_pendente
+            and antigo["total_cancelado"] == novo.total_cancelado
+            and antigo["pagamentos_por_metodo"] == novo.pagamentos_por_metodo
+            and antigo["pagamentos_por_status"] == novo.pagamentos_por_status
+            and novo.model_dump(exclude={"meses_fechados"})
+            == com_fechamentos.model_dump(exclude={"meses_fechados"})
+        )
+        print("[OK] Resultados idênticos" if iguais else "[ERRO] Resultados divergentes")
+        if not iguais:
+            sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark da sincronização incremental de consultas (GET /consultas/alteracoes/)
+
+Mantém uma cópia local das consultas como o frontend ou o serviço de
+WhatsApp manteriam: carga inicial pelo feed e, a cada rodada, agendamentos,
+remarcações e cancelamentos pelas rotas seguidos de uma chamada incremental.
+Depois de cada rodada a cópia (consultas não canceladas) deve ser igual ao
+banco e o cursor nunca pode voltar. Compara o custo de uma rodada com a
+releitura completa de /consultas/ e verifica que o feed usa o índice
+ix_consultas_alterado_em_id. Termina com código 1 se a cópia divergir.
+
+Uso: python benchmarks/sincronizacao_consultas.py (espera a margem do feed
+entre as rodadas: ~15 s)
+"""
+import json
+import random
+import sys
+import time as relogio
+from datetime import datetime, time, timedelta
+
+from utils import criar_sessao, popular_dados, cronometro, ContadorQueries
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from app.api.v1.consultas import (
+    create_consulta, update_consulta, cancel_consulta, list_consultas, get_alteracoes_consultas
+)
+from app.models.consulta import Consulta, StatusConsulta, TipoConsulta
+from app.schemas.consulta import Consulta as ConsultaSchema, ConsultaCreate, ConsultaUpdate
+from app.services import sincronizacao
+from app.services.indice_agenda import indice_agenda
+
+RODADAS = 6
+OPERACOES_POR_RODADA = 40
+N_CONSULTAS = 20000
+# Margem menor que a padrão para o benchmark não demorar; o SQLite grava em segundos
+sincronizacao.MARGEM_SEGUNDOS = 1
+
+
+def esperar_margem():
+    relogio.sleep(sincronizacao.MARGEM_SEGUNDOS + 1.1)
+
+
+def sincronizar(db, copia, cursor):
+    """Aplicar o feed na cópia até esgotar; devolve (cursor, chamadas, bytes)"""
+    chamadas = tamanho = 0
+    while True:
+        resposta = get_alteracoes_consultas(cursor=cursor, limite=1000, db=db, current_user=None)
+        chamadas += 1
+        tamanho += len(json.dumps(resposta.model_dump(mode="json")))
+        for consulta in resposta.alteradas:
+            copia[consulta.id] = consulta.model_dump(mode="json")
+        for consulta_id in resposta.removidas:
+            copia.pop(consulta_id, None)
+        if resposta.cursor:
+            cursor = resposta.cursor
+        if not resposta.mais:
+            return cursor, chamadas, tamanho
+
+
+def estado_banco(db):
+    return {
+        c.id: ConsultaSchema.model_validate(c).model_dump(mode="json")
+        for c in db.query(Consulta).filter(Consulta.status != StatusConsulta.CANCELADA).all()
+    }
+
+
+def operar(db, rnd, medico_ids, paciente_ids, ids):
+    operacao = rnd.random()
+    try:
+        if operacao < 0.4:
+            consulta = create_consulta(
+                consulta=ConsultaCreate(
+                    paciente_id=rnd.choice(paciente_ids), medico_id=rnd.choice(medico_ids),
+                    data_hora=datetime.combine(datetime.now().date() + timedelta(days=rnd.randrange(1, 60)), time(8))
+                    + timedelta(minutes=15 * rnd.randrange(0, 40)),
+                    duracao=30, tipo=TipoConsulta.RETORNO
+                ),
+                idempotency_key=None, db=db, current_user=None
+            )
+            ids.append(consulta.id)
+        elif operacao < 0.8:
+            update_consulta(
+                consulta_id=rnd.choice(ids),
+                consulta_update=ConsultaUpdate(observacoes=f"nota {rnd.random():.6f}"),
+                db=db, current_user=None
+            )
+        else:
+            cancel_consulta(consulta_id=rnd.choice(ids), db=db, current_user=None)
+    except HTTPException:
+        db.rollback()
+
+
+def main():
+    engine, SessionLocal = criar_sessao()
+    db = SessionLocal()
+    rnd = random.Random(24)
+    erros = 0
+    indice_agenda.ativo = False
+    try:
+        medicos, pacientes = popular_dados(db, n_medicos=5, n_pacientes=200, n_consultas=N_CONSULTAS, n_pagamentos=0)
+        medico_ids, paciente_ids = [m.id for m in medicos], [p.id for p in pacientes]
+        ids = [linha[0] for linha in db.query(Consulta.id).all()]
+        esperar_margem()
+
+        copia, tempos = {}, {}
+        with ContadorQueries(engine) as carga:
+            with cronometro(tempos, "carga"):
+                cursor, chamadas, tamanho = sincronizar(db, copia, None)
+        print(f"Carga inicial: {len(copia)} consultas em {chamadas} chamadas, {carga.total} queries, "
+              f"{tamanho / 1024:.0f} KB, {tempos['carga']:.0f} ms")
+
+        for rodada in range(RODADAS):
+            for _ in range(OPERACOES_POR_RODADA):
+                operar(db, rnd, medico_ids, paciente_ids, ids)
+            esperar_margem()
+            with ContadorQueries(engine) as incremental:
+                with cronometro(tempos, "incremental"):
+                    novo_cursor, chamadas, tamanho = sincronizar(db, copia, cursor)
+            if sincronizacao.decodificar_cursor(novo_cursor) < sincronizacao.decodificar_cursor(cursor):
+                erros += 1
+                print(f"[ERRO] Rodada {rodada}: o cursor voltou")
+            cursor = novo_cursor
+            if copia != estado_banco(db):
+                erros += 1
+                print(f"[ERRO] Rodada {rodada}: a cópia local divergiu do banco")
+            print(f"Rodada {rodada}: {OPERACOES_POR_RODADA} operações -> {chamadas} chamada(s), "
+                  f"{incremental.total} queries, {tamanho / 1024:.1f} KB, {tempos['incremental']:.1f} ms")
+
+        # Releitura completa da listagem, como os clientes faziam
+        with ContadorQueries(engine) as completa:
+            with cronometro(tempos, "completa"):
+                tamanho, skip = 0, 0
+                while True:
+                    pagina = list_consultas(
+                        skip=skip, limit=1000, data_inicio=None, data_fim=None, medico_id=None, status=None,
+                        db=db, current_user=None
+                    )
+                    tamanho += len(json.dumps(pagina.model_dump(mode="json")))
+                    skip += 1000
+                    if skip >= pagina.total:
+                        break
+        print(f"Releitura completa de /consultas/: {completa.total} queries, {tamanho / 1024:.0f} KB, "
+              f"{tempos['completa']:.0f} ms")
+
+        plano = " ".join(
+            str(linha[-1]) for linha in db.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM consultas "
+                "WHERE coalesce(consultas.updated_at, consultas.created_at) >= '2030-01-01 00:00:00' "
+                "ORDER BY coalesce(consultas.updated_at, consultas.created_at), consultas.id LIMIT 500"
+            )).all()
+        )
+        print(f"Plano: {plano}")
+        if "ix_consultas_alterado_em_id" not in plano:
+            erros += 1
+            print("[ERRO] O feed não usa o índice ix_consultas_alterado_em_id")
+    finally:
+        indice_agenda.ativo = True
+        db.close()
+
+    if erros:
+        sys.exit(1)
+    print("[OK] Cópia local igual ao banco em todas as rodadas")
+
+
+if __name__ == "__main__":
+    main()
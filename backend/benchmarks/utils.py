@@ -0,0 +1,193 @@
+"""
+Utilitários compartilhados pelos scripts de benchmark
+
+Os benchmarks rodam por padrão em um SQLite em memória populado com dados
+sintéticos; defina BENCH_DATABASE_URL para apontar para outro banco
+(ex.: um PostgreSQL descartável).
+"""
+import os
+import sys
+import time
+import random
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models import *  # noqa: F401,F403 - registrar todos os modelos
+from app.models.user import User, UserRole
+from app.models.paciente import Paciente
+from app.models.consulta import Consulta, TipoConsulta, StatusConsulta
+from app.models.pagamento import Pagamento, MetodoPagamento, StatusPagamento
+from app.models.despesa import Despesa, CategoriaDespesa, StatusDespesa
+from app.services import estatisticas_diarias
+
+
+def criar_sessao(database_url: str = None):
+    """Criar engine e sessão para o benchmark (SQLite em memória por padrão)"""
+    url = database_url or os.environ.get("BENCH_DATABASE_URL", "sqlite://")
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+    elif url.startswith("sqlite"):
+        # Arquivo: uma conexão por thread, esperando o lock de escrita do SQLite
+        engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 30})
+    else:
+        engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+class ContadorQueries:
+    """Contar os comandos SQL emitidos por uma engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.total = 0
+
+    def _contar(self, *args, **kwargs):
+        self.total += 1
+
+    def __enter__(self):
+        self.total = 0
+        event.listen(self.engine, "before_cursor_execute", self._contar)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._contar)
+
+
+@contextmanager
+def cronometro(resultado: dict, chave: str):
+    """Registrar em resultado[chave] o tempo (ms) do bloco"""
+    inicio = time.perf_counter()
+    yield
+    resultado[chave] = (time.perf_counter() - inicio) * 1000
+
+
+def popular_dados(db, n_medicos=5, n_pacientes=200, n_consultas=5000, n_pagamentos=5000, dias=400, seed=42):
+    """Popular o banco com médicos, pacientes, consultas e pagamentos sintéticos"""
+    rnd = random.Random(seed)
+    agora = datetime.now().replace(minute=0, second=0, microsecond=0)
+
+    medicos = [
+        User(
+            email=f"medico{i}@bench.local",
+            hashed_password="x",
+            nome=f"Dr. Bench {i}",
+            role=UserRole.MEDICO,
+            crm=f"BENCH{i}",
+            especialidade=rnd.choice(["Cardiologia", "Pediatria", "Ortopedia"])
+        )
+        for i in range(n_medicos)
+    ]
+    db.add_all(medicos)
+
+    pacientes = [
+        Paciente(
+            nome=f"Paciente {i}",
+            cpf=f"{i:011d}",
+            data_nascimento=date(1980, 1, 1) + timedelta(days=i),
+            created_at=agora - timedelta(days=rnd.randint(0, dias))
+        )
+        for i in range(n_pacientes)
+    ]
+    db.add_all(pacientes)
+    db.flush()
+
+    status_consulta = list(StatusConsulta)
+    db.bulk_insert_mappings(Consulta, [
+        {
+            "paciente_id": rnd.choice(pacientes).id,
+            "medico_id": rnd.choice(medicos).id,
+            "data_hora": agora - timedelta(hours=rnd.randint(-24 * 30, 24 * dias)),
+            "duracao": 30,
+            "tipo": TipoConsulta.RETORNO,
+            "status": rnd.choice(status_consulta),
+        }
+        for _ in range(n_consultas)
+    ])
+
+    status_pagamento = list(StatusPagamento)
+    metodos = list(MetodoPagamento)
+    pagamentos = []
+    for _ in range(n_pagamentos):
+        criado = agora - timedelta(hours=rnd.randint(0, 24 * dias))
+        status_pag = rnd.choice(status_pagamento)
+        pagamentos.append({
+            "paciente_id": rnd.choice(pacientes).id,
+            "medico_id": rnd.choice(medicos).id,
+            "valor": Decimal(rnd.randint(5000, 50000)) / 100,
+            "metodo_pagamento": rnd.choice(metodos),
+            "status": status_pag,
+            "data_vencimento": (criado + timedelta(days=30)).date(),
+            "data_pagamento": criado if status_pag == StatusPagamento.PAGO else None,
+            "created_at": criado,
+        })
+    db.bulk_insert_mappings(Pagamento, pagamentos)
+    estatisticas_diarias.reconstruir(db)
+    db.commit()
+
+    return medicos, pacientes
+
+
+def popular_pagamentos(db, quantidade: int, paciente_ids, medico_ids, dias=730, seed=7, lote=50000):
+    """Inserir muitos pagamentos sintéticos em lotes (Core, sem objetos ORM)"""
+    rnd = random.Random(seed)
+    agora = datetime.now().replace(microsecond=0)
+    status_pagamento = list(StatusPagamento)
+    metodos = list(MetodoPagamento)
+    medicos = list(medico_ids) + [None]
+    tabela = Pagamento.__table__
+
+    for inicio in range(0, quantidade, lote):
+        linhas = []
+        for _ in range(min(lote, quantidade - inicio)):
+            criado = agora - timedelta(seconds=rnd.randint(0, 86400 * dias))
+            status_pag = rnd.choice(status_pagamento)
+            linhas.append({
+                "paciente_id": rnd.choice(paciente_ids),
+                "medico_id": rnd.choice(medicos),
+                "valor": Decimal(rnd.randint(5000, 50000)) / 100,
+                "metodo_pagamento": rnd.choice(metodos),
+                "status": status_pag,
+                "data_vencimento": (criado + timedelta(days=30)).date(),
+                "data_pagamento": criado if status_pag == StatusPagamento.PAGO else None,
+                "created_at": criado,
+            })
+        db.execute(tabela.insert(), linhas)
+    db.commit()
+
+
+def popular_despesas(db, quantidade: int, dias=730, seed=11, lote=50000):
+    """Inserir despesas sintéticas em lotes, com vencimentos no passado e no futuro"""
+    rnd = random.Random(seed)
+    hoje = date.today()
+    status_despesa = list(StatusDespesa)
+    categorias = list(CategoriaDespesa)
+    tabela = Despesa.__table__
+
+    for inicio in range(0, quantidade, lote):
+        linhas = []
+        for i in range(min(lote, quantidade - inicio)):
+            vencimento = hoje + timedelta(days=rnd.randint(-dias, 90))
+            status_desp = rnd.choice(status_despesa)
+            pago_em = datetime.combine(vencimento, datetime.min.time()) + timedelta(hours=rnd.randint(-240, 240))
+            linhas.append({
+                "descricao": f"Despesa {inicio + i}",
+                "categoria": rnd.choice(categorias),
+                "valor": Decimal(rnd.randint(1000, 300000)) / 100,
+                "status": status_desp,
+                "data_vencimento": vencimento,
+                "data_pagamento": pago_em if status_desp == StatusDespesa.PAGO else None,
+            })
+        db.execute(tabela.insert(), linhas)
+    db.commit()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir as tabelas de rollup diário (estatisticas_diarias_*)
+
+Uso:
+    python reconstruir_estatisticas.py                      # todo o histórico
+    python reconstruir_estatisticas.py --inicio 2025-01-01  # a partir de uma data
+    python reconstruir_estatisticas.py --inicio 2025-01-01 --fim 2025-01-31
+"""
+import sys
+import os
+import argparse
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services import estatisticas_diarias
+
+
+def _data(valor: str):
+    return datetime.strptime(valor, "%Y-%m-%d").date()
+
+
+def reconstruir_estatisticas():
+    """Reconstruir o rollup diário no período informado"""
+    parser = argparse.ArgumentParser(description="Reconstruir estatísticas diárias")
+    parser.add_argument("--inicio", type=_data, default=None, help="Data de início (YYYY-MM-DD)")
+    parser.add_argument("--fim", type=_data, default=None, help="Data de fim (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        consultas, pagamentos = estatisticas_diarias.reconstruir(db, args.inicio, args.fim)
+        db.commit()
+        print(f"[OK] Rollup reconstruido: {consultas} linhas de consultas, {pagamentos} linhas de pagamentos")
+    except Exception as e:
+        print(f"[ERRO] Erro ao reconstruir estatisticas: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    reconstruir_estatisticas()
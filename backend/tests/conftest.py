@@ -0,0 +1,43 @@
+"""
+Fixtures dos testes
+
+Cada teste recebe um SQLite em memória novo, com o esquema criado a partir
+dos modelos e os mesmos utilitários de dados sintéticos dos benchmarks.
+
+Uso (em backend/): python -m pytest
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+
+from benchmarks.utils import criar_sessao, ContadorQueries
+from app.services.indice_agenda import indice_agenda
+
+
+@pytest.fixture(autouse=True)
+def sem_indice_agenda(monkeypatch):
+    """O índice em memória é global ao processo e guardaria agendas de outro teste"""
+    monkeypatch.setattr(indice_agenda, "ativo", False)
+
+
+@pytest.fixture
+def banco():
+    """(engine, SessionLocal) de um SQLite em memória"""
+    engine, SessionLocal = criar_sessao("sqlite://")
+    yield engine, SessionLocal
+    engine.dispose()
+
+
+@pytest.fixture
+def db(banco):
+    sessao = banco[1]()
+    yield sessao
+    sessao.close()
+
+
+@pytest.fixture
+def contar_queries(banco):
+    """Fábrica de contadores de queries da engine do teste"""
+    return lambda: ContadorQueries(banco[0])
@@ -0,0 +1,124 @@
+"""
+Verificação aleatória do filtro de sobreposição da agenda
+
+Gera agendas aleatórias (várias sementes), com durações de 1 a 480 minutos,
+todos os status e consultas ativas sem sobreposição entre si (a regra que o
+próprio sistema garante), e compara agenda.filtro_sobreposicao /
+agenda.buscar_conflito com um oráculo em Python que testa todos os pares.
+As sondagens incluem horários que começam ou terminam exatamente nas bordas
+das consultas existentes e intervalos que contêm ou estão contidos nelas.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.utils import popular_dados
+from app.models.consulta import Consulta, TipoConsulta, StatusConsulta, DURACAO_MAXIMA_MINUTOS
+from app.services import agenda
+
+CONSULTAS_POR_SEMENTE = 150
+SONDAGENS_POR_SEMENTE = 300
+INICIO = datetime(2030, 3, 4, 7, 0)
+JANELA_MINUTOS = 3 * 24 * 60
+
+
+def sobrepoe(inicio_a, fim_a, inicio_b, fim_b):
+    return inicio_a < fim_b and inicio_b < fim_a
+
+
+def oraculo(consultas, medico_id, inicio, fim, ignorar_id=None):
+    return {
+        c["id"] for c in consultas
+        if c["medico_id"] == medico_id
+        and c["status"] in agenda.STATUS_OCUPAM_HORARIO
+        and c["id"] != ignorar_id
+        and sobrepoe(c["inicio"], c["fim"], inicio, fim)
+    }
+
+
+def gerar_agenda(db, rnd, medico_ids, paciente_id):
+    """Inserir consultas aleatórias; as ativas não se sobrepõem entre si"""
+    consultas = []
+    for _ in range(CONSULTAS_POR_SEMENTE):
+        medico_id = rnd.choice(medico_ids)
+        inicio = INICIO + timedelta(minutes=rnd.randrange(JANELA_MINUTOS))
+        duracao = rnd.choice((5, 15, 30, 45, 60, 90, rnd.randint(1, DURACAO_MAXIMA_MINUTOS)))
+        fim = inicio + timedelta(minutes=duracao)
+        status = rnd.choice(list(StatusConsulta))
+        if status in agenda.STATUS_OCUPAM_HORARIO and oraculo(consultas, medico_id, inicio, fim):
+            status = StatusConsulta.CANCELADA
+
+        consulta = Consulta(
+            paciente_id=paciente_id,
+            medico_id=medico_id,
+            data_hora=inicio,
+            duracao=duracao,
+            tipo=TipoConsulta.RETORNO,
+            status=status
+        )
+        db.add(consulta)
+        db.flush()
+        consultas.append({
+            "id": consulta.id, "medico_id": medico_id, "status": status,
+            "inicio": inicio, "fim": fim
+        })
+    db.commit()
+    return consultas
+
+
+def gerar_sondagem(rnd, consultas, medico_ids):
+    """(medico_id, inicio, duracao, ignorar_id) com viés para as bordas"""
+    alvo = rnd.choice(consultas)
+    medico_id = alvo["medico_id"] if rnd.random() < 0.8 else rnd.choice(medico_ids)
+    duracao = rnd.choice((5, 15, 30, 60, 120, rnd.randint(1, DURACAO_MAXIMA_MINUTOS)))
+    tipo = rnd.randrange(6)
+    if tipo == 0:  # começa exatamente no fim do alvo
+        inicio = alvo["fim"]
+    elif tipo == 1:  # termina exatamente no início do alvo
+        inicio = alvo["inicio"] - timedelta(minutes=duracao)
+    elif tipo == 2:  # contém o alvo
+        inicio = alvo["inicio"] - timedelta(minutes=rnd.randint(0, 30))
+        duracao = min(
+            DURACAO_MAXIMA_MINUTOS,
+            int((alvo["fim"] - inicio).total_seconds() // 60) + rnd.randint(0, 30)
+        )
+    elif tipo == 3:  # contido no alvo
+        total = int((alvo["fim"] - alvo["inicio"]).total_seconds() // 60)
+        deslocamento = rnd.randint(0, max(total - 1, 0))
+        inicio = alvo["inicio"] + timedelta(minutes=deslocamento)
+        duracao = rnd.randint(1, max(total - deslocamento, 1))
+    elif tipo == 4:  # a uma duração máxima de distância (borda do limite do índice)
+        inicio = alvo["inicio"] + timedelta(minutes=DURACAO_MAXIMA_MINUTOS - rnd.randint(0, 1))
+    else:
+        inicio = INICIO + timedelta(minutes=rnd.randrange(-600, JANELA_MINUTOS + 600))
+    ignorar_id = alvo["id"] if rnd.random() < 0.3 else None
+    return medico_id, inicio, duracao, ignorar_id
+
+
+@pytest.fixture
+def medico_e_paciente(db):
+    medicos, pacientes = popular_dados(db, n_medicos=3, n_pacientes=1, n_consultas=0, n_pagamentos=0)
+    return [m.id for m in medicos], pacientes[0].id
+
+
+@pytest.mark.parametrize("semente", range(10))
+def test_filtro_sobreposicao_igual_ao_oraculo(db, medico_e_paciente, semente):
+    medico_ids, paciente_id = medico_e_paciente
+    rnd = random.Random(semente)
+    consultas = gerar_agenda(db, rnd, medico_ids, paciente_id)
+
+    for _ in range(SONDAGENS_POR_SEMENTE):
+        medico_id, inicio, duracao, ignorar_id = gerar_sondagem(rnd, consultas, medico_ids)
+        fim = inicio + timedelta(minutes=duracao)
+
+        query = db.query(Consulta.id).filter(agenda.filtro_sobreposicao(db, medico_id, inicio, fim))
+        if ignorar_id is not None:
+            query = query.filter(Consulta.id != ignorar_id)
+        obtido = {linha.id for linha in query.all()}
+        esperado = oraculo(consultas, medico_id, inicio, fim, ignorar_id)
+        conflito = agenda.buscar_conflito(db, medico_id, inicio, duracao, ignorar_id)
+
+        caso = f"medico_id={medico_id} inicio={inicio} duracao={duracao} ignorar_id={ignorar_id}"
+        assert obtido == esperado, caso
+        assert (conflito is not None) == bool(esperado), caso
@@ -0,0 +1,149 @@
+"""
+Agendamento concorrente (POST /consultas/) e Idempotency-Key
+
+O teste de estresse dispara agendamentos em paralelo (uma sessão por
+requisição, SQLite em arquivo) para poucos médicos e horários, com parte das
+requisições repetindo a mesma Idempotency-Key, e confere que não sobra
+consulta ativa sobreposta, que cada chave criou no máximo uma consulta e que
+nenhuma requisição falhou com erro inesperado.
+"""
+import json
+import random
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from benchmarks.utils import criar_sessao, popular_dados
+from app.api.v1.consultas import create_consulta
+from app.models.consulta import Consulta, TipoConsulta
+from app.schemas.consulta import ConsultaCreate
+from app.services import agenda, idempotencia
+
+REQUISICOES = 300
+THREADS = 8
+FRACAO_REPETICOES = 0.3
+DIA = datetime.combine(datetime.now().date() + timedelta(days=30), time(8))
+
+
+def _corpo(rnd, medico_ids, paciente_ids):
+    return ConsultaCreate(
+        paciente_id=rnd.choice(paciente_ids),
+        medico_id=rnd.choice(medico_ids),
+        data_hora=DIA + timedelta(minutes=15 * rnd.randrange(0, 16)),
+        duracao=rnd.choice((15, 30, 45, 60)),
+        tipo=TipoConsulta.RETORNO
+    )
+
+
+def _id_consulta(resultado):
+    if isinstance(resultado, JSONResponse):
+        return json.loads(resultado.body)["id"]
+    return resultado.id
+
+
+def test_agendamentos_paralelos_sem_sobreposicao_nem_duplicata(tmp_path):
+    engine, SessionLocal = criar_sessao(f"sqlite:///{tmp_path / 'agenda.db'}")
+    db = SessionLocal()
+    medicos, pacientes = popular_dados(db, n_medicos=3, n_pacientes=30, n_consultas=0, n_pagamentos=0)
+    medico_ids, paciente_ids = [m.id for m in medicos], [p.id for p in pacientes]
+    db.close()
+
+    rnd = random.Random(22)
+    requisicoes = []
+    for i in range(REQUISICOES):
+        if requisicoes and rnd.random() < FRACAO_REPETICOES:
+            requisicoes.append(rnd.choice(requisicoes))
+        else:
+            requisicoes.append((f"agendamento-{i}", _corpo(rnd, medico_ids, paciente_ids)))
+    rnd.shuffle(requisicoes)
+
+    respostas = defaultdict(list)
+    erros = []
+    trava = threading.Lock()
+
+    def agendar(requisicao):
+        chave, corpo = requisicao
+        sessao = SessionLocal()
+        try:
+            consulta_id = _id_consulta(
+                create_consulta(consulta=corpo, idempotency_key=chave, db=sessao, current_user=None)
+            )
+            with trava:
+                respostas[chave].append(consulta_id)
+        except HTTPException as e:
+            if e.status_code != 400:
+                with trava:
+                    erros.append(f"{chave}: HTTP {e.status_code} {e.detail}")
+        except Exception as e:
+            with trava:
+                erros.append(f"{chave}: {type(e).__name__}: {e}")
+        finally:
+            sessao.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            list(executor.map(agendar, requisicoes))
+
+        assert not erros, erros[:5]
+        assert all(len(set(ids)) == 1 for ids in respostas.values())
+
+        db = SessionLocal()
+        for medico_id in medico_ids:
+            ativas = db.query(Consulta).filter(
+                Consulta.medico_id == medico_id,
+                Consulta.status.in_(agenda.STATUS_OCUPAM_HORARIO)
+            ).order_by(Consulta.data_hora).all()
+            for anterior, consulta in zip(ativas, ativas[1:]):
+                assert consulta.data_hora >= anterior.data_hora + timedelta(minutes=anterior.duracao)
+        assert db.query(Consulta).count() == len(respostas)
+        db.close()
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def agendamento(db):
+    medicos, pacientes = popular_dados(db, n_medicos=2, n_pacientes=1, n_consultas=0, n_pagamentos=0)
+    corpo = ConsultaCreate(
+        paciente_id=pacientes[0].id, medico_id=medicos[0].id,
+        data_hora=DIA, duracao=30, tipo=TipoConsulta.RETORNO
+    )
+    return corpo, [SimpleNamespace(id=m.id) for m in medicos]
+
+
+def test_repeticao_devolve_a_mesma_consulta(db, agendamento):
+    corpo, (usuario, _) = agendamento
+    criada = create_consulta(consulta=corpo, idempotency_key="chave", db=db, current_user=usuario)
+    repetida = create_consulta(consulta=corpo, idempotency_key="chave", db=db, current_user=usuario)
+
+    assert isinstance(repetida, JSONResponse)
+    assert repetida.headers[idempotencia.CABECALHO_REPETICAO] == "true"
+    assert _id_consulta(repetida) == criada.id
+    assert db.query(Consulta).count() == 1
+
+
+def test_chave_de_outro_usuario_e_recusada(db, agendamento):
+    corpo, (usuario, outro) = agendamento
+    create_consulta(consulta=corpo, idempotency_key="chave", db=db, current_user=usuario)
+
+    with pytest.raises(HTTPException) as erro:
+        create_consulta(consulta=corpo, idempotency_key="chave", db=db, current_user=outro)
+    assert erro.value.status_code == 422
+
+
+def test_chave_com_outro_corpo_e_recusada(db, agendamento):
+    corpo, (usuario, _) = agendamento
+    create_consulta(consulta=corpo, idempotency_key="chave", db=db, current_user=usuario)
+
+    with pytest.raises(HTTPException) as erro:
+        create_consulta(
+            consulta=corpo.model_copy(update={"duracao": 60}), idempotency_key="chave",
+            db=db, current_user=usuario
+        )
+    assert erro.value.status_code == 422
@@ -0,0 +1,69 @@
+"""ETag do feed iCalendar do médico"""
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.utils import popular_dados
+from app.main import app
+from app.api.deps import get_db, get_current_user
+from app.models.consulta import Consulta, TipoConsulta
+from app.models.paciente import Paciente
+from app.models.user import User
+
+
+@pytest.fixture
+def cliente(banco):
+    _, SessionLocal = banco
+
+    def _db():
+        sessao = SessionLocal()
+        try:
+            yield sessao
+        finally:
+            sessao.close()
+
+    app.dependency_overrides[get_db] = _db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=None)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def feed(db, cliente):
+    """(url, médico, paciente com consulta amanhã)"""
+    medicos, pacientes = popular_dados(db, n_medicos=1, n_pacientes=1, n_consultas=0, n_pagamentos=0)
+    medico, paciente = medicos[0], pacientes[0]
+    db.add(Consulta(
+        paciente_id=paciente.id, medico_id=medico.id, duracao=30, tipo=TipoConsulta.RETORNO,
+        data_hora=datetime.combine(datetime.now().date() + timedelta(days=1), time(9))
+    ))
+    db.commit()
+    token = cliente.post(f"/api/v1/medicos/{medico.id}/calendario").json()["token"]
+    return f"/api/v1/consultas/calendario/{token}.ics", medico.id, paciente.id
+
+
+def _renomear(db, modelo, registro_id, nome):
+    db.get(modelo, registro_id).nome = nome
+    db.commit()
+
+
+@pytest.mark.parametrize("modelo, indice", [(Paciente, 2), (User, 1)])
+def test_renomear_muda_o_etag(db, cliente, feed, modelo, indice):
+    url = feed[0]
+    anterior = cliente.get(url)
+    assert anterior.status_code == 200
+
+    _renomear(db, modelo, feed[indice], "Nome Novo")
+
+    resposta = cliente.get(url, headers={"If-None-Match": anterior.headers["etag"]})
+    assert resposta.status_code == 200
+    assert resposta.headers["etag"] != anterior.headers["etag"]
+    assert "Nome Novo" in resposta.text
+
+
+def test_sem_mudanca_responde_304(cliente, feed):
+    url = feed[0]
+    etag = cliente.get(url).headers["etag"]
+    assert cliente.get(url, headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,34 @@
+"""Número de queries das seções do dashboard"""
+import pytest
+
+from benchmarks.utils import popular_dados
+from app.api.v1.dashboard import calcular_dashboard, listar_proximas_consultas, listar_pacientes_recentes
+from app.api.v1.financeiro import get_grafico_financeiro
+
+
+@pytest.fixture
+def dados(db):
+    return popular_dados(db, n_consultas=2000, n_pagamentos=2000)
+
+
+def test_graficos_com_queries_constantes(db, dados, contar_queries):
+    totais = []
+    for dias in (7, 30, 90, 365):
+        with contar_queries() as dashboard:
+            calcular_dashboard(db, dias)
+        with contar_queries() as financeiro:
+            grafico = get_grafico_financeiro(dias=dias, db=db, current_user=None)
+        assert len(grafico) == dias
+        totais.append((dashboard.total, financeiro.total))
+    assert len(set(totais)) == 1, totais
+
+
+@pytest.mark.parametrize("listar", [listar_proximas_consultas, listar_pacientes_recentes])
+def test_secoes_com_queries_constantes(db, dados, contar_queries, listar):
+    totais = []
+    for limite in (5, 10, 25, 50):
+        with contar_queries() as contador:
+            itens = listar(db, limite)
+        assert len(itens) == limite
+        totais.append(contador.total)
+    assert len(set(totais)) == 1, totais
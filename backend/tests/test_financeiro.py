@@ -0,0 +1,124 @@
+"""Listagem de pagamentos, meses fechados e conciliação de extrato"""
+import io
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from benchmarks.utils import popular_dados
+from app.api.v1.financeiro import list_pagamentos, update_pagamento, marcar_como_pago, delete_pagamento
+from app.models.fechamento import FechamentoMensal
+from app.models.pagamento import Pagamento, StatusPagamento
+from app.schemas.pagamento import PagamentoUpdate
+from app.services import conciliacao, fechamento
+from app.services.extrato_bancario import ErroExtrato, FormatoExtrato, LinhaExtrato, ler_extrato
+
+
+def _listar(db, limit):
+    return list_pagamentos(
+        skip=0, limit=limit, paciente_id=None, status=None,
+        metodo_pagamento=None, data_inicio=None, data_fim=None,
+        db=db, current_user=None
+    )
+
+
+def test_listagem_com_queries_constantes(db, contar_queries):
+    popular_dados(db, n_consultas=0, n_pagamentos=1500)
+    totais = []
+    for limit in (10, 100, 500, 1000):
+        with contar_queries() as contador:
+            resultado = _listar(db, limit)
+        assert len(resultado.items) == limit
+        totais.append(contador.total)
+    assert len(set(totais)) == 1, totais
+
+
+def test_listagem_traz_paciente_e_medico(db):
+    medicos, pacientes = popular_dados(db, n_consultas=0, n_pagamentos=50)
+    nomes_pacientes = {p.id: p.nome for p in pacientes}
+    for item in _listar(db, 50).items:
+        assert item.paciente_nome == nomes_pacientes[item.paciente_id]
+
+
+@pytest.fixture
+def mes_fechado(db):
+    """Um pagamento pendente (e outro sem status) lançados num mês já fechado"""
+    _, pacientes = popular_dados(db, n_medicos=1, n_pacientes=1, n_consultas=0, n_pagamentos=2)
+    pendente, sem_status = db.query(Pagamento).order_by(Pagamento.id).all()
+    for pagamento in (pendente, sem_status):
+        pagamento.created_at = datetime(2020, 3, 10)
+        pagamento.data_vencimento = date(2020, 3, 10)
+    pendente.status = StatusPagamento.PENDENTE
+    sem_status.status = None
+    db.commit()
+    fechamento.fechar_mes(db, date(2020, 3, 1))
+    db.commit()
+    return pendente, pacientes[0]
+
+
+def test_fechamento_ignora_status_nulo_nos_totais_por_status(db, mes_fechado):
+    pendente, _ = mes_fechado
+    registro = db.query(FechamentoMensal).one()
+    assert registro.total_pendente == pendente.valor
+    assert registro.quantidade_pagamentos == 2
+    assert {linha["status"] for linha in registro.linhas_pagamentos} == {"pendente", None}
+
+
+def test_pagamento_de_mes_fechado_nao_muda(db, mes_fechado):
+    pendente, _ = mes_fechado
+    for alterar in (
+        lambda: update_pagamento(pagamento_id=pendente.id, pagamento_update=PagamentoUpdate(valor=Decimal("1")),
+                                 db=db, current_user=None),
+        lambda: marcar_como_pago(pagamento_id=pendente.id, db=db, current_user=None),
+        lambda: delete_pagamento(pagamento_id=pendente.id, db=db, current_user=None),
+    ):
+        with pytest.raises(HTTPException) as erro:
+            alterar()
+        assert erro.value.status_code == 409
+
+    # Campos fora do snapshot continuam editáveis
+    atualizado = update_pagamento(
+        pagamento_id=pendente.id, pagamento_update=PagamentoUpdate(observacoes="ok"), db=db, current_user=None
+    )
+    assert atualizado.observacoes == "ok"
+
+
+def test_conciliacao_nao_altera_mes_fechado(db, mes_fechado):
+    pendente, paciente = mes_fechado
+    linha = LinhaExtrato(2, date(2020, 3, 10), pendente.valor, f"PIX {paciente.nome}", None)
+
+    resultado = conciliacao.conciliar(db, [linha])
+
+    assert resultado.conciliadas == 0
+    assert "mês já fechado" in resultado.itens_nao_conciliados[0].motivo
+    db.refresh(pendente)
+    assert pendente.status == StatusPagamento.PENDENTE
+
+
+def test_conciliacao_escolhe_pagamento_de_mes_aberto(db, mes_fechado):
+    pendente, paciente = mes_fechado
+    # Mesmo valor e pagador, vencimento mais distante do crédito, mas num mês aberto
+    aberto = Pagamento(
+        paciente_id=paciente.id, valor=pendente.valor, metodo_pagamento=pendente.metodo_pagamento,
+        status=StatusPagamento.PENDENTE, data_vencimento=date(2020, 3, 12), created_at=datetime(2020, 4, 1)
+    )
+    db.add(aberto)
+    db.commit()
+    linha = LinhaExtrato(2, date(2020, 3, 10), pendente.valor, f"PIX {paciente.nome}", None)
+
+    resultado = conciliacao.conciliar(db, [linha])
+
+    assert [item.pagamento_id for item in resultado.itens_conciliados] == [aberto.id]
+    db.refresh(pendente)
+    assert pendente.status == StatusPagamento.PENDENTE
+
+
+def test_extrato_com_bom_e_valores_nao_finitos():
+    csv = "﻿data;descricao;valor\n10/03/2020;PIX;10,00\n".encode("utf-8")
+    assert [linha.valor for linha in ler_extrato(io.BytesIO(csv), FormatoExtrato.CSV)] == [Decimal("10.00")]
+
+    for valor in ("NaN", "Infinity", "-inf"):
+        csv = f"data;descricao;valor\n10/03/2020;PIX;{valor}\n".encode("utf-8")
+        with pytest.raises(ErroExtrato):
+            list(ler_extrato(io.BytesIO(csv), FormatoExtrato.CSV))
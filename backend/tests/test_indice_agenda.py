@@ -0,0 +1,67 @@
+"""Leituras do índice de agenda em paralelo com alterações"""
+import sys
+import threading
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.consulta import StatusConsulta, TipoConsulta
+from app.schemas.consulta import Consulta as ConsultaSchema
+from app.services.indice_agenda import AgendaMedicoIndice
+
+DIAS = 20
+MEDICO_ID = 1
+
+
+def _consulta(consulta_id, data_hora):
+    return ConsultaSchema(
+        id=consulta_id, paciente_id=1, medico_id=MEDICO_ID, data_hora=data_hora, duracao=30,
+        tipo=TipoConsulta.RETORNO, status=StatusConsulta.AGENDADA, created_at=datetime(2030, 1, 1)
+    )
+
+
+@pytest.fixture
+def intervalo_curto():
+    """Trocar de thread com frequência para expor leituras no meio de uma escrita"""
+    anterior = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(anterior)
+
+
+def test_consultas_entre_concorrente_com_aplicar(intervalo_curto):
+    inicio = date(2030, 1, 7)
+    medico = SimpleNamespace(id=MEDICO_ID, nome="Dr. Teste", especialidade=None)
+    entrada = AgendaMedicoIndice(medico, [], [], inicio, inicio + timedelta(days=DIAS - 1))
+    # Uma consulta fixa às 10h de cada dia; as móveis entram e saem antes dela
+    fixas = {}
+    for dia in range(DIAS):
+        consulta = _consulta(dia + 1, datetime.combine(inicio + timedelta(days=dia), time(10)))
+        entrada.aplicar(consulta)
+        fixas[consulta.id] = consulta.data_hora
+
+    parar = threading.Event()
+
+    def escrever():
+        n = 0
+        while not parar.is_set():
+            dia = inicio + timedelta(days=n % DIAS)
+            movel = _consulta(1000 + n % 50, datetime.combine(dia, time(8)))
+            entrada.aplicar(movel)
+            # Fora da janela: remove
+            entrada.aplicar(movel.model_copy(update={"data_hora": datetime(2040, 1, 1)}))
+            n += 1
+
+    escritor = threading.Thread(target=escrever)
+    escritor.start()
+    try:
+        for leitura in range(20000):
+            dia = inicio + timedelta(days=leitura % DIAS)
+            janela = (datetime.combine(dia, time.min), datetime.combine(dia + timedelta(days=1), time.min))
+            consultas = entrada.consultas_entre(*janela)
+            assert all(janela[0] <= c.data_hora < janela[1] for c in consultas)
+            assert [c.id for c in consultas if c.id in fixas] == [leitura % DIAS + 1]
+    finally:
+        parar.set()
+        escritor.join()
@@ -0,0 +1,35 @@
+"""Reset do snapshot do canal de métricas ao vivo quando o último cliente sai"""
+import asyncio
+import itertools
+
+from app.services.metricas_ao_vivo import CanalMetricas
+
+
+def test_snapshot_descartado_quando_o_ultimo_assinante_sai():
+    contador = itertools.count()
+    canal = CanalMetricas(
+        lambda db: {"versao": next(contador)},
+        intervalo_maximo=60, espera_agrupamento=0.05, intervalo_keepalive=60
+    )
+
+    async def cenario():
+        eventos = canal.assinar()
+        assert await eventos.__anext__() == {"versao": 0}
+        # Primeiro next depois do snapshot inicial: inicia o publicador
+        proximo = asyncio.ensure_future(eventos.__anext__())
+        await asyncio.sleep(0.01)
+
+        # Uma escrita chega e o cliente sai antes do recálculo agrupado
+        canal.notificar()
+        proximo.cancel()
+        await asyncio.gather(proximo, return_exceptions=True)
+        await eventos.aclose()
+        assert canal.total_assinantes == 0
+
+        await asyncio.sleep(0.2)
+        return canal._atual, next(contador)
+
+    atual, calculos = asyncio.run(cenario())
+    assert atual is None
+    # Só o snapshot inicial foi calculado
+    assert calculos == 1